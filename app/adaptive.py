@@ -0,0 +1,70 @@
+"""
+Per-country fetch intervals that adapt to how fast each chart changes, kept within
+the YouTube API key's daily quota.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def chart_churn(previous_ids: Optional[Sequence[str]], current_ids: Sequence[str]) -> Optional[float]:
+    """Share of the current chart that wasn't in the previous one; None without a previous chart."""
+    if not previous_ids or not current_ids:
+        return None
+    return 1 - len(set(previous_ids) & set(current_ids)) / len(set(current_ids))
+
+
+@dataclass(frozen=True)
+class AdaptivePolicy:
+    default_interval: float
+    min_interval: float = 30 * 60
+    max_interval: float = 24 * 60 * 60
+    # Charts with more churn than high_churn are fetched more often, below low_churn less often
+    high_churn: float = 0.3
+    low_churn: float = 0.1
+    speedup: float = 0.5
+    slowdown: float = 1.5
+
+    def next_interval(self, current: Optional[float], churn: Optional[float]) -> float:
+        interval = current or self.default_interval
+        if churn is not None:
+            if churn >= self.high_churn:
+                interval *= self.speedup
+            elif churn <= self.low_churn:
+                interval *= self.slowdown
+        return min(self.max_interval, max(self.min_interval, interval))
+
+
+@dataclass(frozen=True)
+class QuotaBudget:
+    daily_units: int
+    units_per_fetch: int = 1
+
+    def projected_daily_units(self, intervals: Iterable[float]) -> float:
+        return sum(SECONDS_PER_DAY / interval * self.units_per_fetch for interval in intervals)
+
+    def stretch_factor(self, intervals: Iterable[float]) -> float:
+        """How much every interval must be stretched for the projected spend to fit the budget (>= 1)."""
+        projected = self.projected_daily_units(intervals)
+        return max(1.0, projected / self.daily_units) if self.daily_units > 0 else 1.0
+
+    def affordable_fetches(self, used_today: int) -> int:
+        return max(0, (self.daily_units - used_today) // self.units_per_fetch)
+
+
+def select_due(
+    next_runs: Dict[str, Optional[datetime]],
+    now: datetime,
+    budget: QuotaBudget,
+    used_today: int,
+) -> List[str]:
+    """Countries whose next run is due, most overdue first, capped by the quota left today."""
+    due = [code for code, next_run in next_runs.items() if next_run is None or next_run <= now]
+    due.sort(key=lambda code: next_runs[code] or datetime.min)
+    return due[:budget.affordable_fetches(used_today)]
+
+
+def schedule_next(now: datetime, interval: float, stretch: float) -> datetime:
+    return now + timedelta(seconds=interval * stretch)
@@ -0,0 +1,310 @@
+"""
+Viral-spike detection over snapshot windows.
+
+Every video in a country batch is scored at once: the recent VideoSnapshot history
+plus the incoming observation form a (videos x window) matrix, features are computed
+with NumPy column operations, and a pluggable detector turns them into spike flags.
+The per-batch cost is a handful of array operations, whatever the batch size.
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SPIKE_WINDOW_SIZE = int(os.getenv("SPIKE_WINDOW_SIZE", "12"))
+SPIKE_LOOKBACK_HOURS = int(os.getenv("SPIKE_LOOKBACK_HOURS", "72"))
+
+
+@dataclass(frozen=True)
+class SpikeThresholds:
+    # Floors that keep small videos from alerting on noise
+    min_views: int = 10_000
+    min_view_increase: int = 5_000
+    # Cold start: plain growth since the previous fetch, used until enough history exists
+    growth_ratio: float = 0.5
+    # Statistical rules need at least this many previous velocity points
+    min_history: int = 3
+    zscore: float = 3.0
+    ewma_alpha: float = 0.3
+    ewma_velocity_ratio: float = 2.0
+    # Velocity change per hour, relative to the previous velocity
+    min_relative_acceleration: float = 0.0
+
+
+class ThresholdConfig:
+    """
+    Resolves SpikeThresholds for a (country_code, category_id) pair, most specific first:
+    "US:10", then "US", then "*:10", then the default.
+
+    Configured through the SPIKE_THRESHOLDS environment variable as JSON, e.g.
+    {"default": {"min_views": 20000}, "IN": {"zscore": 4}, "*:10": {"min_views": 100000}}.
+    Each entry overrides only the fields it names.
+    """
+
+    def __init__(self, default: SpikeThresholds = SpikeThresholds(), overrides: Optional[Dict[str, SpikeThresholds]] = None):
+        self.default = default
+        self.overrides = overrides or {}
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Dict]) -> "ThresholdConfig":
+        valid = {f.name for f in fields(SpikeThresholds)}
+        for key, values in config.items():
+            unknown = set(values) - valid
+            if unknown:
+                raise ValueError(f"Unknown spike threshold fields for '{key}': {sorted(unknown)}")
+        default = replace(SpikeThresholds(), **config.get("default", {}))
+        overrides = {}
+        for key, values in config.items():
+            if key == "default":
+                continue
+            # Country-wide values apply beneath a more specific country:category entry
+            country = key.split(":")[0]
+            base = default
+            if ":" in key and country != "*" and country in config:
+                base = replace(default, **config[country])
+            overrides[key] = replace(base, **values)
+        return cls(default, overrides)
+
+    @classmethod
+    def from_env(cls) -> "ThresholdConfig":
+        raw = os.getenv("SPIKE_THRESHOLDS")
+        if not raw:
+            return cls()
+        try:
+            return cls.from_dict(json.loads(raw))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Invalid SPIKE_THRESHOLDS, using defaults: {e}")
+            return cls()
+
+    def resolve(self, country_code: str, category_id: Optional[str]) -> SpikeThresholds:
+        for key in (f"{country_code}:{category_id}", country_code, f"*:{category_id}"):
+            if key in self.overrides:
+                return self.overrides[key]
+        return self.default
+
+    def arrays(self, country_code: str, category_ids: Sequence[Optional[str]]) -> "ThresholdArrays":
+        """Per-row threshold arrays, resolved once per distinct category."""
+        keys = np.array([str(c) for c in category_ids], dtype=object)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        resolved = [self.resolve(country_code, key) for key in unique]
+        return ThresholdArrays(**{
+            f.name: np.array([getattr(t, f.name) for t in resolved], dtype=float)[inverse]
+            for f in fields(SpikeThresholds)
+        })
+
+
+@dataclass
+class ThresholdArrays:
+    min_views: np.ndarray
+    min_view_increase: np.ndarray
+    growth_ratio: np.ndarray
+    min_history: np.ndarray
+    zscore: np.ndarray
+    ewma_alpha: np.ndarray
+    ewma_velocity_ratio: np.ndarray
+    min_relative_acceleration: np.ndarray
+
+
+@dataclass
+class SnapshotWindow:
+    """
+    View counts for a batch of videos, one row per video. Rows are left-padded with NaN;
+    the last column is always the incoming observation.
+    """
+    video_ids: List[str]
+    hours: np.ndarray
+    views: np.ndarray
+
+    @classmethod
+    def build(
+        cls,
+        video_ids: Sequence[str],
+        current_views: Sequence[int],
+        current_time: datetime,
+        history: Iterable[Tuple[str, datetime, int]],
+        size: int = SPIKE_WINDOW_SIZE,
+    ) -> "SnapshotWindow":
+        """
+        `history` is (video_id, captured_at, view_count) ordered by video_id and captured_at,
+        as returned by crud.get_recent_snapshots. Only the last `size - 1` points per video are kept.
+        """
+        n = len(video_ids)
+        hours = np.full((n, size), np.nan)
+        views = np.full((n, size), np.nan)
+        hours[:, -1] = _to_hours(current_time)
+        views[:, -1] = np.asarray(current_views, dtype=float)
+
+        history = list(history)
+        if history:
+            index = {video_id: i for i, video_id in enumerate(video_ids)}
+            rows = np.array([index.get(video_id, -1) for video_id, _, _ in history])
+            points_hours = np.array([_to_hours(captured_at) for _, captured_at, _ in history])
+            points_views = np.array([view_count if view_count is not None else np.nan for _, _, view_count in history], dtype=float)
+
+            keep = rows >= 0
+            rows, points_hours, points_views = rows[keep], points_hours[keep], points_views[keep]
+            # Position of each point counted from the newest one of its video
+            order = np.lexsort((points_hours, rows))
+            rows, points_hours, points_views = rows[order], points_hours[order], points_views[order]
+            counts = np.bincount(rows, minlength=n)
+            ends = np.cumsum(counts)
+            from_end = ends[rows] - np.arange(len(rows))  # 1 for the newest point
+            keep = from_end <= size - 1
+            columns = size - 1 - from_end[keep]
+            hours[rows[keep], columns] = points_hours[keep]
+            views[rows[keep], columns] = points_views[keep]
+
+        return cls(list(video_ids), hours, views)
+
+
+def _to_hours(value: datetime) -> float:
+    # Naive timestamps are UTC throughout the app; drop tzinfo so both kinds compare
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return (value - datetime(1970, 1, 1)).total_seconds() / 3600
+
+
+@dataclass
+class SpikeFeatures:
+    views: np.ndarray
+    view_increase: np.ndarray
+    growth: np.ndarray
+    velocity: np.ndarray            # views/hour over the latest interval
+    history_points: np.ndarray      # number of previous velocity points
+    zscore: np.ndarray              # latest velocity against the previous ones
+    ewma_velocity: np.ndarray       # smoothed previous velocity
+    relative_acceleration: np.ndarray  # velocity change per hour, relative to the previous velocity
+
+    @classmethod
+    def compute(cls, window: SnapshotWindow, ewma_alpha: np.ndarray) -> "SpikeFeatures":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            views = window.views[:, -1]
+            previous_views = window.views[:, -2]
+            view_increase = views - previous_views
+            growth = np.where(previous_views > 0, view_increase / previous_views, np.nan)
+
+            dt = np.diff(window.hours, axis=1)
+            velocities = np.where(dt > 0, np.diff(window.views, axis=1) / dt, np.nan)
+            velocity = velocities[:, -1]
+            previous = velocities[:, :-1]
+
+            present = ~np.isnan(previous)
+            history_points = present.sum(axis=1)
+            denominator = np.maximum(history_points, 1)
+            mean = np.where(present, previous, 0).sum(axis=1) / denominator
+            std = np.sqrt(np.where(present, (previous - mean[:, None]) ** 2, 0).sum(axis=1) / denominator)
+            zscore = np.where((history_points > 0) & (std > 0), (velocity - mean) / std, np.nan)
+
+            ewma = np.full(len(velocity), np.nan)
+            for column in previous.T:
+                ewma = np.where(
+                    np.isnan(column), ewma,
+                    np.where(np.isnan(ewma), column, ewma_alpha * column + (1 - ewma_alpha) * ewma),
+                )
+
+            last_velocity = previous[:, -1] if previous.shape[1] else np.full(len(velocity), np.nan)
+            relative_acceleration = np.where(
+                last_velocity > 0, (velocity - last_velocity) / last_velocity / dt[:, -1], np.nan
+            )
+
+        return cls(views, view_increase, growth, velocity, history_points, zscore, ewma, relative_acceleration)
+
+
+class SpikeDetector:
+    """Turns SpikeFeatures into a boolean spike flag per video."""
+    name = "base"
+
+    def detect(self, features: SpikeFeatures, thresholds: ThresholdArrays) -> np.ndarray:
+        raise NotImplementedError
+
+
+class GrowthRatioDetector(SpikeDetector):
+    """The original rule: views grew by `growth_ratio` since the previous fetch."""
+    name = "growth"
+
+    def detect(self, features, thresholds):
+        with np.errstate(invalid="ignore"):
+            return features.growth >= thresholds.growth_ratio
+
+
+class ZScoreDetector(SpikeDetector):
+    name = "zscore"
+
+    def detect(self, features, thresholds):
+        with np.errstate(invalid="ignore"):
+            return (features.history_points >= thresholds.min_history) & (features.zscore >= thresholds.zscore)
+
+
+class EWMAVelocityDetector(SpikeDetector):
+    name = "ewma"
+
+    def detect(self, features, thresholds):
+        with np.errstate(invalid="ignore"):
+            return (
+                (features.history_points >= thresholds.min_history)
+                & (features.ewma_velocity > 0)
+                & (features.velocity >= thresholds.ewma_velocity_ratio * features.ewma_velocity)
+            )
+
+
+class AccelerationDetector(SpikeDetector):
+    name = "acceleration"
+
+    def detect(self, features, thresholds):
+        with np.errstate(invalid="ignore"):
+            return features.relative_acceleration > thresholds.min_relative_acceleration
+
+
+class CompositeDetector(SpikeDetector):
+    """
+    Default detector. Videos below the view floors never spike. With enough history a spike
+    is an outlier velocity (z-score or EWMA) that is still accelerating; before that, the
+    growth-ratio rule applies.
+    """
+    name = "composite"
+
+    def detect(self, features, thresholds):
+        with np.errstate(invalid="ignore"):
+            floors = (features.views >= thresholds.min_views) & (features.view_increase >= thresholds.min_view_increase)
+            has_history = features.history_points >= thresholds.min_history
+        statistical = (
+            (ZScoreDetector().detect(features, thresholds) | EWMAVelocityDetector().detect(features, thresholds))
+            & AccelerationDetector().detect(features, thresholds)
+        )
+        cold_start = GrowthRatioDetector().detect(features, thresholds)
+        return floors & np.where(has_history, statistical, cold_start)
+
+
+DETECTORS = {
+    detector.name: detector
+    for detector in (GrowthRatioDetector, ZScoreDetector, EWMAVelocityDetector, AccelerationDetector, CompositeDetector)
+}
+
+
+def get_detector(name: str) -> SpikeDetector:
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown spike detector '{name}'. Available: {', '.join(DETECTORS)}")
+    return DETECTORS[name]()
+
+
+class SpikeEngine:
+    """Scores a whole country batch with one detector and per country/category thresholds."""
+
+    def __init__(self, detector: SpikeDetector, thresholds: ThresholdConfig, window_size: int = SPIKE_WINDOW_SIZE):
+        self.detector = detector
+        self.thresholds = thresholds
+        self.window_size = window_size
+
+    def score(self, country_code: str, window: SnapshotWindow, category_ids: Sequence[Optional[str]]) -> np.ndarray:
+        thresholds = self.thresholds.arrays(country_code, category_ids)
+        features = SpikeFeatures.compute(window, thresholds.ewma_alpha)
+        return np.asarray(self.detector.detect(features, thresholds), dtype=bool)
+
+
+spike_engine = SpikeEngine(get_detector(os.getenv("SPIKE_DETECTOR", "composite")), ThresholdConfig.from_env())
@@ -0,0 +1,222 @@
+"""
+Archive of the raw trending chart responses, to rebuild history offline.
+
+Every fetch of a country's chart is stored as one compressed JSON-lines object, one line
+per page of videos.list items, under objects/ and named by the SHA-256 of its content,
+so an unchanged chart is stored once. index/{country}/{day}.jsonl records each fetch in
+the order it happened, with the object holding it.
+
+replay() feeds a range of archived fetches back through the normal ingestion path, on
+a process pool. A country's fetches are always stored in time order. Different
+countries' fetches are stored concurrently in waves, each wave holding at most one
+fetch per country, like a live ingestion cycle. Every stored page, live or replayed, is
+recorded in StoredFetchPage, and replays store only the pages missing from it. A fetch older than a video's chart row
+only adds to its history (see crud.add_or_update_trending_video_batch).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .categories import CategoryMap
+from .crud import (
+    add_or_update_trending_video_batch, get_region_categories, get_stored_pages, record_stored_pages,
+    refresh_country_stats,
+)
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Unset: responses are not archived
+RAW_ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR")
+# zstd needs the zstandard package; gzip is always available
+RAW_ARCHIVE_COMPRESSION = os.getenv("RAW_ARCHIVE_COMPRESSION", "gzip")
+
+EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    country_code: str
+    fetched_at: datetime
+    # Object path, relative to the archive root
+    object: str
+    pages: int
+    videos: int
+
+    def to_json(self) -> str:
+        return json.dumps({**asdict(self), "fetched_at": self.fetched_at.isoformat()})
+
+    @classmethod
+    def from_json(cls, line: str) -> "ArchiveEntry":
+        data = json.loads(line)
+        return cls(**{**data, "fetched_at": datetime.fromisoformat(data["fetched_at"])})
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, extension: str) -> bytes:
+    if extension == "zst":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class RawArchive:
+    def __init__(self, root: str, compression: str = "gzip"):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unknown archive compression '{compression}'. Supported: {', '.join(EXTENSIONS)}")
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                logger.warning("zstandard is not installed; archiving with gzip instead.")
+                compression = "gzip"
+        self.root = Path(root)
+        self.compression = compression
+
+    def write(self, country_code: str, fetched_at: datetime, pages: List[List[Dict[str, Any]]]) -> ArchiveEntry:
+        """Stores one fetch of a country's chart and appends it to the day's index."""
+        content = "".join(json.dumps(page, separators=(",", ":")) + "\n" for page in pages).encode()
+        digest = hashlib.sha256(content).hexdigest()
+        relative = f"objects/{digest[:2]}/{digest}.jsonl.{EXTENSIONS[self.compression]}"
+        path = self.root / relative
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside and renamed, so a crash never leaves a truncated object behind
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temporary:
+                temporary.write(_compress(content, self.compression))
+            os.replace(temporary.name, path)
+
+        entry = ArchiveEntry(country_code, fetched_at, relative, len(pages), sum(len(page) for page in pages))
+        index = self.root / "index" / country_code / f"{fetched_at.date().isoformat()}.jsonl"
+        index.parent.mkdir(parents=True, exist_ok=True)
+        with index.open("a") as file:
+            file.write(entry.to_json() + "\n")
+        return entry
+
+    def read(self, entry: ArchiveEntry) -> List[List[Dict[str, Any]]]:
+        """The pages of an archived fetch."""
+        data = _decompress((self.root / entry.object).read_bytes(), entry.object.rsplit(".", 1)[1])
+        return [json.loads(line) for line in data.splitlines() if line]
+
+    def countries(self) -> List[str]:
+        index = self.root / "index"
+        return sorted(path.name for path in index.iterdir() if path.is_dir()) if index.exists() else []
+
+    def entries(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                countries: Optional[Iterable[str]] = None) -> List[ArchiveEntry]:
+        """Archived fetches in [since, until), oldest first; only the index files of days in range are read."""
+        entries = []
+        for country_code in countries or self.countries():
+            for index in sorted((self.root / "index" / country_code).glob("*.jsonl")):
+                day = date.fromisoformat(index.stem)
+                if (since and day < since.date()) or (until and day > until.date()):
+                    continue
+                for line in index.read_text().splitlines():
+                    entry = ArchiveEntry.from_json(line)
+                    if (since is None or entry.fetched_at >= since) and (until is None or entry.fetched_at < until):
+                        entries.append(entry)
+        return sorted(entries, key=lambda entry: (entry.fetched_at, entry.country_code))
+
+
+def replay_waves(entries: List[ArchiveEntry]) -> List[List[ArchiveEntry]]:
+    """
+    Splits time-ordered entries into consecutive waves holding at most one entry per
+    country. A wave's entries can be stored concurrently; waves must run in order.
+    """
+    waves: List[List[ArchiveEntry]] = []
+    countries: set = set()
+    for entry in entries:
+        if not waves or entry.country_code in countries:
+            waves.append([])
+            countries = set()
+        waves[-1].append(entry)
+        countries.add(entry.country_code)
+    return waves
+
+
+_worker_archive: Optional[RawArchive] = None
+_worker_categories = CategoryMap()
+
+
+def _init_worker(root: str):
+    global _worker_archive, _worker_categories
+    _worker_archive = RawArchive(root)
+    db: Session = SessionLocal()
+    try:
+        _worker_categories = CategoryMap.build(0, *get_region_categories(db))
+    finally:
+        db.close()
+
+
+def _replay_entry(entry: ArchiveEntry) -> Tuple[bool, int]:
+    """
+    Stores the pages of an archived fetch that weren't stored before. Returns whether any
+    were, and their videos.
+    """
+    pages = _worker_archive.read(entry)
+    db: Session = SessionLocal()
+    try:
+        # Storing a page twice would duplicate its history
+        stored = get_stored_pages(db, entry.country_code, entry.fetched_at)
+        missing = [number for number, page in enumerate(pages) if page and number not in stored]
+        if not missing:
+            return False, 0
+        categories = _worker_categories.names(entry.country_code)
+        videos = sum(
+            len(add_or_update_trending_video_batch(db, pages[number], entry.country_code, categories,
+                                                   fetched_at=entry.fetched_at, commit=False))
+            for number in missing
+        )
+        # Committed with the pages, so a page is either stored and recorded or neither
+        record_stored_pages(db, entry.country_code, entry.fetched_at, missing, entry.object, "replay")
+        return True, videos
+    finally:
+        db.close()
+
+
+def replay(archive: RawArchive, since: Optional[datetime] = None, until: Optional[datetime] = None,
+           countries: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Re-ingests the archived fetches in [since, until) on `workers` processes (one per CPU by
+    default), then refreshes the per-country summaries. Pages already stored, live or by an
+    earlier replay, are skipped.
+    SQLite serializes writers, so the pool only speeds up replays into PostgreSQL.
+    """
+    entries = archive.entries(since, until, countries)
+    waves = replay_waves(entries)
+    stored = videos = 0
+    # Spawned, not forked: the workers open their own connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(str(archive.root),)) as pool:
+        for number, wave in enumerate(waves, 1):
+            for fetch_stored, fetch_videos in pool.map(_replay_entry, wave):
+                stored += fetch_stored
+                videos += fetch_videos
+            if number % 50 == 0:
+                logger.info(f"Replayed {number}/{len(waves)} waves, up to {wave[-1].fetched_at}.")
+
+    replayed = sorted({entry.country_code for entry in entries})
+    if replayed:
+        db: Session = SessionLocal()
+        try:
+            refresh_country_stats(db, replayed)
+        finally:
+            db.close()
+    return {"fetches": len(entries), "stored": stored, "waves": len(waves), "videos": videos}
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheBackend:
+    """
+    Minimal key/value interface shared by every worker process. Values are bytes;
+    `ttl` is in seconds.
+
+    Backends whose calls wait on the network set `blocking`; from async code, use the
+    a-prefixed methods, which then run the call on a worker thread. `shared` backends are
+    seen by every worker, so an invalidation made by one reaches all of them.
+    """
+
+    blocking = False
+    shared = False
+
+    async def run(self, fn, *args, **kwargs):
+        """Calls `fn`, on a worker thread if this backend is blocking."""
+        if self.blocking:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await self.run(self.get, key)
+
+    async def aset(self, key: str, value: bytes, ttl: Optional[int] = None):
+        await self.run(self.set, key, value, ttl=ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """
+    Process-local LRU backend. The default, and the right choice for a single worker.
+    With max_entries=None nothing is ever evicted.
+    """
+
+    def __init__(self, max_entries: Optional[int] = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while self.max_entries is not None and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend speaking the Redis protocol, shared by all workers and replicas.
+    Pass `client` to use an existing client (e.g. fakeredis.FakeRedis() in tests).
+    """
+
+    blocking = True
+    shared = True
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "yttrends:"):
+        if client is None:
+            import redis  # Only needed when a Redis cache is configured
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+
+def create_backend(url: Optional[str], max_entries: Optional[int] = 1024) -> CacheBackend:
+    """Builds the backend for a CACHE_URL: redis:// or rediss:// URLs, otherwise in-memory."""
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return InMemoryBackend(max_entries=max_entries)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header value covers this response."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+class ResponseCache:
+    """
+    Cache of pre-serialized JSON responses on top of a CacheBackend. Keys are tuples whose
+    first element is the country code. Every country has a generation marker in the
+    backend that is part of each key, so replacing it invalidates the country's entries
+    in every worker at once; stale entries age out of the backend's LRU or TTL.
+    """
+
+    # Part of every key; bump it when the stored entry layout changes
+    FORMAT = "2"
+
+    def __init__(self, backend: CacheBackend, namespace: str = "responses", ttl: Optional[int] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        # Counters are per worker
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self, country_code: str) -> bytes:
+        key = f"{self.namespace}:{country_code}:generation"
+        generation = self.backend.get(key)
+        if generation is None:
+            # Never fall back to a fixed value: if the counter was evicted, entries
+            # written under that value could be stale
+            generation = str(time.time_ns()).encode()
+            self.backend.set(key, generation)
+        return generation
+
+    def _key(self, key: Tuple[Any, ...]) -> str:
+        country_code = key[0]
+        parts = ":".join(str(part) for part in key[1:])
+        return f"{self.namespace}:{country_code}:{self._generation(country_code).decode()}:v{self.FORMAT}:{parts}"
+
+    def lookup(self, key: Tuple[Any, ...]) -> Tuple[str, Optional[CachedResponse]]:
+        """
+        The backend key of `key` under the country's current generation, and the entry
+        stored there. Pass that backend key to set() on a miss: an invalidation made in
+        between then leaves the response in the old generation instead of the new one.
+        """
+        backend_key = self._key(key)
+        value = self.backend.get(backend_key)
+        if value is None:
+            self.misses += 1
+            return backend_key, None
+        self.hits += 1
+        etag, headers, body = value.split(b"\n", 2)
+        return backend_key, CachedResponse(body, etag.decode(), json.loads(headers))
+
+    def set(self, backend_key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Stores a response body and the extra headers to send with it, under a key from lookup()."""
+        entry = CachedResponse(body, f'"{hashlib.sha1(body).hexdigest()}"', headers or {})
+        value = b"\n".join([entry.etag.encode(), json.dumps(entry.headers).encode(), body])
+        self.backend.set(backend_key, value, ttl=self.ttl)
+        return entry
+
+    def invalidate_country(self, country_code: str):
+        self.backend.set(f"{self.namespace}:{country_code}:generation", str(time.time_ns()).encode())
+
+    # For async callers: a lookup is two backend round trips, made on one worker thread
+    # when the backend blocks
+
+    async def alookup(self, key: Tuple[Any, ...]) -> Tuple[str, Optional[CachedResponse]]:
+        return await self.backend.run(self.lookup, key)
+
+    async def aset(self, backend_key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        return await self.backend.run(self.set, backend_key, body, headers)
+
+    async def ainvalidate_country(self, country_code: str):
+        await self.backend.run(self.invalidate_country, country_code)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+        }
@@ -0,0 +1,148 @@
+"""
+Video category names per region, kept in memory for ingestion.
+
+Categories are fetched per region (videoCategories.list) and stored in video_categories
+only where they changed. The service publishes them as an immutable, versioned
+CategoryMap: readers take `service.current` once and see a consistent snapshot without
+touching the database, and a refresh swaps in a new map rather than mutating the old one.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy.orm import Session
+
+from .crud import get_region_categories, save_region_categories
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+FetchCategoriesFn = Callable[[str], Dict[str, str]]
+ChangedHook = Callable[["CategoryMap"], Awaitable[None]]
+
+@dataclass(frozen=True)
+class CategoryMap:
+    """One published version of every region's {category_id: name}."""
+    version: int = 0
+    regions: Mapping[str, Mapping[str, str]] = field(default_factory=lambda: MappingProxyType({}))
+    refreshed_at: Mapping[str, datetime] = field(default_factory=lambda: MappingProxyType({}))
+    # Names from every region, for regions not loaded yet; ids are the same across regions
+    fallback: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def build(cls, version: int, regions: Dict[str, Dict[str, str]], refreshed_at: Dict[str, datetime]) -> "CategoryMap":
+        fallback: Dict[str, str] = {}
+        for categories in regions.values():
+            for category_id, name in categories.items():
+                fallback.setdefault(category_id, name)
+        return cls(
+            version=version,
+            regions=MappingProxyType({code: MappingProxyType(dict(categories)) for code, categories in regions.items()}),
+            refreshed_at=MappingProxyType(dict(refreshed_at)),
+            fallback=MappingProxyType(fallback),
+        )
+
+    def names(self, country_code: str) -> Mapping[str, str]:
+        """{category_id: name} for a region, falling back to every region's names."""
+        return self.regions.get(country_code) or self.fallback
+
+    def __len__(self) -> int:
+        return len(self.fallback)
+
+    def stale_regions(self, countries: Iterable[str], max_age: timedelta, now: Optional[datetime] = None) -> List[str]:
+        now = now or datetime.utcnow()
+        return [
+            code for code in countries
+            if code not in self.refreshed_at or now - self.refreshed_at[code] > max_age
+        ]
+
+
+class CategoryService:
+    """
+    Keeps the published CategoryMap up to date for `countries`.
+
+    `load` reads what is stored (one query per table). `refresh` fetches the regions whose
+    list is older than `max_age` concurrently on threads, at most `concurrency` at a time,
+    writes only the changes and publishes a new version. A region whose fetch fails keeps
+    its previous categories and is retried on the next refresh.
+
+    Other workers' services only see stored changes when they `load` again; `on_change`,
+    if given, is awaited with the new map after a refresh that changed it, so the caller
+    can tell them to.
+    """
+
+    def __init__(
+        self,
+        fetch: FetchCategoriesFn,
+        countries: List[str],
+        max_age: timedelta,
+        concurrency: int = 4,
+        on_change: Optional[ChangedHook] = None,
+    ):
+        self.fetch = fetch
+        self.countries = countries
+        self.max_age = max_age
+        self.concurrency = max(1, concurrency)
+        self.on_change = on_change
+        self._current = CategoryMap()
+        self._lock = asyncio.Lock()
+
+    @property
+    def current(self) -> CategoryMap:
+        return self._current
+
+    def load(self) -> CategoryMap:
+        """Publishes the stored categories as a new version if they changed. Blocking."""
+        db: Session = SessionLocal()
+        try:
+            regions, refreshed_at = get_region_categories(db)
+        finally:
+            db.close()
+        if regions == self._current.regions and refreshed_at == self._current.refreshed_at:
+            return self._current
+        self._current = CategoryMap.build(self._current.version + 1, regions, refreshed_at)
+        return self._current
+
+    async def refresh(self, force: bool = False) -> CategoryMap:
+        """Refreshes the stale regions (every region with `force`) and publishes the result."""
+        async with self._lock:
+            # Another worker may have refreshed them already
+            current = await asyncio.to_thread(self.load)
+            due = list(self.countries) if force else current.stale_regions(self.countries, self.max_age)
+            if not due:
+                return current
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            refreshed = await asyncio.gather(*(self._refresh_region(code, semaphore) for code in due))
+            if any(refreshed):
+                previous, current = current, await asyncio.to_thread(self.load)
+                if current is not previous and self.on_change is not None:
+                    await self.on_change(current)
+            logger.info(f"Refreshed video categories for {sum(refreshed)}/{len(due)} regions (version {current.version}).")
+            return current
+
+    async def _refresh_region(self, country_code: str, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            try:
+                categories = await asyncio.to_thread(self.fetch, country_code)
+                if not categories:
+                    logger.warning(f"No video categories returned for {country_code}; keeping the stored ones.")
+                    return False
+                changed = await asyncio.to_thread(self._save, country_code, categories)
+                if changed:
+                    logger.info(f"{changed} video categories changed for {country_code}.")
+                return True
+            except Exception as e:
+                logger.error(f"Error refreshing video categories for {country_code}: {e}")
+                return False
+
+    @staticmethod
+    def _save(country_code: str, categories: Dict[str, str]) -> int:
+        db: Session = SessionLocal()
+        try:
+            return save_region_categories(db, country_code, categories)
+        finally:
+            db.close()
@@ -0,0 +1,77 @@
+"""
+Command-line tools.
+
+    python -m app.cli export trending --format parquet --country US --since 2026-10-01 -o us.parquet
+    python -m app.cli replay --since 2026-07-01 --until 2026-10-01 --workers 8
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from .archive import RAW_ARCHIVE_DIR, RawArchive, replay
+from .database import engine
+from .export import DATASETS, EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, export
+
+
+def run_export(args: argparse.Namespace) -> int:
+    try:
+        chunks = export(
+            engine, args.dataset, args.format, chunk_size=args.chunk_size,
+            country_code=args.country, since=args.since, until=args.until, category_id=args.category,
+        )
+        output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+    except ExportError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def run_replay(args: argparse.Namespace) -> int:
+    if not args.archive_dir:
+        print("error: no archive; set RAW_ARCHIVE_DIR or pass --archive-dir", file=sys.stderr)
+        return 2
+    countries = args.country.split(",") if args.country else None
+    stats = replay(RawArchive(args.archive_dir), args.since, args.until, countries, args.workers)
+    print(f"Replayed {stats['fetches']} fetches in {stats['waves']} waves: {stats['stored']} stored "
+          f"({stats['videos']} videos), {stats['fetches'] - stats['stored']} already stored or empty.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Stream a dataset to a CSV, Parquet or Arrow IPC file.")
+    export_parser.add_argument("dataset", choices=list(DATASETS))
+    export_parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    export_parser.add_argument("--country", help="Country code to export; all countries by default.")
+    export_parser.add_argument("--category", help="Category id to export; all categories by default.")
+    export_parser.add_argument("--since", type=datetime.fromisoformat, help="Earliest time (UTC, inclusive).")
+    export_parser.add_argument("--until", type=datetime.fromisoformat, help="Latest time (UTC, exclusive).")
+    export_parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows read and written at a time.")
+    export_parser.add_argument("-o", "--output", default="-", help="Output file; standard output by default.")
+    export_parser.set_defaults(run=run_export)
+
+    replay_parser = commands.add_parser("replay", help="Re-ingest archived trending charts, oldest first.")
+    replay_parser.add_argument("--since", type=datetime.fromisoformat, help="Earliest fetch time (UTC, inclusive).")
+    replay_parser.add_argument("--until", type=datetime.fromisoformat, help="Latest fetch time (UTC, exclusive).")
+    replay_parser.add_argument("--country", help="Comma-separated country codes; every archived country by default.")
+    replay_parser.add_argument("--workers", type=int, help="Worker processes; one per CPU by default.")
+    replay_parser.add_argument("--archive-dir", default=RAW_ARCHIVE_DIR, help="Archive root; RAW_ARCHIVE_DIR by default.")
+    replay_parser.set_defaults(run=run_replay)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,120 @@
+import hashlib
+import json
 from fastapi import logger
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-from .models import TrendingVideo, VideoDailyMetric
+from sqlalchemy import String, and_, case, cast, func, insert, literal_column, null, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, contains_eager
+from .models import TrendingVideo, Video, VideoAlert, VideoDailyMetric, VideoSnapshot
 from .schemas import TrendingVideoCreate
-from typing import List, Dict, Any, Optional
-from datetime import datetime, date, timedelta
-from .models import VideoCategory, VideoCategoryCache
+from typing import List, Dict, Any, Optional, Set, Tuple
+from datetime import datetime, date, timedelta, timezone
+from .models import VideoCategory, CategoryRefresh, SchedulerLease, CountryFetchState, QuotaUsage, CountryStats
+from .models import PropagationLagBucket, VideoRegionFirstSeen, VideoSpread
+from .models import CategoryRollup, ChannelRollup, LeaderboardMember, StoredFetchPage, StreamEvent
+from .leaderboards import LEADERBOARD_PERIODS, period_start
+from .propagation import lag_bucket
+from .tracing import span
+from .anomaly import SPIKE_LOOKBACK_HOURS, SnapshotWindow, SpikeEngine, spike_engine
 
-def get_trending_videos(db: Session, country_code: str, skip: int = 0, limit: int = 100) -> List[TrendingVideo]:
-    """Retrieves the latest trending videos for a specific country."""
-    return db.query(TrendingVideo).filter(TrendingVideo.country_code == country_code).order_by(TrendingVideo.fetched_at.desc()).offset(skip).limit(limit).all()
+# Chart orderings, all descending with id as the tiebreak. Each expression must match its
+# (country_code, key, id) index in models.TrendingVideo for keyset pages to use it.
+TRENDING_SORTS = {
+    "fetched_at": TrendingVideo.fetched_at,
+    "views": TrendingVideo.view_count,
+    "view_change": func.coalesce(TrendingVideo.view_count_change, literal_column("0")),
+    "like_ratio": TrendingVideo.like_ratio,
+}
+
+def trending_sort_key(video: TrendingVideo, sort: str) -> Tuple[Any, int]:
+    """The (sort value, id) of a row under TRENDING_SORTS[sort], i.e. what a cursor after it carries."""
+    if sort == "view_change":
+        return video.view_count_change or 0, video.id
+    return getattr(video, TRENDING_SORTS[sort].key), video.id
+
+def trending_videos_query(query, country_code: str, spikes_only: bool = False, sort: str = "fetched_at", after: Optional[Tuple[Any, int]] = None):
+    """
+    Applies the chart filters and ordering to a TrendingVideo query (a Query or a select()).
+    `after` is the (sort value, id) of the last row already returned; the page then starts
+    right after it in the index instead of counting past an OFFSET.
+    """
+    key = TRENDING_SORTS[sort]
+    query = query.filter(TrendingVideo.country_code == country_code)
+    if spikes_only:
+        # Must match the partial index predicate exactly for the planner to use it
+        query = query.filter(TrendingVideo.is_viral_spike.is_(True))
+    if after is not None:
+        query = query.filter(tuple_(key, TrendingVideo.id) < tuple_(*after))
+    return query.order_by(key.desc(), TrendingVideo.id.desc())
+
+def get_trending_videos(db: Session, country_code: str, skip: int = 0, limit: int = 100, spikes_only: bool = False, sort: str = "fetched_at", after: Optional[Tuple[Any, int]] = None) -> List[TrendingVideo]:
+    """
+    Retrieves the trending videos for a specific country in `sort` order, optionally only
+    those currently flagged as viral spikes (served by the partial ix_trending_videos_active_spikes_id).
+    Pass `after` to continue from a previous page; `skip` is kept for older clients.
+    """
+    query = trending_videos_query(db.query(TrendingVideo), country_code, spikes_only, sort, after)
+    return query.offset(skip).limit(limit).all()
+
+# Where the database has no full-text index (anything but PostgreSQL), search falls back to
+# case-insensitive substring matching, ranked by which fields each term matched in
+SEARCH_FIELD_WEIGHTS = (
+    (Video.title, 1.0),
+    (cast(Video.tags, String), 0.4),
+    (Video.description, 0.1),
+)
+
+def search_videos_query(text: str, dialect: str, country_code: Optional[str] = None, category_id: Optional[str] = None, after: Optional[Tuple[float, int]] = None, limit: int = 20):
+    """
+    SELECT of (TrendingVideo, rank) rows matching `text`, best match first with id as the
+    tiebreak. On PostgreSQL `text` is parsed with websearch_to_tsquery ("quoted phrases",
+    or, -excluded) and matched against the GIN-indexed videos.search_vector column (see
+    migrations 0007 and 0009), ranked with ts_rank_cd; elsewhere every word must appear in
+    the title, tags or description. `after` is the (rank, id) of the last row already returned.
+    """
+    if dialect == "postgresql":
+        ts_query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), text)
+        search_vector = literal_column("videos.search_vector")
+        match = search_vector.op("@@")(ts_query)
+        rank = func.ts_rank_cd(search_vector, ts_query)
+    else:
+        terms = text.lower().split()
+        match = and_(*(
+            or_(*(func.lower(field).contains(term, autoescape=True) for field, _ in SEARCH_FIELD_WEIGHTS))
+            for term in terms
+        ))
+        rank = sum(
+            case((func.lower(field).contains(term, autoescape=True), weight), else_=0.0)
+            for term in terms
+            for field, weight in SEARCH_FIELD_WEIGHTS
+        )
+
+    # The join also loads each row's Video, instead of the relationship joining it a second time
+    query = select(TrendingVideo, rank.label("rank")).join(TrendingVideo.video).options(
+        contains_eager(TrendingVideo.video)
+    ).filter(match)
+    if country_code:
+        query = query.filter(TrendingVideo.country_code == country_code)
+    if category_id:
+        query = query.filter(TrendingVideo.category_id == category_id)
+    if after is not None:
+        query = query.filter(tuple_(rank, TrendingVideo.id) < tuple_(*after))
+    return query.order_by(rank.desc(), TrendingVideo.id.desc()).limit(limit)
+
+def search_videos(db: Session, text: str, country_code: Optional[str] = None, category_id: Optional[str] = None, after: Optional[Tuple[float, int]] = None, limit: int = 20) -> List[Tuple[TrendingVideo, float]]:
+    """Full-text search over trending videos; see search_videos_query."""
+    query = search_videos_query(text, db.get_bind().dialect.name, country_code, category_id, after, limit)
+    return [(video, rank) for video, rank in db.execute(query)]
 
 def get_video_by_id_and_country(db: Session, video_id: str, country_code: str) -> TrendingVideo | None:
     """Retrieves a specific video by its ID and country."""
     return db.query(TrendingVideo).filter(TrendingVideo.video_id == video_id, TrendingVideo.country_code == country_code).order_by(TrendingVideo.fetched_at.desc()).first()
 
 def create_trending_video(db: Session, video: TrendingVideoCreate) -> TrendingVideo:
-    db_video = TrendingVideo(**video.model_dump())
+    values = video.model_dump()
+    metadata = {column: values.pop(column) for column in VIDEO_METADATA_COLUMNS}
+    db.merge(Video(video_id=video.video_id, **metadata, content_hash=_metadata_hash(metadata), updated_at=datetime.utcnow()))
+    db_video = TrendingVideo(**values)
     db.add(db_video)
     db.commit()
     db.refresh(db_video)
@@ -29,89 +127,435 @@ def update_trending_video(db: Session, db_video: TrendingVideo, update_data: Dic
     db.refresh(db_video)
     return db_video
 
-def add_or_update_trending_video_batch(db: Session, videos_data: List[Dict[str, Any]], country_code: str, categories: Dict[str, str]):
+# Video columns, kept off the per-country chart rows
+VIDEO_METADATA_COLUMNS = ("title", "description", "tags", "thumbnail_url")
+
+def _metadata_hash(values: Dict[str, Any]) -> str:
+    """Digest of a video's VIDEO_METADATA_COLUMNS, stored as Video.content_hash."""
+    content = json.dumps([values[column] for column in VIDEO_METADATA_COLUMNS], separators=(",", ":"))
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+def _parse_video_item(video_item: Dict[str, Any], country_code: str, categories: Dict[str, str], fetched_at: datetime) -> Dict[str, Any]:
+    """Maps a videos.list item onto TrendingVideo and VIDEO_METADATA_COLUMNS columns."""
+    snippet = video_item.get("snippet", {})
+    statistics = video_item.get("statistics", {})
+    category_id = snippet.get("categoryId")
+    view_count = int(statistics.get("viewCount", 0))
+    like_count = int(statistics.get("likeCount", 0))
+    return {
+        "video_id": video_item["id"],
+        "title": snippet.get("title"),
+        "description": snippet.get("description"),
+        "published_at": datetime.fromisoformat(snippet["publishedAt"].replace('Z', '+00:00')),
+        "channel_id": snippet.get("channelId"),
+        "channel_title": snippet.get("channelTitle"),
+        "category_id": category_id,
+        "category_name": categories.get(category_id, "Unknown"),
+        "view_count": view_count,
+        "like_count": like_count,
+        "comment_count": int(statistics.get("commentCount", 0)),
+        "like_ratio": like_count / view_count if view_count else 0.0,
+        "tags": snippet.get("tags"),
+        "thumbnail_url": snippet.get("thumbnails", {}).get("high", {}).get("url"),
+        "country_code": country_code,
+        "fetched_at": fetched_at
+    }
+
+def get_recent_snapshots(db: Session, country_code: str, video_ids: List[str], since: datetime, until: datetime) -> List[Tuple[str, datetime, int]]:
+    """Returns (video_id, captured_at, view_count) for the given videos, ordered by video and time."""
+    if not video_ids:
+        return []
+    return db.query(VideoSnapshot.video_id, VideoSnapshot.captured_at, VideoSnapshot.view_count).filter(
+        VideoSnapshot.country_code == country_code,
+        VideoSnapshot.video_id.in_(video_ids),
+        VideoSnapshot.captured_at >= since,
+        VideoSnapshot.captured_at < until
+    ).order_by(VideoSnapshot.video_id, VideoSnapshot.captured_at).all()
+
+def _score_spikes(db: Session, country_code: str, rows: List[Dict[str, Any]], current_time: datetime, engine: Optional[SpikeEngine] = None):
+    """Sets is_viral_spike on every row, scoring the whole batch against its snapshot history at once."""
+    if not rows:
+        return
+    engine = engine or spike_engine
+    video_ids = [row["video_id"] for row in rows]
+    history = get_recent_snapshots(db, country_code, video_ids, current_time - timedelta(hours=SPIKE_LOOKBACK_HOURS), current_time)
+    window = SnapshotWindow.build(video_ids, [row["view_count"] for row in rows], current_time, history, engine.window_size)
+    flags = engine.score(country_code, window, [row["category_id"] for row in rows])
+    for row, flag in zip(rows, flags):
+        row["is_viral_spike"] = bool(flag)
+
+def _dialect_insert(db: Session):
+    """Returns the dialect-specific insert() construct supporting ON CONFLICT, or None."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    return None
+
+def _is_newer(stored_at: Optional[datetime], fetched_at: datetime) -> bool:
+    """Whether a stored time is later than a naive UTC fetch time."""
+    if stored_at is None:
+        return False
+    if stored_at.tzinfo is not None:
+        stored_at = stored_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return stored_at > fetched_at
+
+def _append_snapshots(db: Session, rows: List[Dict[str, Any]]):
+    """Appends one VideoSnapshot per upserted row, in the caller's transaction."""
+    if not rows:
+        return
+    db.execute(insert(VideoSnapshot), [
+        {
+            "video_id": row["video_id"],
+            "country_code": row["country_code"],
+            "captured_at": row["fetched_at"],
+            "view_count": row["view_count"],
+            "like_count": row["like_count"],
+            "comment_count": row["comment_count"],
+        }
+        for row in rows
+    ])
+
+def _save_video_metadata(db: Session, rows: List[Dict[str, Any]]) -> int:
     """
-    Adds new trending videos or updates existing ones, including anomaly detection.
+    Writes the Video row of each video in a batch whose metadata hash differs from the
+    stored one, in the caller's transaction. Unchanged videos, nearly all of them from one
+    cycle to the next, are not written at all. Returns the number of rows written.
     """
-    processed_video_ids = set()
-    
-    try:
-        for video_item in videos_data:
-            snippet = video_item.get("snippet", {})
-            statistics = video_item.get("statistics", {})
-
-            video_id = video_item["id"]
-            title = snippet.get("title")
-            description = snippet.get("description")
-            published_at = datetime.fromisoformat(snippet["publishedAt"].replace('Z', '+00:00'))
-            channel_id = snippet.get("channelId")
-            channel_title = snippet.get("channelTitle")
-            category_id = snippet.get("categoryId")
-            category_name = categories.get(category_id, "Unknown")
-            view_count = int(statistics.get("viewCount", 0))
-            like_count = int(statistics.get("likeCount", 0))
-            comment_count = int(statistics.get("commentCount", 0))
-            tags = snippet.get("tags")
-            thumbnail_url = snippet.get("thumbnails", {}).get("high", {}).get("url")
-
-            existing_video = db.query(TrendingVideo).filter(
-                TrendingVideo.video_id == video_id,
-                TrendingVideo.country_code == country_code
-            ).order_by(TrendingVideo.fetched_at.desc()).first()
-
-            # Set current timestamp for fetched_at
-            current_time = datetime.utcnow()
-            
-            new_video_data = {
-                "video_id": video_id,
-                "title": title,
-                "description": description,
-                "published_at": published_at,
-                "channel_id": channel_id,
-                "channel_title": channel_title,
-                "category_id": category_id,
-                "category_name": category_name,
-                "view_count": view_count,
-                "like_count": like_count,
-                "comment_count": comment_count,
-                "tags": tags,
-                "thumbnail_url": thumbnail_url,
-                "country_code": country_code,
-                "fetched_at": current_time
-            }
+    videos = {}
+    for row in rows:
+        metadata = {column: row[column] for column in VIDEO_METADATA_COLUMNS}
+        videos[row["video_id"]] = {
+            "video_id": row["video_id"], **metadata,
+            "content_hash": _metadata_hash(metadata), "updated_at": row["fetched_at"],
+        }
+    if not videos:
+        return 0
+    stored = dict(db.query(Video.video_id, Video.content_hash).filter(Video.video_id.in_(list(videos))))
+    # Sorted so concurrent country batches sharing videos lock them in the same order
+    changed = sorted(
+        (values for video_id, values in videos.items() if stored.get(video_id) != values["content_hash"]),
+        key=lambda values: values["video_id"],
+    )
+    if not changed:
+        return 0
 
-            if existing_video:
-                # Update existing video's latest data
-                new_video_data["previous_view_count"] = existing_video.view_count
-                view_count_change = view_count - existing_video.view_count
-                new_video_data["view_count_change"] = view_count_change
-
-                # Anomaly Detection (Simple example: 50% view increase)
-                viral_spike_threshold = 0.5  # 50% increase
-                if existing_video.view_count > 0 and (view_count_change / existing_video.view_count) >= viral_spike_threshold:
-                    new_video_data["is_viral_spike"] = True
-                    new_video_data["alert_triggered"] = False # Reset to allow new alerts if it keeps spiking
-                else:
-                    new_video_data["is_viral_spike"] = False
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        table = Video.__table__
+        stmt = dialect_insert(table)
+        # Another country's batch may have written the same metadata since the lookup
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.video_id],
+            set_={column: stmt.excluded[column] for column in (*VIDEO_METADATA_COLUMNS, "content_hash", "updated_at")},
+            # A replayed older fetch never replaces newer metadata
+            where=and_(table.c.content_hash.is_distinct_from(stmt.excluded.content_hash),
+                       table.c.updated_at <= stmt.excluded.updated_at),
+        )
+        db.execute(stmt, changed)
+    else:
+        db.bulk_insert_mappings(Video, [values for values in changed if values["video_id"] not in stored])
+        updates = [values for values in changed if values["video_id"] in stored]
+        if updates:
+            # A batch shares one fetch time
+            newer = {video_id for (video_id,) in db.query(Video.video_id).filter(
+                Video.video_id.in_([values["video_id"] for values in updates]),
+                Video.updated_at > updates[0]["updated_at"],
+            )}
+            db.bulk_update_mappings(Video, [values for values in updates if values["video_id"] not in newer])
+    return len(changed)
 
-                # Update the existing video
-                for key, value in new_video_data.items():
-                    setattr(existing_video, key, value)
+def _record_region_spread(db: Session, country_code: str, rows: List[Dict[str, Any]]):
+    """
+    Records the videos of a country batch that trend in the country for the first time, in the
+    caller's transaction: their VideoRegionFirstSeen row, the region count and origin on
+    VideoSpread, and the lag behind the origin in PropagationLagBucket. Countries are ingested
+    concurrently, so the VideoSpread and bucket writes are atomic upserts where supported.
+    """
+    batch = {}
+    for row in rows:
+        batch.setdefault(row["video_id"], row)
+    if not batch:
+        return
+    # Each country is only ever ingested by one worker at a time, so a plain lookup is enough here
+    seen = {
+        video_id for (video_id,) in db.query(VideoRegionFirstSeen.video_id).filter(
+            VideoRegionFirstSeen.country_code == country_code,
+            VideoRegionFirstSeen.video_id.in_(list(batch))
+        )
+    }
+    new_rows = [row for video_id, row in batch.items() if video_id not in seen]
+    if not new_rows:
+        return
+
+    # Sorted so concurrent country batches sharing videos lock them in the same order
+    spread = sorted((
+        {
+            "video_id": row["video_id"],
+            "origin_country": country_code,
+            "first_seen_at": row["fetched_at"],
+            "last_spread_at": row["fetched_at"],
+            "region_count": 1,
+            "title": row["title"],
+            "channel_title": row["channel_title"],
+        }
+        for row in new_rows
+    ), key=lambda values: values["video_id"])
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        table = VideoSpread.__table__
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.video_id],
+            set_={"region_count": table.c.region_count + 1, "last_spread_at": stmt.excluded.last_spread_at},
+        ).returning(table.c.video_id, table.c.origin_country, table.c.first_seen_at)
+        origins = {video_id: (origin, first_seen) for video_id, origin, first_seen in db.execute(stmt, spread)}
+    else:
+        origins = {}
+        for values in spread:
+            video = db.get(VideoSpread, values["video_id"])
+            if video is None:
+                video = VideoSpread(**values)
+                db.add(video)
             else:
-                # Create a new entry
-                db_video = TrendingVideo(**new_video_data)
-                db.add(db_video)
-            
-            processed_video_ids.add(video_id)
-        
-        # Commit all changes in one transaction
+                video.region_count += 1
+                video.last_spread_at = values["last_spread_at"]
+            origins[video.video_id] = (video.origin_country, video.first_seen_at)
+        db.flush()
+
+    first_seen = []
+    lags: Dict[Tuple[str, int], int] = {}
+    for row in new_rows:
+        origin, origin_seen_at = origins[row["video_id"]]
+        lag = None
+        if origin != country_code:
+            lag = max(0.0, (row["fetched_at"] - origin_seen_at).total_seconds())
+            key = (origin, lag_bucket(lag))
+            lags[key] = lags.get(key, 0) + 1
+        first_seen.append({
+            "video_id": row["video_id"],
+            "country_code": country_code,
+            "first_seen_at": row["fetched_at"],
+            "origin_country": origin,
+            "lag_seconds": lag,
+        })
+    db.execute(insert(VideoRegionFirstSeen), first_seen)
+
+    buckets = [
+        {"origin_country": origin, "country_code": country_code, "bucket_seconds": bucket, "videos": videos}
+        for (origin, bucket), videos in lags.items()
+    ]
+    if not buckets:
+        return
+    if dialect_insert is not None:
+        stmt = dialect_insert(PropagationLagBucket)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PropagationLagBucket.origin_country, PropagationLagBucket.country_code, PropagationLagBucket.bucket_seconds],
+            set_={"videos": PropagationLagBucket.videos + stmt.excluded.videos},
+        )
+        db.execute(stmt, buckets)
+    else:
+        for values in buckets:
+            bucket = db.get(PropagationLagBucket, (values["origin_country"], country_code, values["bucket_seconds"]))
+            if bucket is None:
+                db.add(PropagationLagBucket(**values))
+            else:
+                bucket.videos += values["videos"]
+
+def _increment_rollups(db: Session, model, label: str, rollups: List[Dict[str, Any]]):
+    """Adds each dict's videos and appearances to its `model` rollup row, creating missing rows."""
+    table = model.__table__
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_={
+                "videos": table.c.videos + stmt.excluded.videos,
+                "appearances": table.c.appearances + stmt.excluded.appearances,
+                # A replayed older fetch keeps the newer label and last_seen_at
+                label: case((table.c.last_seen_at > stmt.excluded.last_seen_at, table.c[label]), else_=stmt.excluded[label]),
+                "last_seen_at": case((table.c.last_seen_at > stmt.excluded.last_seen_at, table.c.last_seen_at),
+                                     else_=stmt.excluded.last_seen_at),
+            },
+        )
+        db.execute(stmt, rollups)
+        return
+    for values in rollups:
+        rollup = db.get(model, tuple(values[column.name] for column in table.primary_key.columns))
+        if rollup is None:
+            db.add(model(**values))
+        else:
+            rollup.videos += values["videos"]
+            rollup.appearances += values["appearances"]
+            if rollup.last_seen_at <= values["last_seen_at"]:
+                setattr(rollup, label, values[label])
+                rollup.last_seen_at = values["last_seen_at"]
+
+def _update_leaderboards(db: Session, country_code: str, rows: List[Dict[str, Any]]):
+    """
+    Adds a country batch to the day and week channel and category rollups, in the caller's
+    transaction: one video for each video not yet counted in the period, and one appearance
+    for each video not yet counted that day (tracked in LeaderboardMember), so appearances
+    are days on the chart and don't depend on how often the country is fetched.
+    """
+    batch = {}
+    for row in rows:
+        batch.setdefault(row["video_id"], row)
+    if not batch:
+        return
+    fetched_at = next(iter(batch.values()))["fetched_at"]
+    periods = {period: period_start(period, fetched_at) for period in LEADERBOARD_PERIODS}
+    # Each country is only ever ingested by one worker at a time, so a plain lookup is enough here
+    counted = set(db.query(LeaderboardMember.period, LeaderboardMember.video_id).filter(
+        LeaderboardMember.country_code == country_code,
+        or_(*(and_(LeaderboardMember.period == period, LeaderboardMember.period_start == start)
+              for period, start in periods.items())),
+        LeaderboardMember.video_id.in_(list(batch))
+    ).all())
+    new_members = [
+        {"period": period, "period_start": start, "country_code": country_code, "video_id": video_id}
+        for period, start in periods.items()
+        for video_id in batch
+        if (period, video_id) not in counted
+    ]
+    if new_members:
+        db.execute(insert(LeaderboardMember), new_members)
+    new_videos = {(member["period"], member["video_id"]) for member in new_members}
+
+    channels: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    categories: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for period, start in periods.items():
+        for video_id, row in batch.items():
+            is_new = (period, video_id) in new_videos
+            is_new_today = ("day", video_id) in new_videos
+            for rollups, key, label in ((channels, "channel_id", "channel_title"), (categories, "category_id", "category_name")):
+                rollup = rollups.setdefault((period, row[key] or ""), {
+                    "period": period, "period_start": start, "country_code": country_code, key: row[key] or "",
+                    label: row[label], "videos": 0, "appearances": 0, "last_seen_at": fetched_at,
+                })
+                rollup["videos"] += is_new
+                rollup["appearances"] += is_new_today
+    _increment_rollups(db, ChannelRollup, "channel_title", list(channels.values()))
+    _increment_rollups(db, CategoryRollup, "category_name", list(categories.values()))
+
+def prune_leaderboard_members(db: Session, before: date) -> int:
+    """Deletes the LeaderboardMember rows of periods starting before `before`; returns how many."""
+    try:
+        deleted = db.query(LeaderboardMember).filter(LeaderboardMember.period_start < before).delete(synchronize_session=False)
         db.commit()
-        
+        return deleted
     except Exception as e:
-        # Rollback in case of any error
         db.rollback()
         raise e
 
+def _create_alerts(db: Session, spikes: List[Dict[str, Any]]):
+    """Writes one VideoAlert per spiking row, in the caller's transaction."""
+    if not spikes:
+        return
+    db.execute(insert(VideoAlert), [
+        {
+            "video_id": row["video_id"],
+            "country_code": row["country_code"],
+            "title": row["title"],
+            "category_id": row["category_id"],
+            "alert_type": "Viral Spike",
+            "current_views": row["view_count"],
+            "previous_views": row["previous_view_count"] or 0,
+            "view_change": row["view_count_change"] or 0,
+            "created_at": row["fetched_at"],
+        }
+        for row in spikes
+    ])
+
+def add_or_update_trending_video_batch(db: Session, videos_data: List[Dict[str, Any]], country_code: str, categories: Dict[str, str], fetched_at: Optional[datetime] = None, commit: bool = True):
+    """
+    Adds new trending videos or updates existing ones, including anomaly detection,
+    and appends a VideoSnapshot for every video and a VideoAlert for every spike in the
+    same transaction. Video metadata is only written where it changed (_save_video_metadata).
+
+    Spikes are scored for the whole batch by the spike engine before writing. The batch is then
+    written with INSERT ... ON CONFLICT (video_id, country_code) DO UPDATE, and previous_view_count
+    and view_count_change are computed in the database from the row being replaced. Dialects
+    without ON CONFLICT fall back to bulk_create_or_update_videos.
+
+    A row fetched later than `fetched_at` (a replayed older fetch) is not replaced: the video
+    only gets its snapshot and leaderboard counts, and raises no alert. With commit=False the
+    batch is flushed and left for the caller to commit.
+
+    Returns the batch's rows as column dicts, in chart order.
+    """
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        return bulk_create_or_update_videos(db, videos_data, country_code, categories, fetched_at=fetched_at, commit=commit)
+
+    current_time = fetched_at or datetime.utcnow()
+    with span("ingest.parse", country_code=country_code, videos=len(videos_data)):
+        # ON CONFLICT can't touch the same row twice in one statement, so keep the last occurrence
+        rows = {}
+        for video_item in videos_data:
+            row = _parse_video_item(video_item, country_code, categories, current_time)
+            row.update(previous_view_count=None, view_count_change=None, is_viral_spike=False, alert_triggered=False)
+            rows[row["video_id"]] = row
+        rows = list(rows.values())
+        _score_spikes(db, country_code, rows, current_time)
+
+    table = TrendingVideo.__table__
+    stmt = dialect_insert(table)
+    excluded = stmt.excluded
+    previous_views = table.c.view_count
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.video_id, table.c.country_code],
+        set_={
+            "published_at": excluded.published_at,
+            "channel_id": excluded.channel_id,
+            "channel_title": excluded.channel_title,
+            "category_id": excluded.category_id,
+            "category_name": excluded.category_name,
+            "view_count": excluded.view_count,
+            "like_count": excluded.like_count,
+            "comment_count": excluded.comment_count,
+            "like_ratio": excluded.like_ratio,
+            "fetched_at": excluded.fetched_at,
+            "previous_view_count": previous_views,
+            "view_count_change": excluded.view_count - previous_views,
+            "is_viral_spike": excluded.is_viral_spike,
+            "alert_triggered": excluded.is_viral_spike,
+        },
+        where=or_(table.c.fetched_at.is_(None), table.c.fetched_at <= excluded.fetched_at),
+    )
+
+    with span("ingest.upsert", country_code=country_code, rows=len(rows)):
+        try:
+            if rows:
+                _save_video_metadata(db, rows)
+                # One statement compiled once, sent as a batched executemany
+                written = db.execute(stmt.returning(
+                    table.c.video_id, table.c.previous_view_count, table.c.view_count_change
+                ), rows).all()
+                _append_snapshots(db, rows)
+                _record_region_spread(db, country_code, rows)
+                _update_leaderboards(db, country_code, rows)
+
+                # Rows left alone by the fetched_at guard are not returned
+                changes = {video_id: (previous, change) for video_id, previous, change in written}
+                for row in rows:
+                    row["previous_view_count"], row["view_count_change"] = changes.get(row["video_id"], (None, None))
+                _create_alerts(db, [row for row in rows if row["is_viral_spike"] and row["video_id"] in changes])
+
+            # Commit all changes in one transaction
+            if commit:
+                db.commit()
+            else:
+                db.flush()
+            return rows
+
+        except Exception as e:
+            # Rollback in case of any error
+            db.rollback()
+            raise e
+
 
 def get_daily_metrics_for_video(db: Session, video_id: str, country_code: str, days: int = 7) -> List[VideoDailyMetric]:
     """Retrieves daily metrics for a specific video."""
@@ -124,52 +568,152 @@ def get_daily_metrics_for_video(db: Session, video_id: str, country_code: str, d
         VideoDailyMetric.date <= end_date
     ).order_by(VideoDailyMetric.date).all()
 
-def get_alerts(db: Session, country_code: Optional[str] = None, triggered_since: Optional[datetime] = None) -> List[TrendingVideo]:
-    """Fetches videos that have triggered a viral spike alert."""
+def get_video_history(db: Session, video_id: str, country_code: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """
+    Returns the metrics series for a video between `start` and `end`, oldest first.
+    Days already rolled up come from VideoDailyMetric, recent ones from VideoSnapshot;
+    both reads are range scans on (video_id, country_code, time) indexes.
+    """
+    daily = db.query(VideoDailyMetric).filter(
+        VideoDailyMetric.video_id == video_id,
+        VideoDailyMetric.country_code == country_code,
+        VideoDailyMetric.date >= start,
+        VideoDailyMetric.date <= end
+    ).order_by(VideoDailyMetric.date).all()
+
+    snapshots = db.query(VideoSnapshot).filter(
+        VideoSnapshot.country_code == country_code,
+        VideoSnapshot.video_id == video_id,
+        VideoSnapshot.captured_at >= start,
+        VideoSnapshot.captured_at <= end
+    ).order_by(VideoSnapshot.captured_at).all()
+
+    history = [
+        {"captured_at": m.date, "view_count": m.view_count, "like_count": m.like_count,
+         "comment_count": m.comment_count, "granularity": "daily"}
+        for m in daily
+    ]
+    history.extend(
+        {"captured_at": s.captured_at, "view_count": s.view_count, "like_count": s.like_count,
+         "comment_count": s.comment_count, "granularity": "snapshot"}
+        for s in snapshots
+    )
+    return history
+
+def rollup_snapshots_to_daily(db: Session, older_than: datetime) -> int:
+    """
+    Rolls VideoSnapshot rows captured before `older_than` up into one VideoDailyMetric
+    row per video, country and day (keeping the highest counts), then deletes them.
+    `older_than` should be a midnight so only complete days are rolled up.
+    Returns the number of daily rows written.
+    """
+    day = func.date(VideoSnapshot.captured_at)
     try:
-        query = db.query(TrendingVideo).filter(
-            TrendingVideo.is_viral_spike == True, 
-            TrendingVideo.alert_triggered == False
-        )
-        
-        if country_code:
-            query = query.filter(TrendingVideo.country_code == country_code)
-        if triggered_since:
-            query = query.filter(TrendingVideo.fetched_at >= triggered_since)
-        
-        # Fetch alerts first
-        alerts = query.all()
-        
-        # Mark alerts as triggered after fetching to avoid re-alerting on the same spike
-        for alert in alerts:
-            alert.alert_triggered = True
-        
+        grouped = db.query(
+            VideoSnapshot.video_id,
+            VideoSnapshot.country_code,
+            day.label("day"),
+            func.max(VideoSnapshot.view_count),
+            func.max(VideoSnapshot.like_count),
+            func.max(VideoSnapshot.comment_count)
+        ).filter(VideoSnapshot.captured_at < older_than).group_by(
+            VideoSnapshot.video_id, VideoSnapshot.country_code, day
+        ).all()
+
+        rows = [
+            {
+                "video_id": video_id,
+                "country_code": country_code,
+                # SQLite returns DATE() as text, PostgreSQL as a date
+                "date": datetime.fromisoformat(str(snapshot_day)),
+                "view_count": view_count,
+                "like_count": like_count,
+                "comment_count": comment_count,
+            }
+            for video_id, country_code, snapshot_day, view_count, like_count, comment_count in grouped
+        ]
+
+        if rows:
+            dialect_insert = _dialect_insert(db)
+            if dialect_insert is not None:
+                table = VideoDailyMetric.__table__
+                stmt = dialect_insert(table)
+                # SQLite's multi-argument max() is PostgreSQL's greatest()
+                greatest = func.max if db.get_bind().dialect.name == "sqlite" else func.greatest
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.video_id, table.c.country_code, table.c.date],
+                    set_={
+                        "view_count": greatest(table.c.view_count, stmt.excluded.view_count),
+                        "like_count": greatest(table.c.like_count, stmt.excluded.like_count),
+                        "comment_count": greatest(table.c.comment_count, stmt.excluded.comment_count),
+                    },
+                )
+                db.execute(stmt, rows)
+            else:
+                for row in rows:
+                    metric = db.query(VideoDailyMetric).filter(
+                        VideoDailyMetric.video_id == row["video_id"],
+                        VideoDailyMetric.country_code == row["country_code"],
+                        VideoDailyMetric.date == row["date"]
+                    ).first()
+                    if metric:
+                        for key in ("view_count", "like_count", "comment_count"):
+                            setattr(metric, key, max(getattr(metric, key) or 0, row[key] or 0))
+                    else:
+                        db.add(VideoDailyMetric(**row))
+
+        db.query(VideoSnapshot).filter(VideoSnapshot.captured_at < older_than).delete(synchronize_session=False)
         db.commit()
-        return alerts
-        
+        return len(rows)
+
     except Exception as e:
         db.rollback()
         raise e
 
+def get_alerts(db: Session, country_code: Optional[str] = None, since_id: Optional[int] = None, triggered_since: Optional[datetime] = None, limit: int = 100) -> List[VideoAlert]:
+    """
+    Returns alerts oldest first. With `since_id`, only alerts after that id are returned,
+    so each consumer keeps its own position; otherwise alerts created since `triggered_since`.
+    Read-only: polling never changes what other consumers see.
+    """
+    query = db.query(VideoAlert)
+    if country_code:
+        query = query.filter(VideoAlert.country_code == country_code)
+    if since_id is not None:
+        query = query.filter(VideoAlert.id > since_id)
+    elif triggered_since:
+        # Alerts are written in created_at order, so this is still oldest first, and the
+        # created_at indexes serve the filter and the sort together
+        query = query.filter(VideoAlert.created_at >= triggered_since).order_by(VideoAlert.created_at)
+    return query.order_by(VideoAlert.id).limit(limit).all()
+
 def get_all_country_codes(db: Session) -> List[str]:
     """Returns a list of all unique country codes present in the database."""
     # Fix: Extract the actual values from the result tuples
     result = db.query(TrendingVideo.country_code).distinct().all()
     return [row[0] for row in result if row[0] is not None]
 
-def bulk_create_or_update_videos(db: Session, videos_data: List[Dict[str, Any]], country_code: str, categories: Dict[str, str], batch_size: int = 100):
+def bulk_create_or_update_videos(db: Session, videos_data: List[Dict[str, Any]], country_code: str, categories: Dict[str, str], batch_size: int = 100, fetched_at: Optional[datetime] = None, commit: bool = True):
     """
-    More efficient bulk operation for large datasets using SQLAlchemy bulk operations.
+    Portable bulk upsert for dialects without ON CONFLICT support.
+    Looks up existing rows one IN (...) query per batch, then uses SQLAlchemy bulk operations.
+    Rows fetched later than `fetched_at` are left alone, as in add_or_update_trending_video_batch.
+    Returns the batch's rows as column dicts, in chart order.
     """
     try:
-        current_time = datetime.utcnow()
+        current_time = fetched_at or datetime.utcnow()
+        rows = [_parse_video_item(video_item, country_code, categories, current_time) for video_item in videos_data]
+        for row in rows:
+            row.update(previous_view_count=None, view_count_change=None, alert_triggered=False)
+        _score_spikes(db, country_code, rows, current_time)
         videos_to_insert = []
         videos_to_update = []
+        history_only = []
         
         # Process in batches to avoid memory issues
-        for i in range(0, len(videos_data), batch_size):
-            batch = videos_data[i:i + batch_size]
-            video_ids = [video["id"] for video in batch]
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            video_ids = [video["video_id"] for video in batch]
             
             # Get existing videos for this batch
             existing_videos = {
@@ -180,42 +724,16 @@ def bulk_create_or_update_videos(db: Session, videos_data: List[Dict[str, Any]],
                 ).all()
             }
             
-            for video_item in batch:
-                snippet = video_item.get("snippet", {})
-                statistics = video_item.get("statistics", {})
-                video_id = video_item["id"]
+            for video_data in batch:
+                video_id = video_data["video_id"]
                 
-                video_data = {
-                    "video_id": video_id,
-                    "title": snippet.get("title"),
-                    "description": snippet.get("description"),
-                    "published_at": datetime.fromisoformat(snippet["publishedAt"].replace('Z', '+00:00')),
-                    "channel_id": snippet.get("channelId"),
-                    "channel_title": snippet.get("channelTitle"),
-                    "category_id": snippet.get("categoryId"),
-                    "category_name": categories.get(snippet.get("categoryId"), "Unknown"),
-                    "view_count": int(statistics.get("viewCount", 0)),
-                    "like_count": int(statistics.get("likeCount", 0)),
-                    "comment_count": int(statistics.get("commentCount", 0)),
-                    "tags": snippet.get("tags"),
-                    "thumbnail_url": snippet.get("thumbnails", {}).get("high", {}).get("url"),
-                    "country_code": country_code,
-                    "fetched_at": current_time
-                }
-                
-                if video_id in existing_videos:
+                if video_id in existing_videos and _is_newer(existing_videos[video_id].fetched_at, current_time):
+                    history_only.append(video_data)
+                elif video_id in existing_videos:
                     existing_video = existing_videos[video_id]
                     video_data["previous_view_count"] = existing_video.view_count
-                    view_count_change = video_data["view_count"] - existing_video.view_count
-                    video_data["view_count_change"] = view_count_change
-                    
-                    # Viral spike detection
-                    viral_spike_threshold = 0.5
-                    if existing_video.view_count > 0 and (view_count_change / existing_video.view_count) >= viral_spike_threshold:
-                        video_data["is_viral_spike"] = True
-                        video_data["alert_triggered"] = False
-                    else:
-                        video_data["is_viral_spike"] = False
+                    video_data["view_count_change"] = video_data["view_count"] - existing_video.view_count
+                    video_data["alert_triggered"] = video_data["is_viral_spike"]
                     
                     video_data["id"] = existing_video.id  # Include the primary key for update
                     videos_to_update.append(video_data)
@@ -223,146 +741,305 @@ def bulk_create_or_update_videos(db: Session, videos_data: List[Dict[str, Any]],
                     videos_to_insert.append(video_data)
         
         # Perform bulk operations
+        _save_video_metadata(db, rows)
         if videos_to_insert:
             db.bulk_insert_mappings(TrendingVideo, videos_to_insert)
         
         if videos_to_update:
             db.bulk_update_mappings(TrendingVideo, videos_to_update)
+
+        _append_snapshots(db, videos_to_insert + videos_to_update + history_only)
+        _record_region_spread(db, country_code, rows)
+        _update_leaderboards(db, country_code, rows)
+        _create_alerts(db, [video for video in videos_to_update if video["is_viral_spike"]])
         
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        return rows
         
     except Exception as e:
         db.rollback()
         raise e
     
-def save_video_categories_to_db(db: Session, categories: dict):
+def get_region_categories(db: Session) -> Tuple[Dict[str, Dict[str, str]], Dict[str, datetime]]:
+    """
+    Every region's categories as {country_code: {category_id: name}}, and when each region
+    was last refreshed.
     """
-    Save video categories to database with caching.
+    regions: Dict[str, Dict[str, str]] = {}
+    for country_code, category_id, category_name in db.query(
+        VideoCategory.country_code, VideoCategory.category_id, VideoCategory.category_name
+    ):
+        regions.setdefault(country_code, {})[category_id] = category_name
+    refreshed = dict(db.query(CategoryRefresh.country_code, CategoryRefresh.refreshed_at))
+    return regions, refreshed
+
+def save_region_categories(db: Session, country_code: str, categories: Dict[str, str], refreshed_at: Optional[datetime] = None) -> int:
+    """
+    Brings a region's stored categories in line with `categories` ({category_id: name}),
+    writing only the rows that were added, renamed or removed, and records the refresh.
+    Returns the number of rows changed.
     """
+    refreshed_at = refreshed_at or datetime.utcnow()
     try:
-        # Clear existing cache
-        db.query(VideoCategoryCache).delete()
-        
-        # Save new cache
-        cache_entry = VideoCategoryCache(
-            categories_data=categories,
-            last_updated=datetime.utcnow()
-        )
-        db.add(cache_entry)
-        
-        # Also save individual categories for easier querying
-        db.query(VideoCategory).delete()
-        
-        for category_id, category_info in categories.items():
-            if isinstance(category_info, dict):
-                category_name = category_info.get('title', 'Unknown')
-                assignable = category_info.get('assignable', 'true')
-            else:
-                # Handle case where category_info might be just a string
-                category_name = str(category_info)
-                assignable = 'true'
-            
-            category = VideoCategory(
-                category_id=str(category_id),
-                category_name=category_name,
-                assignable=assignable,
-                last_updated=datetime.utcnow()
-            )
-            db.add(category)
-        
+        stored = {
+            category.category_id: category
+            for category in db.query(VideoCategory).filter(VideoCategory.country_code == country_code)
+        }
+        changed = 0
+        for category_id, category_name in categories.items():
+            category = stored.pop(str(category_id), None)
+            if category is None:
+                db.add(VideoCategory(
+                    country_code=country_code,
+                    category_id=str(category_id),
+                    category_name=category_name,
+                    last_updated=refreshed_at,
+                ))
+                changed += 1
+            elif category.category_name != category_name:
+                category.category_name = category_name
+                category.last_updated = refreshed_at
+                changed += 1
+        for category in stored.values():
+            db.delete(category)
+            changed += 1
+
+        db.merge(CategoryRefresh(country_code=country_code, refreshed_at=refreshed_at, category_count=len(categories)))
         db.commit()
-        
+        return changed
+
     except Exception as e:
         db.rollback()
-        raise
+        raise e
 
-def get_video_categories_from_db(db: Session) -> dict:
+def try_acquire_lease(db: Session, name: str, holder: str, ttl_seconds: int) -> bool:
     """
-    Retrieve video categories from database cache.
-    Returns empty dict if no valid cache exists.
+    Takes or renews the lease `name` for `holder`. Succeeds if the lease is free,
+    expired or already held by `holder`; the conditional UPDATE makes it atomic.
     """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
     try:
-        cache_entry = db.query(VideoCategoryCache).order_by(
-            VideoCategoryCache.last_updated.desc()
-        ).first()
-        
-        if cache_entry:
-            # Check if cache is still valid (less than 24 hours old)
-            cache_age = datetime.utcnow() - cache_entry.last_updated
-            if cache_age.total_seconds() < 24 * 60 * 60:  # 24 hours
-                return cache_entry.categories_data
-        
-        return {}
-        
+        updated = db.query(SchedulerLease).filter(
+            SchedulerLease.name == name,
+            or_(
+                SchedulerLease.holder == holder,
+                SchedulerLease.holder.is_(None),
+                SchedulerLease.lease_expires_at < now
+            )
+        ).update({"holder": holder, "lease_expires_at": expires_at}, synchronize_session=False)
+        if updated:
+            db.commit()
+            return True
+
+        if db.get(SchedulerLease, name) is None:
+            db.add(SchedulerLease(name=name, holder=holder, lease_expires_at=expires_at))
+            db.commit()
+            return True
+
+        db.rollback()
+        return False
+
+    except IntegrityError:
+        # Another worker created the lease row first
+        db.rollback()
+        return False
     except Exception as e:
-        return {}
+        db.rollback()
+        raise e
 
-def should_fetch_categories(db: Session, cache_hours: int = 24) -> bool:
-    """
-    Check if categories should be fetched from API based on cache age.
-    """
+def release_lease(db: Session, name: str, holder: str):
+    """Gives up the lease so another worker can take over without waiting for it to expire."""
     try:
-        cache_entry = db.query(VideoCategoryCache).order_by(
-            VideoCategoryCache.last_updated.desc()
-        ).first()
-        
-        if not cache_entry:
-            return True  # No cache exists, should fetch
-        
-        cache_age = datetime.utcnow() - cache_entry.last_updated
-        return cache_age.total_seconds() > (cache_hours * 60 * 60)
-        
+        db.query(SchedulerLease).filter(
+            SchedulerLease.name == name,
+            SchedulerLease.holder == holder
+        ).update({"holder": None, "lease_expires_at": None}, synchronize_session=False)
+        db.commit()
     except Exception as e:
-        return True  # On error, assume we should fetch
+        db.rollback()
+        raise e
 
-def get_category_name_by_id(db: Session, category_id: str) -> str:
-    """
-    Get category name by category ID from database.
-    """
+def get_lease(db: Session, name: str) -> SchedulerLease | None:
+    return db.get(SchedulerLease, name)
+
+def update_lease_schedule(db: Session, name: str, **fields):
+    """Sets next_run_at / last_run_started_at / last_run_finished_at on a lease row."""
     try:
-        category = db.query(VideoCategory).filter(
-            VideoCategory.category_id == str(category_id)
-        ).first()
-        
-        return category.category_name if category else "Unknown Category"
-        
+        db.query(SchedulerLease).filter(SchedulerLease.name == name).update(fields, synchronize_session=False)
+        db.commit()
     except Exception as e:
-        return "Unknown Category"
+        db.rollback()
+        raise e
 
-def get_all_categories(db: Session) -> List[VideoCategory]:
+def record_country_runs(db: Session, runs: List[Dict[str, Any]]):
+    """Upserts CountryFetchState rows; each dict holds country_code plus the columns to set."""
+    try:
+        for run in runs:
+            state = db.get(CountryFetchState, run["country_code"])
+            if state is None:
+                state = CountryFetchState(country_code=run["country_code"])
+                db.add(state)
+            for key, value in run.items():
+                setattr(state, key, value)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+def refresh_country_stats(db: Session, country_codes: List[str], top_categories: int = 5, refreshed_at: Optional[datetime] = None):
     """
-    Get all video categories from database.
+    Recomputes the CountryStats rows of `country_codes` with two GROUP BY queries over
+    trending_videos: totals per country, then video counts per country and category.
     """
+    refreshed_at = refreshed_at or datetime.utcnow()
     try:
-        return db.query(VideoCategory).order_by(VideoCategory.category_name).all()
+        totals = {
+            country_code: (videos, views, spikes)
+            for country_code, videos, views, spikes in db.query(
+                TrendingVideo.country_code,
+                func.count(),
+                func.coalesce(func.sum(TrendingVideo.view_count), 0),
+                func.count().filter(TrendingVideo.is_viral_spike.is_(True)),
+            ).filter(TrendingVideo.country_code.in_(country_codes)).group_by(TrendingVideo.country_code)
+        }
+        categories: Dict[str, List[Dict[str, Any]]] = {country_code: [] for country_code in country_codes}
+        for country_code, category_id, category_name, videos in db.query(
+            TrendingVideo.country_code,
+            TrendingVideo.category_id,
+            func.max(TrendingVideo.category_name),
+            func.count(),
+        ).filter(TrendingVideo.country_code.in_(country_codes)).group_by(
+            TrendingVideo.country_code, TrendingVideo.category_id
+        ).order_by(TrendingVideo.country_code, func.count().desc(), TrendingVideo.category_id):
+            if len(categories[country_code]) < top_categories:
+                categories[country_code].append(
+                    {"category_id": category_id, "category_name": category_name, "videos": videos}
+                )
+
+        for country_code in country_codes:
+            stats = db.get(CountryStats, country_code)
+            if stats is None:
+                stats = CountryStats(country_code=country_code)
+                db.add(stats)
+            stats.video_count, stats.total_views, stats.spike_count = totals.get(country_code, (0, 0, 0))
+            stats.top_categories = categories[country_code]
+            stats.refreshed_at = refreshed_at
+        db.commit()
     except Exception as e:
-        return []
+        db.rollback()
+        raise e
 
-def get_categories_stats(db: Session) -> dict:
+def get_country_stats(db: Session, country_codes: List[str]) -> Tuple[List[CountryStats], Optional[datetime]]:
     """
-    Get statistics about cached categories.
+    The CountryStats rows of `country_codes` and when the stalest of their category lists
+    was refreshed (None while any was never fetched), in a single statement: a primary-key
+    read with the refresh time as a scalar subquery.
+
+    /stats stays on this synchronous path; see ASYNC_DATABASE_URL in database.py for why.
     """
+    categories_updated = select(
+        case((func.count() < len(set(country_codes)), null()), else_=func.min(CategoryRefresh.refreshed_at))
+    ).filter(
+        CategoryRefresh.country_code.in_(country_codes)
+    ).scalar_subquery()
+    rows = db.execute(
+        select(CountryStats, categories_updated).filter(CountryStats.country_code.in_(country_codes))
+    ).all()
+    if not rows:
+        return [], db.scalar(select(categories_updated))
+    return [stats for stats, _ in rows], rows[0][1]
+
+def get_country_fetch_states(db: Session) -> List[CountryFetchState]:
+    return db.query(CountryFetchState).order_by(CountryFetchState.country_code).all()
+
+def get_quota_used(db: Session, day: str) -> int:
+    usage = db.get(QuotaUsage, day)
+    return usage.units_used if usage else 0
+
+def add_quota_units(db: Session, day: str, units: int):
+    """Atomically adds `units` to the quota spent on `day`."""
     try:
-        cache_entry = db.query(VideoCategoryCache).order_by(
-            VideoCategoryCache.last_updated.desc()
-        ).first()
-        
-        category_count = db.query(VideoCategory).count()
-        
-        return {
-            "total_categories": category_count,
-            "cache_last_updated": cache_entry.last_updated if cache_entry else None,
-            "cache_age_hours": (
-                (datetime.utcnow() - cache_entry.last_updated).total_seconds() / 3600
-                if cache_entry else None
-            ),
-            "cache_valid": not should_fetch_categories(db) if cache_entry else False
-        }
-        
+        dialect_insert = _dialect_insert(db)
+        if dialect_insert is not None:
+            stmt = dialect_insert(QuotaUsage).values(day=day, units_used=units)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[QuotaUsage.day],
+                set_={"units_used": QuotaUsage.units_used + stmt.excluded.units_used},
+            )
+            db.execute(stmt)
+        else:
+            usage = db.get(QuotaUsage, day)
+            if usage is None:
+                db.add(QuotaUsage(day=day, units_used=units))
+            else:
+                usage.units_used += units
+        db.commit()
     except Exception as e:
-        return {
-            "total_categories": 0,
-            "cache_last_updated": None,
-            "cache_age_hours": None,
-            "cache_valid": False
-        }
\ No newline at end of file
+        db.rollback()
+        raise e
+
+def add_stream_events(db: Session, events: List[Dict[str, Any]], created_at: Optional[datetime] = None):
+    """Appends events to the stream outbox in one transaction, in order."""
+    if not events:
+        return
+    created_at = created_at or datetime.utcnow()
+    try:
+        db.execute(insert(StreamEvent), [
+            {
+                "event_type": event["type"],
+                "country_code": event.get("country_code"),
+                "payload": json.dumps(event, default=str, separators=(",", ":")),
+                "created_at": created_at,
+            }
+            for event in events
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+def get_stream_events(db: Session, after_id: int, limit: int = 500) -> List[Tuple[int, Dict[str, Any]]]:
+    """The outbox events with ids above `after_id`, oldest first, as (id, event) pairs."""
+    rows = db.query(StreamEvent.id, StreamEvent.payload).filter(
+        StreamEvent.id > after_id
+    ).order_by(StreamEvent.id).limit(limit).all()
+    return [(row.id, json.loads(row.payload)) for row in rows]
+
+def get_last_stream_event_id(db: Session) -> int:
+    return db.query(func.max(StreamEvent.id)).scalar() or 0
+
+def prune_stream_events(db: Session, before: datetime) -> int:
+    """Deletes the outbox events created before `before`; returns how many."""
+    try:
+        deleted = db.query(StreamEvent).filter(StreamEvent.created_at < before).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    except Exception as e:
+        db.rollback()
+        raise e
+
+def get_stored_pages(db: Session, country_code: str, fetched_at: datetime) -> Set[int]:
+    """The pages of the archived fetch of `country_code` at `fetched_at` that were stored."""
+    return {page for (page,) in db.query(StoredFetchPage.page).filter(
+        StoredFetchPage.country_code == country_code,
+        StoredFetchPage.fetched_at == fetched_at,
+    )}
+
+def record_stored_pages(db: Session, country_code: str, fetched_at: datetime, pages: List[int], object: str, source: str):
+    """Records pages of an archived fetch as stored and commits, along with anything the caller flushed."""
+    stored_at = datetime.utcnow()
+    try:
+        if pages:
+            db.execute(insert(StoredFetchPage), [
+                {"country_code": country_code, "fetched_at": fetched_at, "page": page,
+                 "object": object, "source": source, "stored_at": stored_at}
+                for page in pages
+            ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
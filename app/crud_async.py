@@ -0,0 +1,178 @@
+"""
+asyncio versions of the read-only CRUD functions used by the API endpoints. They mirror
+their counterparts in crud.py query for query, so the event loop is never blocked on
+the database while serving reads. Writes stay synchronous and run off the event loop.
+/stats is served synchronously too (see crud.get_country_stats).
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .crud import search_videos_query, trending_videos_query
+from .models import (
+    CategoryRefresh,
+    CategoryRollup,
+    ChannelRollup,
+    CountryFetchState,
+    PropagationLagBucket,
+    QuotaUsage,
+    TrendingVideo,
+    VideoAlert,
+    VideoCategory,
+    VideoDailyMetric,
+    VideoRegionFirstSeen,
+    VideoSnapshot,
+    VideoSpread,
+)
+
+async def get_trending_videos(db: AsyncSession, country_code: str, skip: int = 0, limit: int = 100, spikes_only: bool = False, sort: str = "fetched_at", after: Optional[Tuple[Any, int]] = None) -> List[TrendingVideo]:
+    """Retrieves the trending videos for a specific country in `sort` order. See crud.get_trending_videos."""
+    query = trending_videos_query(select(TrendingVideo), country_code, spikes_only, sort, after)
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
+
+async def search_videos(db: AsyncSession, text: str, country_code: Optional[str] = None, category_id: Optional[str] = None, after: Optional[Tuple[float, int]] = None, limit: int = 20) -> List[Tuple[TrendingVideo, float]]:
+    """Full-text search over trending videos. See crud.search_videos_query."""
+    query = search_videos_query(text, db.bind.dialect.name, country_code, category_id, after, limit)
+    return [(video, rank) for video, rank in await db.execute(query)]
+
+async def get_video_history(db: AsyncSession, video_id: str, country_code: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Returns the metrics series for a video between `start` and `end`, oldest first. See crud.get_video_history."""
+    daily = await db.scalars(
+        select(VideoDailyMetric).filter(
+            VideoDailyMetric.video_id == video_id,
+            VideoDailyMetric.country_code == country_code,
+            VideoDailyMetric.date >= start,
+            VideoDailyMetric.date <= end
+        ).order_by(VideoDailyMetric.date)
+    )
+    history = [
+        {"captured_at": m.date, "view_count": m.view_count, "like_count": m.like_count,
+         "comment_count": m.comment_count, "granularity": "daily"}
+        for m in daily
+    ]
+
+    snapshots = await db.scalars(
+        select(VideoSnapshot).filter(
+            VideoSnapshot.country_code == country_code,
+            VideoSnapshot.video_id == video_id,
+            VideoSnapshot.captured_at >= start,
+            VideoSnapshot.captured_at <= end
+        ).order_by(VideoSnapshot.captured_at)
+    )
+    history.extend(
+        {"captured_at": s.captured_at, "view_count": s.view_count, "like_count": s.like_count,
+         "comment_count": s.comment_count, "granularity": "snapshot"}
+        for s in snapshots
+    )
+    return history
+
+async def get_alerts(db: AsyncSession, country_code: Optional[str] = None, since_id: Optional[int] = None, triggered_since: Optional[datetime] = None, limit: int = 100) -> List[VideoAlert]:
+    """Returns alerts oldest first. See crud.get_alerts."""
+    query = select(VideoAlert)
+    if country_code:
+        query = query.filter(VideoAlert.country_code == country_code)
+    if since_id is not None:
+        query = query.filter(VideoAlert.id > since_id)
+    elif triggered_since:
+        # Alerts are written in created_at order, so this is still oldest first, and the
+        # created_at indexes serve the filter and the sort together
+        query = query.filter(VideoAlert.created_at >= triggered_since).order_by(VideoAlert.created_at)
+    result = await db.scalars(query.order_by(VideoAlert.id).limit(limit))
+    return result.all()
+
+async def get_all_country_codes(db: AsyncSession) -> List[str]:
+    """Returns a list of all unique country codes present in the database."""
+    result = await db.scalars(select(TrendingVideo.country_code).distinct())
+    return [code for code in result if code is not None]
+
+async def get_categories(db: AsyncSession, country_code: Optional[str] = None) -> List[VideoCategory]:
+    """Stored video categories, of every region or only `country_code`, by region and name."""
+    query = select(VideoCategory)
+    if country_code:
+        query = query.filter(VideoCategory.country_code == country_code)
+    result = await db.scalars(query.order_by(VideoCategory.country_code, VideoCategory.category_name))
+    return result.all()
+
+async def get_category_refreshes(db: AsyncSession) -> List[CategoryRefresh]:
+    result = await db.scalars(select(CategoryRefresh).order_by(CategoryRefresh.country_code))
+    return result.all()
+
+async def get_country_fetch_states(db: AsyncSession) -> List[CountryFetchState]:
+    result = await db.scalars(select(CountryFetchState).order_by(CountryFetchState.country_code))
+    return result.all()
+
+async def get_quota_used(db: AsyncSession, day: str) -> int:
+    usage = await db.get(QuotaUsage, day)
+    return usage.units_used if usage else 0
+
+async def get_spreading_videos(db: AsyncSession, min_regions: int = 2, limit: int = 50) -> List[VideoSpread]:
+    """Videos that trended in at least `min_regions` countries, widest spread first."""
+    result = await db.scalars(
+        select(VideoSpread).filter(VideoSpread.region_count >= min_regions)
+        .order_by(VideoSpread.region_count.desc(), VideoSpread.first_seen_at.desc()).limit(limit)
+    )
+    return result.all()
+
+async def get_videos_by_origin(db: AsyncSession, origin_country: str, limit: int = 50) -> List[VideoSpread]:
+    """Videos that trended in `origin_country` before anywhere else, newest first."""
+    result = await db.scalars(
+        select(VideoSpread).filter(VideoSpread.origin_country == origin_country)
+        .order_by(VideoSpread.first_seen_at.desc()).limit(limit)
+    )
+    return result.all()
+
+async def get_video_spread(db: AsyncSession, video_id: str) -> Optional[VideoSpread]:
+    return await db.get(VideoSpread, video_id)
+
+async def get_video_regions(db: AsyncSession, video_ids: List[str]) -> Dict[str, List[VideoRegionFirstSeen]]:
+    """The VideoRegionFirstSeen rows of each video, in the order it reached the countries."""
+    regions: Dict[str, List[VideoRegionFirstSeen]] = {video_id: [] for video_id in video_ids}
+    if not video_ids:
+        return regions
+    result = await db.scalars(
+        select(VideoRegionFirstSeen).filter(VideoRegionFirstSeen.video_id.in_(video_ids))
+        .order_by(VideoRegionFirstSeen.video_id, VideoRegionFirstSeen.first_seen_at, VideoRegionFirstSeen.country_code)
+    )
+    for region in result:
+        regions[region.video_id].append(region)
+    return regions
+
+async def get_propagation_buckets(db: AsyncSession, origin_country: Optional[str] = None, country_code: Optional[str] = None) -> List[PropagationLagBucket]:
+    query = select(PropagationLagBucket)
+    if origin_country:
+        query = query.filter(PropagationLagBucket.origin_country == origin_country)
+    if country_code:
+        query = query.filter(PropagationLagBucket.country_code == country_code)
+    result = await db.scalars(query)
+    return result.all()
+
+async def get_channel_leaderboard(db: AsyncSession, period: str, period_start: date, country_code: Optional[str] = None, sort: str = "appearances", limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Channels ranked by chart appearances or trending videos in a period, in one country or
+    summed over all of them (a video trending in two countries then counts twice).
+    """
+    query = select(
+        ChannelRollup.channel_id,
+        func.max(ChannelRollup.channel_title).label("channel_title"),
+        func.sum(ChannelRollup.videos).label("videos"),
+        func.sum(ChannelRollup.appearances).label("appearances"),
+    ).filter(ChannelRollup.period == period, ChannelRollup.period_start == period_start)
+    if country_code:
+        query = query.filter(ChannelRollup.country_code == country_code)
+    ranking = [func.sum(ChannelRollup.videos).desc(), func.sum(ChannelRollup.appearances).desc()]
+    if sort == "appearances":
+        ranking.reverse()
+    result = await db.execute(
+        query.group_by(ChannelRollup.channel_id).order_by(*ranking, ChannelRollup.channel_id).limit(limit)
+    )
+    return [dict(row._mapping) for row in result]
+
+async def get_category_rollups(db: AsyncSession, period: str, period_start: date, country_code: Optional[str] = None) -> List[CategoryRollup]:
+    query = select(CategoryRollup).filter(CategoryRollup.period == period, CategoryRollup.period_start == period_start)
+    if country_code:
+        query = query.filter(CategoryRollup.country_code == country_code)
+    result = await db.scalars(query.order_by(CategoryRollup.country_code, CategoryRollup.videos.desc(), CategoryRollup.category_id))
+    return result.all()
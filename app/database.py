@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -7,14 +9,74 @@ import os
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Defaults to DATABASE_URL with its async driver (psycopg for PostgreSQL, aiosqlite for SQLite).
+# Single-row endpoints such as /stats keep using get_db. On SQLite, aiosqlite runs every
+# call through its own thread, which makes small reads slower than with the sync driver
+# (/stats: p50 199ms -> 624ms in benchmarks/bench_read_api.py). On PostgreSQL the async
+# driver has no such overhead, but there is nothing to win either: a sync endpoint runs
+# on Starlette's threadpool, so its one primary-key read never blocks the event loop.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool tuning, per engine and per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "postgresql+psycopg": "postgresql+psycopg",
+    "postgresql+psycopg2": "postgresql+psycopg",
+    "postgresql+asyncpg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+aiosqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for an asyncio one."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+def pool_options(url: str) -> dict:
+    """Pool settings for a server database; SQLite keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        # Replace connections the server closed while idle instead of failing a request
+        "pool_pre_ping": True,
+    }
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    """The asyncio engine, created on first use so the async driver is only needed when used."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        url = ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+        _async_engine = create_async_engine(url, **pool_options(url))
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_session_factory()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One connected client. `None` filters mean "everything"."""
+    countries: Optional[Set[str]]
+    categories: Optional[Set[str]]
+    queue: asyncio.Queue
+    dropped: int = 0
+
+    def filter(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Returns the part of `event` this subscriber asked for, or None."""
+        if self.countries is not None and event.get("country_code") not in self.countries:
+            return None
+        if self.categories is None:
+            return event
+        if event["type"] == "alert":
+            return event if event.get("category_id") in self.categories else None
+        if event["type"] == "trending":
+            added = [v for v in event["added"] if v.get("category_id") in self.categories]
+            updated = [v for v in event["updated"] if v.get("category_id") in self.categories]
+            if not added and not updated and not event["removed"]:
+                return None
+            return dict(event, added=added, updated=updated)
+        return event
+
+
+class EventBroker:
+    """
+    In-memory fan-out of ingestion events to stream subscribers.
+
+    Every subscriber has a bounded queue. When a slow client's queue is full, new events
+    are dropped for that client only and counted, so one stalled connection never
+    holds up ingestion or the other clients. Must be used from the event loop thread.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscription] = set()
+
+    def subscribe(self, countries: Optional[Set[str]] = None, categories: Optional[Set[str]] = None) -> Subscription:
+        subscription = Subscription(countries, categories, asyncio.Queue(maxsize=self.queue_size))
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Queues `event` for every matching subscriber. Returns how many received it."""
+        delivered = 0
+        for subscription in self.subscribers:
+            filtered = subscription.filter(event)
+            if filtered is None:
+                continue
+            try:
+                subscription.queue.put_nowait(filtered)
+                delivered += 1
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+        return delivered
+
+
+class OutboxCursor:
+    """
+    A worker's position in the stream_events outbox. An event's id is assigned when it is
+    written but only becomes visible once its transaction commits, and several workers
+    write events, so a lower id can show up after a higher one. Ids relayed past a gap
+    are remembered, and the gap is read again on every poll for up to `grace_seconds`;
+    an older gap is taken as a write that rolled back.
+    """
+
+    def __init__(self, after_id: int, grace_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        # Every id up to after_id was relayed or given up on
+        self.after_id = after_id
+        self.grace_seconds = grace_seconds
+        self.clock = clock
+        self._relayed: Set[int] = set()
+        self._gaps: Dict[int, float] = {}
+
+    def accept(self, events: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+        """The (id, event) pairs of `events` not relayed yet, which are now taken as relayed."""
+        new = [(event_id, event) for event_id, event in events
+               if event_id > self.after_id and event_id not in self._relayed]
+        self._relayed.update(event_id for event_id, _ in new)
+        self._advance()
+        return new
+
+    def _advance(self):
+        if not self._relayed:
+            return
+        now = self.clock()
+        top = max(self._relayed)
+        for event_id in range(self.after_id + 1, top):
+            if event_id not in self._relayed:
+                self._gaps.setdefault(event_id, now)
+        while self.after_id < top:
+            next_id = self.after_id + 1
+            if next_id in self._relayed:
+                self._relayed.discard(next_id)
+            elif now - self._gaps[next_id] >= self.grace_seconds:
+                del self._gaps[next_id]
+            else:
+                break
+            self.after_id = next_id
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str, separators=(',', ':'))}\n\n"
+
+
+@dataclass
+class TrendingDiffer:
+    """
+    Remembers the last published chart per country and reduces a new one to a compact diff.
+
+    A chart can arrive in pages: diff_page() reports the videos added or moved on each
+    page as it is stored, and finish() reports the videos that dropped out once the last
+    page is in. diff() does both for a chart that arrives whole.
+    """
+    charts: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+    pending: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+
+    @staticmethod
+    def _event(country_code: str, added=(), updated=(), removed=()) -> Dict[str, Any]:
+        return {
+            "type": "trending",
+            "country_code": country_code,
+            "added": list(added),
+            "updated": list(updated),
+            "removed": list(removed),
+        }
+
+    def diff_page(self, country_code: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        previous = self.charts.get(country_code, {})
+        current = self.pending.setdefault(country_code, {})
+        added, updated = [], []
+        for rank, row in enumerate(rows, start=len(current) + 1):
+            entry = {
+                "video_id": row["video_id"],
+                "rank": rank,
+                "view_count": row["view_count"],
+                "category_id": row.get("category_id"),
+            }
+            current[row["video_id"]] = entry
+            before = previous.get(row["video_id"])
+            if before is None:
+                added.append(dict(entry, title=row.get("title"), channel_title=row.get("channel_title")))
+            elif before["rank"] != rank or before["view_count"] != entry["view_count"]:
+                updated.append(entry)
+        return self._event(country_code, added=added, updated=updated)
+
+    def finish(self, country_code: str) -> Dict[str, Any]:
+        previous = self.charts.get(country_code, {})
+        current = self.pending.pop(country_code, {})
+        self.charts[country_code] = current
+        return self._event(country_code, removed=[video_id for video_id in previous if video_id not in current])
+
+    def discard(self, country_code: str):
+        """Drops a partially received chart; the last complete one stays the baseline."""
+        self.pending.pop(country_code, None)
+
+    def diff(self, country_code: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.discard(country_code)
+        event = self.diff_page(country_code, rows)
+        event["removed"] = self.finish(country_code)["removed"]
+        return event
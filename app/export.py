@@ -0,0 +1,209 @@
+"""
+Bulk export of trending data as CSV, Parquet or Arrow IPC streams.
+
+Rows are read through a server-side cursor (stream_results) and encoded one chunk at a
+time, so memory stays flat however many rows match. Filters are applied in SQL.
+pyarrow is only imported for the Parquet and Arrow formats.
+"""
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from .models import TrendingVideo, Video, VideoDailyMetric, VideoSnapshot
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "50000"))
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: Any
+    time_column: str
+    # (column name, arrow type name) in output order
+    columns: Tuple[Tuple[str, str], ...]
+    # Joined on video_id for the columns `model` doesn't have
+    joined: Any = None
+
+
+METRIC_COLUMNS = (("view_count", "int64"), ("like_count", "int64"), ("comment_count", "int64"))
+
+DATASETS = {
+    "trending": Dataset(TrendingVideo, "fetched_at", (
+        ("video_id", "string"), ("country_code", "string"), ("fetched_at", "timestamp"),
+        ("title", "string"), ("description", "string"), ("published_at", "timestamp"),
+        ("channel_id", "string"), ("channel_title", "string"), ("category_id", "string"),
+        ("category_name", "string"), *METRIC_COLUMNS, ("like_ratio", "float64"),
+        ("previous_view_count", "int64"), ("view_count_change", "int64"),
+        ("is_viral_spike", "bool"), ("tags", "list<string>"),
+    ), joined=Video),
+    "snapshots": Dataset(VideoSnapshot, "captured_at", (
+        ("video_id", "string"), ("country_code", "string"), ("captured_at", "timestamp"), *METRIC_COLUMNS,
+    )),
+    "daily": Dataset(VideoDailyMetric, "date", (
+        ("video_id", "string"), ("country_code", "string"), ("date", "timestamp"), *METRIC_COLUMNS,
+    )),
+}
+
+
+def export_query(dataset: str, country_code: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None, category_id: Optional[str] = None):
+    """
+    SELECT of a dataset's export columns in (country, time) order. History rows have no
+    category of their own; category_id filters them through their video's trending row.
+    """
+    spec = DATASETS[dataset]
+    model = spec.model
+    time_column = getattr(model, spec.time_column)
+    query = select(*(
+        model.__table__.c[name] if name in model.__table__.c else spec.joined.__table__.c[name]
+        for name, _ in spec.columns
+    )).select_from(model)
+    if spec.joined is not None:
+        query = query.outerjoin(spec.joined, spec.joined.video_id == model.video_id)
+    if country_code:
+        query = query.filter(model.country_code == country_code)
+    if since:
+        query = query.filter(time_column >= since)
+    if until:
+        query = query.filter(time_column < until)
+    if category_id:
+        if model is TrendingVideo:
+            query = query.filter(TrendingVideo.category_id == category_id)
+        else:
+            query = query.filter(
+                select(TrendingVideo.id).filter(
+                    TrendingVideo.video_id == model.video_id,
+                    TrendingVideo.country_code == model.country_code,
+                    TrendingVideo.category_id == category_id,
+                ).exists()
+            )
+    return query.order_by(model.country_code, time_column)
+
+
+def iter_chunks(engine: Engine, query, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Sequence[Any]]]:
+    """Runs `query` on a server-side cursor and yields its rows `chunk_size` at a time."""
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(query)
+        for partition in result.partitions(chunk_size):
+            yield partition
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns: Sequence[str], chunks: Iterator[List[Sequence[Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows([_csv_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that keeps what was written until drained."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _arrow_schema(pa, columns: Sequence[Tuple[str, str]]):
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us"),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[type_name]) for name, type_name in columns])
+
+
+def encode_arrow(columns: Sequence[Tuple[str, str]], chunks: Iterator[List[Sequence[Any]]], parquet: bool = False) -> Iterator[bytes]:
+    """Encodes every chunk as one record batch (Arrow IPC stream) or one row group (Parquet)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportError("Parquet and Arrow exports need pyarrow installed.") from e
+
+    schema = _arrow_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if parquet else pa.ipc.new_stream(sink, schema)
+    try:
+        for chunk in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+            if parquet:
+                writer.write_batch(batch, row_group_size=len(chunk))
+            else:
+                writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export(engine: Engine, dataset: str, format: str, chunk_size: int = EXPORT_CHUNK_SIZE, **filters) -> Iterator[bytes]:
+    """
+    Streams a dataset in `format` as bytes. Raises ExportError for an unknown dataset or
+    format, or a missing pyarrow, before anything is read.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'. Supported datasets: {', '.join(DATASETS)}")
+    if format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown format '{format}'. Supported formats: {', '.join(EXPORT_FORMATS)}")
+    if format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ExportError("Parquet and Arrow exports need pyarrow installed.") from e
+
+    columns = DATASETS[dataset].columns
+    chunks = iter_chunks(engine, export_query(dataset, **filters), chunk_size)
+    if format == "csv":
+        return encode_csv([name for name, _ in columns], chunks)
+    return encode_arrow(columns, chunks, parquet=format == "parquet")
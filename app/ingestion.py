@@ -0,0 +1,208 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+FetchFn = Callable[[str], List[Dict[str, Any]]]
+FetchPagesFn = Callable[[str], Iterable[List[Dict[str, Any]]]]
+StoreFn = Callable[[str, List[Dict[str, Any]]], Any]
+# time.monotonic() by which the page being fetched must arrive, set while fetch_pages is
+# advanced. asyncio can stop waiting for a page but can't interrupt the thread fetching
+# it, so blocking clients read this to stop retrying once nobody is waiting.
+page_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("page_deadline", default=None)
+
+StoredHook = Callable[[str, Any], Awaitable[None]]
+FinishedHook = Callable[[str, "CountryResult"], Awaitable[None]]
+
+
+@dataclass
+class CountryBudget:
+    """
+    Error budget for a single country. After `max_failures` consecutive failures
+    the country is benched for `cooldown` so a broken region stops costing time
+    (and quota) on every cycle.
+    """
+    max_failures: int
+    cooldown: timedelta
+    consecutive_failures: int = 0
+    benched_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    def available(self, now: datetime) -> bool:
+        return self.benched_until is None or now >= self.benched_until
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.benched_until = None
+        self.last_error = None
+
+    def record_failure(self, error: str, now: datetime):
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.consecutive_failures >= self.max_failures:
+            self.benched_until = now + self.cooldown
+
+
+@dataclass
+class CountryResult:
+    country_code: str
+    status: str  # "ok", "empty", "error", "timeout" or "skipped"
+    videos: int = 0
+    duration_seconds: float = 0.0
+    error: Optional[str] = None
+    video_ids: List[str] = field(default_factory=list)
+
+
+class IngestionEngine:
+    """
+    Fetches and stores trending videos for many countries concurrently.
+
+    The blocking YouTube client and database writes run on a dedicated thread pool,
+    so the event loop keeps serving requests while a cycle is in progress. At most
+    `concurrency` countries are in flight at once, and each fetch is bounded by
+    `timeout_seconds` so one slow region can't hold up the rest.
+
+    Countries are ingested page by page: `fetch_pages` returns an iterator of pages
+    that is advanced on the thread pool, and every page is stored as soon as it
+    arrives, so memory use and the time to the first write don't grow with chart
+    depth. Each page fetch is bounded by `timeout_seconds`, which is also published to
+    the fetching thread as `page_deadline`. A plain `fetch` returning the whole chart is
+    treated as a single page.
+
+    `on_stored`, if given, is awaited on the event loop with the country code and
+    whatever `store` returned, right after each page is committed. `on_finished` is
+    awaited with the CountryResult once a country is done, successful or not
+    (skipped countries excepted).
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[FetchFn] = None,
+        store: Optional[StoreFn] = None,
+        concurrency: int = 8,
+        timeout_seconds: float = 60.0,
+        max_failures: int = 3,
+        cooldown: timedelta = timedelta(hours=1),
+        on_stored: Optional[StoredHook] = None,
+        fetch_pages: Optional[FetchPagesFn] = None,
+        on_finished: Optional[FinishedHook] = None,
+    ):
+        if (fetch is None) == (fetch_pages is None):
+            raise ValueError("Pass exactly one of fetch and fetch_pages.")
+        self.fetch = fetch
+        self.fetch_pages = fetch_pages or self._single_page
+        self.store = store
+        self.on_finished = on_finished
+        self.concurrency = max(1, concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.on_stored = on_stored
+        self.budgets: Dict[str, CountryBudget] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ingest")
+
+    def budget_for(self, country_code: str) -> CountryBudget:
+        if country_code not in self.budgets:
+            self.budgets[country_code] = CountryBudget(self.max_failures, self.cooldown)
+        return self.budgets[country_code]
+
+    async def run_cycle(self, countries: Iterable[str]) -> Dict[str, CountryResult]:
+        """Runs one ingestion cycle over `countries` and returns a result per country."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        countries = list(countries)
+        results = await asyncio.gather(
+            *(self._ingest_country(country_code, semaphore) for country_code in countries)
+        )
+        return {result.country_code: result for result in results}
+
+    async def _run_blocking(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        # Carry the current context over, so spans opened on the thread nest under the country's
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, fn, *args)
+
+    def _single_page(self, country_code: str) -> Iterator[List[Dict[str, Any]]]:
+        yield self.fetch(country_code)
+
+    async def _pages(self, country_code: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Async generator over fetch_pages(country_code), fetching each page on the thread pool."""
+        # fetch_pages must be lazy (e.g. a generator); nothing is fetched until next()
+        pages = iter(self.fetch_pages(country_code))
+        while True:
+            with span("ingest.fetch_page", country_code=country_code):
+                token = page_deadline.set(time.monotonic() + self.timeout_seconds)
+                try:
+                    page = await asyncio.wait_for(self._run_blocking(next, pages, None), timeout=self.timeout_seconds)
+                finally:
+                    page_deadline.reset(token)
+            if page is None:
+                return
+            yield page
+
+    async def _ingest_country(self, country_code: str, semaphore: asyncio.Semaphore) -> CountryResult:
+        with span("ingest.country", country_code=country_code) as current:
+            result = await self._fetch_and_store(country_code, semaphore)
+            if current is not None:
+                current.set_attributes({"status": result.status, "videos": result.videos})
+        if result.status != "skipped":
+            await self._notify(self.on_finished, country_code, result)
+        return result
+
+    async def _fetch_and_store(self, country_code: str, semaphore: asyncio.Semaphore) -> CountryResult:
+        budget = self.budget_for(country_code)
+        if not budget.available(datetime.utcnow()):
+            logger.warning(f"Skipping {country_code}: error budget exhausted until {budget.benched_until}.")
+            return CountryResult(country_code, "skipped", error=budget.last_error)
+
+        async with semaphore:
+            started = time.perf_counter()
+            # Only the IDs are kept across pages
+            video_ids: List[str] = []
+            try:
+                async for items in self._pages(country_code):
+                    if not items:
+                        continue
+                    with span("ingest.store_page", country_code=country_code, videos=len(items)):
+                        stored = await self._run_blocking(self.store, country_code, items)
+                    video_ids.extend(item["id"] for item in items)
+                    await self._notify(self.on_stored, country_code, stored)
+
+                budget.record_success()
+                duration = time.perf_counter() - started
+                if not video_ids:
+                    logger.warning(f"No trending videos found for {country_code}.")
+                    return CountryResult(country_code, "empty", duration_seconds=duration)
+
+                logger.info(f"Successfully fetched and stored {len(video_ids)} trending videos for {country_code} in {duration:.2f}s.")
+                return CountryResult(country_code, "ok", videos=len(video_ids), duration_seconds=duration, video_ids=video_ids)
+            except asyncio.TimeoutError:
+                error = f"fetch timed out after {self.timeout_seconds}s"
+                budget.record_failure(error, datetime.utcnow())
+                logger.error(f"Error in ingestion for {country_code}: {error}")
+                return CountryResult(country_code, "timeout", videos=len(video_ids),
+                                     duration_seconds=time.perf_counter() - started, error=error)
+            except Exception as e:
+                budget.record_failure(str(e), datetime.utcnow())
+                logger.error(f"Error in ingestion for {country_code}: {e}")
+                return CountryResult(country_code, "error", videos=len(video_ids),
+                                     duration_seconds=time.perf_counter() - started, error=str(e))
+
+    async def _notify(self, hook: Optional[Callable[[str, Any], Awaitable[None]]], country_code: str, value: Any):
+        # The data is already committed, so a failing hook must not count against the budget
+        if hook is None:
+            return
+        try:
+            await hook(country_code, value)
+        except Exception as e:
+            logger.error(f"Error in post-ingestion hook for {country_code}: {e}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,23 @@
+"""
+Periods of the channel and category leaderboards. Rollups are kept per day and per
+week (Monday to Sunday, UTC); a period is identified by its type and first day.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+LEADERBOARD_PERIODS = ("day", "week")
+
+
+def period_start(period: str, moment: datetime | date) -> date:
+    """First day of the `period` containing `moment`."""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown leaderboard period '{period}'.")
+
+
+def resolve_period(period: str, on: Optional[date] = None) -> date:
+    """First day of the `period` containing `on`, the current one by default."""
+    return period_start(period, on or datetime.utcnow().date())
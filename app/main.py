@@ -1,27 +1,61 @@
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from .database import SessionLocal, engine, Base, get_db
-from .models import TrendingVideo, VideoDailyMetric, VideoCategory
-from .schemas import TrendingVideoResponse, Alert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import SessionLocal, engine, get_db, get_async_db, get_async_engine
+from .models import TrendingVideo, VideoDailyMetric
+from .schemas import TrendingVideoResponse, Alert, VideoHistoryPoint, SpreadVideo, RegionFirstSeen, PropagationLag
+from .schemas import CategoryShare, ChannelLeaderboardEntry, SearchResult
+from . import crud_async
 from .crud import (
     add_or_update_trending_video_batch,
-    get_trending_videos,
-    get_alerts,
-    get_all_country_codes,
-    get_video_categories_from_db,
-    save_video_categories_to_db,
-    should_fetch_categories,
-    get_all_categories,
-    get_categories_stats
+    rollup_snapshots_to_daily,
+    record_country_runs,
+    get_country_fetch_states,
+    get_quota_used,
+    add_quota_units,
+    refresh_country_stats,
+    get_country_stats,
+    prune_leaderboard_members,
+    add_stream_events,
+    get_stream_events,
+    get_last_stream_event_id,
+    prune_stream_events,
+    record_stored_pages,
+    TRENDING_SORTS,
+    trending_sort_key
 )
-from .youtube_api import fetch_trending_videos, get_video_categories
+from .youtube_api import YOUTUBE_PAGE_SIZE, fetch_trending_pages, get_video_categories, get_client
+from .categories import CategoryService
+from .archive import RAW_ARCHIVE_COMPRESSION, RAW_ARCHIVE_DIR, RawArchive
+from . import metrics
+from .tracing import configure_tracing
+from .ingestion import IngestionEngine
+from .events import EventBroker, OutboxCursor, TrendingDiffer, format_sse
+from .cache import InMemoryBackend, ResponseCache, create_backend
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+from .propagation import median_lag
+from .leaderboards import LEADERBOARD_PERIODS, resolve_period
+from .export import EXPORT_FORMATS, ExportError, export
+from .scheduler import LeaderScheduler
+from .adaptive import AdaptivePolicy, QuotaBudget, chart_churn, schedule_next, select_due
+from pydantic import TypeAdapter
 from fastapi_utilities import repeat_every
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import hashlib
+import json
 import logging
+import os
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+import math
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,126 +70,433 @@ origins = [
     "http://127.0.0.1:5173",  
 ]
 
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic only: run `alembic upgrade head` before starting the
+# app (the Dockerfile, docker-compose.yml and render.yml do)
 
-TRACKED_COUNTRIES = ["US", "IN", "GB", "CA", "DE", "FR", "JP", "AU"]
+TRACKED_COUNTRIES = os.getenv("TRACKED_COUNTRIES", "US,IN,GB,CA,DE,FR,JP,AU").split(",")
 FETCH_INTERVAL_SECONDS = 6 * 60 * 60
 CATEGORY_CACHE_HOURS = 24
 
-# Store categories for quick lookup
-VIDEO_CATEGORIES: dict = {}
+# Chart depth per region, followed page by page, and extra per-category charts to fetch
+# (comma-separated videoCategoryIds) on top of the overall chart
+TRENDING_MAX_RESULTS = int(os.getenv("TRENDING_MAX_RESULTS", "200"))
+TRENDING_CATEGORY_IDS = [c for c in os.getenv("TRENDING_CATEGORY_IDS", "").split(",") if c]
 
-async def load_video_categories():
+# Ingestion engine tuning
+INGESTION_CONCURRENCY = int(os.getenv("INGESTION_CONCURRENCY", "8"))
+# Per page; must exceed YOUTUBE_HTTP_TIMEOUT_SECONDS, the socket timeout of each request
+COUNTRY_FETCH_TIMEOUT_SECONDS = float(os.getenv("COUNTRY_FETCH_TIMEOUT_SECONDS", "60"))
+COUNTRY_MAX_FAILURES = int(os.getenv("COUNTRY_MAX_FAILURES", "3"))
+COUNTRY_COOLDOWN_MINUTES = int(os.getenv("COUNTRY_COOLDOWN_MINUTES", "60"))
+
+# Leader election: only the lease holder runs ingestion
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+SCHEDULER_POLL_SECONDS = int(os.getenv("SCHEDULER_POLL_SECONDS", "15"))
+SCHEDULER_TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+
+# Adaptive per-country intervals, starting from FETCH_INTERVAL_SECONDS, within the API key's
+# daily quota. videos.list costs 1 unit per page.
+MIN_FETCH_INTERVAL_SECONDS = int(os.getenv("MIN_FETCH_INTERVAL_SECONDS", str(30 * 60)))
+MAX_FETCH_INTERVAL_SECONDS = int(os.getenv("MAX_FETCH_INTERVAL_SECONDS", str(24 * 60 * 60)))
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+YOUTUBE_UNITS_PER_FETCH = math.ceil(TRENDING_MAX_RESULTS / YOUTUBE_PAGE_SIZE) * (1 + len(TRENDING_CATEGORY_IDS))
+
+# Push stream: events buffered per client before new ones are dropped for it
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "100"))
+STREAM_KEEPALIVE_SECONDS = 15
+# Every worker polls the stream_events outbox this often for events published by the
+# ingestion leader; they are kept for STREAM_EVENT_RETENTION_HOURS
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "2"))
+STREAM_EVENT_RETENTION_HOURS = int(os.getenv("STREAM_EVENT_RETENTION_HOURS", "24"))
+# How long a worker keeps re-reading a gap in outbox ids for an event still committing
+STREAM_GAP_SECONDS = float(os.getenv("STREAM_GAP_SECONDS", "30"))
+
+# Shared cache: redis://host:port/db to share responses and ingestion
+# results across workers and replicas; in-memory (per process) when unset
+CACHE_URL = os.getenv("CACHE_URL")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# OpenTelemetry spans for ingestion (needs opentelemetry-sdk and the OTLP exporter;
+# the endpoint is set with the standard OTEL_EXPORTER_OTLP_* variables)
+OTEL_TRACING_ENABLED = os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "yttrends")
+
+# Longest accepted /search query, in characters
+SEARCH_MAX_QUERY_LENGTH = 200
+
+# Full-resolution snapshots are kept this long before being rolled up into daily metrics
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "14"))
+
+cache_backend = create_backend(CACHE_URL, max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+# Ingestion state (the last cycle's results, the rollup cutoff) must never be evicted by
+# responses, so the in-memory backend keeps it apart. In Redis it has no TTL, which the
+# volatile-* eviction policies never evict.
+state_backend = cache_backend if cache_backend.shared else InMemoryBackend(max_entries=None)
+
+raw_archive = RawArchive(RAW_ARCHIVE_DIR, RAW_ARCHIVE_COMPRESSION) if RAW_ARCHIVE_DIR else None
+# Fetches are archived one at a time, off the ingestion threads and the event loop
+archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+
+async def on_categories_changed(categories):
+    """Tells every worker to reload the categories this one just stored."""
+    await publish_events([{"type": "categories"}])
+
+# Per-region category names; ingestion reads the published map, never the database
+category_service = CategoryService(
+    get_video_categories,
+    TRACKED_COUNTRIES,
+    max_age=timedelta(hours=CATEGORY_CACHE_HOURS),
+    concurrency=INGESTION_CONCURRENCY,
+    on_change=on_categories_changed,
+)
+
+adaptive_policy = AdaptivePolicy(
+    default_interval=FETCH_INTERVAL_SECONDS,
+    min_interval=MIN_FETCH_INTERVAL_SECONDS,
+    max_interval=MAX_FETCH_INTERVAL_SECONDS,
+)
+quota_budget = QuotaBudget(daily_units=YOUTUBE_DAILY_QUOTA, units_per_fetch=YOUTUBE_UNITS_PER_FETCH)
+
+event_broker = EventBroker(queue_size=STREAM_QUEUE_SIZE)
+trending_differ = TrendingDiffer()
+trending_cache = ResponseCache(cache_backend, namespace="trending", ttl=FETCH_INTERVAL_SECONDS)
+metrics.stats_collector.add_cache(trending_cache)
+metrics.stats_collector.add_pool("sync", lambda: engine.pool)
+metrics.stats_collector.add_pool("async", lambda: get_async_engine().pool)
+trending_videos_adapter = TypeAdapter(List[TrendingVideoResponse])
+
+def store_country_batch(country_code: str, trending_items: list):
     """
-    Load video categories from database or fetch from API if needed.
+    Stores one page of a country's chart in its own session. Runs on an ingestion worker thread,
+    so it must not share a Session with any other country.
     """
-    global VIDEO_CATEGORIES
     db: Session = SessionLocal()
-    
     try:
-        # First, try to load from database
-        cached_categories = get_video_categories_from_db(db)
-        
-        if cached_categories:
-            VIDEO_CATEGORIES = cached_categories
-            logger.info(f"Loaded {len(VIDEO_CATEGORIES)} video categories from database cache.")
-            return
-        
-        # If no cached data or cache is expired, fetch from API
-        logger.info("Fetching video categories from YouTube API...")
-        fresh_categories = {}
-        
-        for country in TRACKED_COUNTRIES:
-            try:
-                categories = await get_video_categories(country)
-                if categories:
-                    fresh_categories.update(categories)
-            except Exception as e:
-                logger.error(f"Error fetching categories for {country}: {e}")
-        
-        if fresh_categories:
-            VIDEO_CATEGORIES = fresh_categories
-            # Save to database
-            save_video_categories_to_db(db, fresh_categories)
-            logger.info(f"Fetched and cached {len(VIDEO_CATEGORIES)} video categories.")
-        else:
-            logger.warning("No video categories could be fetched from API.")
-            
+        with metrics.STORE_SECONDS.labels(country_code).time():
+            rows = add_or_update_trending_video_batch(db, trending_items, country_code, category_service.current.names(country_code))
+        metrics.ROWS_WRITTEN.labels(country_code).inc(len(rows))
+        metrics.VIRAL_SPIKES.labels(country_code).inc(sum(1 for row in rows if row["is_viral_spike"]))
+        return rows
+    finally:
+        db.close()
+
+def fetch_country_pages(country_code: str):
+    """
+    The country's chart page by page, timing each API round trip. With RAW_ARCHIVE_DIR set,
+    the pages received are archived once the fetch ends, even if it failed part way, and
+    the pages stored are recorded so replays only store the others.
+    """
+    fetched_at = datetime.utcnow()
+    pages = fetch_trending_pages(country_code, max_results=TRENDING_MAX_RESULTS, category_ids=TRENDING_CATEGORY_IDS)
+    received = []
+    stored = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            page = next(pages, None)
+            if page is None:
+                return
+            metrics.YOUTUBE_FETCH_SECONDS.labels(country_code).observe(time.perf_counter() - started)
+            if raw_archive:
+                received.append(page)
+            yield page
+            # The ingestion engine stores each page before asking for the next one
+            stored += 1
+    finally:
+        # A generator abandoned after an error or timeout is finalized wherever it is
+        # collected, possibly on the event loop, so the file and database work is handed off
+        if received:
+            archive_executor.submit(archive_fetch, country_code, fetched_at, received, stored)
+
+def archive_fetch(country_code: str, fetched_at: datetime, pages: list, stored: int):
+    """Archives a fetch's pages and records the first `stored` of them as stored."""
+    try:
+        entry = raw_archive.write(country_code, fetched_at, pages)
+    except Exception as e:
+        logger.error(f"Error archiving the trending chart of {country_code}: {e}")
+        return
+    db: Session = SessionLocal()
+    try:
+        record_stored_pages(db, country_code, fetched_at, [number for number in range(stored) if pages[number]], entry.object, "live")
     except Exception as e:
-        logger.error(f"Error loading video categories: {e}")
+        logger.error(f"Error recording the stored pages of {country_code}'s chart: {e}")
     finally:
         db.close()
 
-async def check_and_refresh_categories():
+async def on_country_stored(country_code: str, rows: list):
+    """Runs right after each page of a country's chart is committed."""
+    await trending_cache.ainvalidate_country(country_code)
+    await publish_country_update(country_code, rows)
+
+async def on_country_finished(country_code: str, result):
+    """Runs once a country's ingestion is done; publishes the videos that left its chart."""
+    metrics.INGESTED_COUNTRIES.labels(country_code, result.status).inc()
+    if result.status != "ok":
+        trending_differ.discard(country_code)
+        return
+    event = trending_differ.finish(country_code)
+    if event["removed"]:
+        await publish_events([event])
+
+def save_stream_events(events: list):
+    db: Session = SessionLocal()
+    try:
+        add_stream_events(db, events)
+    finally:
+        db.close()
+
+async def publish_events(events: list):
     """
-    Check if categories need to be refreshed and update if necessary.
+    Publishes events to the stream clients of every worker, through the stream_events
+    outbox. Any worker may publish; the relays' OutboxCursor copes with ids committing
+    out of order.
     """
+    await asyncio.to_thread(save_stream_events, events)
+
+async def publish_country_update(country_code: str, rows: list):
+    """Publishes the diff for a freshly committed page and any new alerts in it."""
+    # Written even when nothing moved: it is also the other workers' cue to drop their
+    # cached responses for the country
+    events = [trending_differ.diff_page(country_code, rows)]
+    for row in rows:
+        if row["is_viral_spike"]:
+            events.append({
+                "type": "alert",
+                "country_code": country_code,
+                "category_id": row["category_id"],
+                "video_id": row["video_id"],
+                "title": row["title"],
+                "alert_type": "Viral Spike",
+                "current_views": row["view_count"],
+                "previous_views": row["previous_view_count"] or 0,
+                "view_change": row["view_count_change"] or 0,
+                "timestamp": row["fetched_at"],
+            })
+    await publish_events(events)
+
+def load_stream_events(after_id: int) -> list:
     db: Session = SessionLocal()
     try:
-        if should_fetch_categories(db, CATEGORY_CACHE_HOURS):
-            logger.info("Categories cache expired, refreshing...")
-            await load_video_categories()
+        return get_stream_events(db, after_id)
+    finally:
+        db.close()
+
+def load_last_stream_event_id() -> int:
+    db: Session = SessionLocal()
+    try:
+        return get_last_stream_event_id(db)
+    finally:
+        db.close()
+
+async def relay_stream_events(cursor: OutboxCursor) -> int:
+    """
+    Hands the outbox events after `cursor` to this worker's stream clients. A worker with
+    its own response cache first drops its entries for the countries they touch; a shared
+    cache was already invalidated by the leader. A `categories` event makes the worker
+    reload its categories instead. Returns how many events were relayed.
+    """
+    events = cursor.accept(await asyncio.to_thread(load_stream_events, cursor.after_id))
+    if not events:
+        return 0
+    if any(event["type"] == "categories" for _, event in events):
+        await asyncio.to_thread(category_service.load)
+    if not cache_backend.shared:
+        for country_code in {event["country_code"] for _, event in events if event["type"] == "trending"}:
+            await trending_cache.ainvalidate_country(country_code)
+    for _, event in events:
+        if event["type"] == "categories":
+            continue
+        if event["type"] != "trending" or event["added"] or event["updated"] or event["removed"]:
+            event_broker.publish(event)
+    return len(events)
+
+async def run_stream_relay():
+    """Polls the outbox every STREAM_POLL_SECONDS for as long as the worker runs."""
+    # Only events published from now on; clients catch up on the rest through the API
+    cursor = OutboxCursor(await asyncio.to_thread(load_last_stream_event_id), grace_seconds=STREAM_GAP_SECONDS)
+    while True:
+        await asyncio.sleep(STREAM_POLL_SECONDS)
+        try:
+            await relay_stream_events(cursor)
+        except Exception as e:
+            logger.error(f"Error relaying stream events: {e}")
+
+ingestion_engine = IngestionEngine(
+    fetch_pages=fetch_country_pages,
+    store=store_country_batch,
+    concurrency=INGESTION_CONCURRENCY,
+    timeout_seconds=COUNTRY_FETCH_TIMEOUT_SECONDS,
+    max_failures=COUNTRY_MAX_FAILURES,
+    cooldown=timedelta(minutes=COUNTRY_COOLDOWN_MINUTES),
+    on_stored=on_country_stored,
+    on_finished=on_country_finished,
+)
+
+def rollup_expired_snapshots():
+    """
+    Rolls snapshots older than SNAPSHOT_RETENTION_DAYS (whole days only) into daily metrics.
+    Runs at most once per cutoff day, pruning finished leaderboard periods and old stream
+    events along the way.
+    """
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=SNAPSHOT_RETENTION_DAYS), datetime.min.time())
+    if state_backend.get("snapshots:rolled_up_before") == cutoff.date().isoformat().encode():
+        return
+    db: Session = SessionLocal()
+    try:
+        rolled_up = rollup_snapshots_to_daily(db, cutoff)
+        # Only the current periods need to know which videos they already counted
+        prune_leaderboard_members(db, resolve_period("week"))
+        prune_stream_events(db, datetime.utcnow() - timedelta(hours=STREAM_EVENT_RETENTION_HOURS))
+        state_backend.set("snapshots:rolled_up_before", cutoff.date().isoformat().encode())
+        if rolled_up:
+            logger.info(f"Rolled up snapshots older than {cutoff.date()} into {rolled_up} daily metrics.")
+    finally:
+        db.close()
+
+def quota_day() -> str:
+    """The current YouTube quota day; Google resets quotas at midnight Pacific time."""
+    try:
+        return datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+    except ZoneInfoNotFoundError:
+        return datetime.utcnow().date().isoformat()
+
+def plan_fetches(now: datetime):
+    """
+    Returns the countries due now (most overdue first, capped by the quota left today),
+    their current fetch states and the factor every interval is stretched by so that
+    the projected daily spend fits YOUTUBE_DAILY_QUOTA.
+    """
+    db: Session = SessionLocal()
+    try:
+        states = {state.country_code: state for state in get_country_fetch_states(db)}
+        used_today = get_quota_used(db, quota_day())
+    finally:
+        db.close()
+
+    intervals = [
+        (states[code].interval_seconds if code in states else None) or adaptive_policy.default_interval
+        for code in TRACKED_COUNTRIES
+    ]
+    stretch = quota_budget.stretch_factor(intervals)
+    next_runs = {code: states[code].next_run_at if code in states else None for code in TRACKED_COUNTRIES}
+    return select_due(next_runs, now, quota_budget, used_today), states, stretch
+
+def save_country_runs(results: dict, states: dict, stretch: float, finished_at: datetime, units_spent: int):
+    """
+    Persists each country's latest run and reschedules it: the interval shrinks when its
+    chart churned and grows when it barely changed. Also books the quota units spent by
+    the cycle and refreshes the /stats summary. Benched countries keep their last real run.
+    """
+    runs = []
+    for code, result in results.items():
+        if result.status == "skipped":
+            continue
+        state = states.get(code)
+        interval = state.interval_seconds if state else None
+        run = {
+            "country_code": code,
+            "last_run_at": finished_at,
+            "last_duration_seconds": result.duration_seconds,
+            "last_status": result.status,
+            "last_error": result.error,
+            "videos": result.videos,
+        }
+        if result.status == "ok":
+            churn = chart_churn(state.last_video_ids if state else None, result.video_ids)
+            interval = adaptive_policy.next_interval(interval, churn)
+            run.update(last_churn=churn, last_video_ids=result.video_ids)
         else:
-            logger.info("Categories cache is still valid.")
-    except Exception as e:
-        logger.error(f"Error checking category cache: {e}")
+            interval = interval or adaptive_policy.default_interval
+        run.update(interval_seconds=interval, next_run_at=schedule_next(finished_at, interval, stretch))
+        runs.append(run)
+
+    db: Session = SessionLocal()
+    try:
+        record_country_runs(db, runs)
+        add_quota_units(db, quota_day(), units_spent)
+        # Every tracked country, so the summary also fills in after a fresh deploy
+        refresh_country_stats(db, TRACKED_COUNTRIES, refreshed_at=finished_at)
     finally:
         db.close()
 
 async def fetch_and_store_trending_videos_task():
     """
     Background task to periodically fetch trending videos and store them.
+    Runs every SCHEDULER_TICK_SECONDS; the countries that are due are ingested
+    concurrently by the ingestion engine.
     """
-    logger.info(f"Starting scheduled fetch of trending videos for {TRACKED_COUNTRIES}...")
-    
-    db: Session = SessionLocal()
     try:
-        # Check if we need to refresh categories
-        await check_and_refresh_categories()
-        
-        # Ensure we have categories loaded
-        if not VIDEO_CATEGORIES:
-            await load_video_categories()
-
-        for country_code in TRACKED_COUNTRIES:
-            try:
-                trending_items = fetch_trending_videos(country_code=country_code)
-                if trending_items:
-                    add_or_update_trending_video_batch(db, trending_items, country_code, VIDEO_CATEGORIES)
-                    logger.info(f"Successfully fetched and stored {len(trending_items)} trending videos for {country_code}.")
-                else:
-                    logger.warning(f"No trending videos found for {country_code}.")
-            except Exception as e:
-                logger.error(f"Error in background task for {country_code}: {e}")
+        started_at = datetime.utcnow()
+        due, states, stretch = await asyncio.to_thread(plan_fetches, started_at)
+        if not due:
+            return
+
+        logger.info(f"Starting scheduled fetch of trending videos for {len(due)} countries: {due}")
+        # Every request the client sends costs quota (retries and category refreshes included)
+        units_before = get_client().units_used
+
+        # Refetches only the regions whose categories are older than CATEGORY_CACHE_HOURS
+        await category_service.refresh()
+
+        results = await ingestion_engine.run_cycle(due)
+        failed = [code for code, result in results.items() if result.status in ("error", "timeout")]
+        if failed:
+            logger.warning(f"Ingestion failed for {len(failed)} countries: {failed}")
+
+        finished_at = datetime.utcnow()
+        metrics.INGESTION_CYCLE_SECONDS.observe((finished_at - started_at).total_seconds())
+        units_spent = get_client().units_used - units_before
+        await asyncio.to_thread(save_country_runs, results, states, stretch, finished_at, units_spent)
+
+        await state_backend.aset("ingestion:last_cycle", json.dumps({
+            "started_at": started_at.isoformat(),
+            "finished_at": finished_at.isoformat(),
+            "quota_stretch_factor": stretch,
+            "countries": {
+                code: {key: value for key, value in asdict(result).items() if key != "video_ids"}
+                for code, result in results.items()
+            },
+        }).encode())
+
+        await asyncio.to_thread(rollup_expired_snapshots)
+        logger.info("Finished scheduled fetch of trending videos.")
     except Exception as e:
         logger.error(f"Critical error in background task: {e}")
-    finally:
-        db.close()
-    
-    logger.info("Finished scheduled fetch of trending videos.")
+
+ingestion_scheduler = LeaderScheduler(
+    "trending-ingestion",
+    fetch_and_store_trending_videos_task,
+    interval_seconds=SCHEDULER_TICK_SECONDS,
+    lease_seconds=SCHEDULER_LEASE_SECONDS,
+    poll_seconds=SCHEDULER_POLL_SECONDS,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Application starting up...")
+    if OTEL_TRACING_ENABLED and configure_tracing(OTEL_SERVICE_NAME):
+        logger.info("OpenTelemetry tracing enabled.")
     
-    logger.info("Loading video categories...")
-    await load_video_categories()
+    # Stored categories are enough to start; the ingestion leader refetches stale regions
+    # before each cycle, and every worker reloads them when it publishes a change
+    categories = await asyncio.to_thread(category_service.load)
+    logger.info(f"Loaded {len(categories)} video categories for {len(categories.regions)} regions.")
     
-    logger.info("Fetching initial trending videos data...")
-    asyncio.create_task(fetch_and_store_trending_videos_task())
-    
-    # Start the recurring task
-    asyncio.create_task(recurring_fetch_task())
+    # Every worker runs the scheduler; only the lease holder ingests, and only when due
+    scheduler_task = asyncio.create_task(ingestion_scheduler.run())
+    # ...and relays what the leader publishes to its own stream clients and cache
+    relay_task = asyncio.create_task(run_stream_relay())
     
     yield
     
     logger.info("Application shutting down...")
-
-async def recurring_fetch_task():
-    """Recurring task that runs every FETCH_INTERVAL_SECONDS"""
-    while True:
-        await asyncio.sleep(FETCH_INTERVAL_SECONDS)
-        await fetch_and_store_trending_videos_task()
+    scheduler_task.cancel()
+    relay_task.cancel()
+    await ingestion_scheduler.stop()
+    ingestion_engine.shutdown()
+    # Lets the fetches already handed off finish archiving
+    await asyncio.to_thread(archive_executor.shutdown)
+    await get_async_engine().dispose()
 
 app = FastAPI(
     title="YouTube Trend Tracker API",
@@ -172,6 +513,17 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The route template, not the path, so per-video and per-country URLs share a series
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    return response
+
 # --- API Endpoints ---
 
 @app.get("/")
@@ -183,58 +535,246 @@ async def root():
         "endpoints": {
             "docs": "/docs",
             "trending": "/trending-videos/{country_code}",
+            "search": "/search?q=",
+            "export": "/export/{trending|snapshots|daily}?format=csv|parquet|arrow",
+            "history": "/videos/{video_id}/history?country_code=",
             "alerts": "/alerts",
-            "countries": "/countries"
+            "stream": "/stream",
+            "countries": "/countries",
+            "analytics": "/analytics/overlap, /analytics/first-seen/{country_code}, /analytics/propagation",
+            "leaderboards": "/leaderboards/channels, /leaderboards/categories",
+            "metrics": "/metrics"
         }
     }
 
 @app.get("/health")
-async def health_check():
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """
-    Health check endpoint to verify API is responsive.
-    This is a basic liveness check, not a full database connectivity check.
+    Health check endpoint: the API is responsive and the database answers. Returns 503
+    when it doesn't.
     """
+    try:
+        started = time.perf_counter()
+        await db.execute(text("SELECT 1"))
+        database_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        logger.error(f"Health check failed to reach the database: {e}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
+        "database_ms": round(database_ms, 2),
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics of this worker process."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
 
 @app.get("/trending-videos/{country_code}", response_model=List[TrendingVideoResponse])
 async def get_latest_trending_videos(
     country_code: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    spikes_only: bool = False,
+    sort: str = "fetched_at",
+    cursor: Optional[str] = None
 ):
     """
-    Retrieve the latest trending videos for a specified country.
+    Retrieve the latest trending videos for a specified country; with `spikes_only`,
+    only the videos currently flagged as viral spikes.
+    `sort` is one of fetched_at (default), views, view_change or like_ratio, highest first.
+    When more results may follow, the X-Next-Cursor header holds an opaque cursor; pass
+    it back as `cursor` (with the same sort) to get the next page.
+    Responses are cached until the next ingestion of the country and carry an ETag;
+    send it back in If-None-Match to get a 304 when nothing changed.
     """
     if country_code not in TRACKED_COUNTRIES:
         raise HTTPException(
             status_code=400, 
             detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
         )
+    if sort not in TRENDING_SORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort. Supported sorts: {', '.join(TRENDING_SORTS)}"
+        )
+    try:
+        after = decode_cursor(cursor, sort) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        videos = get_trending_videos(db, country_code, skip=skip, limit=limit)
-        if not videos:
-            raise HTTPException(
-                status_code=404, 
-                detail="No trending videos found for this country yet. Data collection may be in progress."
+        cache_key = (country_code, skip, limit, spikes_only, sort, cursor)
+        backend_key, cached = await trending_cache.alookup(cache_key)
+        if cached is None:
+            videos = await crud_async.get_trending_videos(
+                db, country_code, skip=skip, limit=limit, spikes_only=spikes_only, sort=sort, after=after
+            )
+            if not videos:
+                raise HTTPException(
+                    status_code=404, 
+                    detail="No trending videos found for this country yet. Data collection may be in progress."
+                )
+            body = trending_videos_adapter.dump_json(
+                trending_videos_adapter.validate_python(videos, from_attributes=True)
             )
-        return videos
+            headers = {}
+            if len(videos) == limit:
+                headers["X-Next-Cursor"] = encode_cursor(sort, *trending_sort_key(videos[-1], sort))
+            cached = await trending_cache.aset(backend_key, body, headers)
+
+        if cached.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": cached.etag, **cached.headers})
+        return Response(content=cached.body, media_type="application/json", headers={"ETag": cached.etag, **cached.headers})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching trending videos for {country_code}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def search_cursor_scope(q: str, country_code: Optional[str], category_id: Optional[str]) -> str:
+    """Digest of a search's query and filters, carried by its cursors."""
+    search = json.dumps([q, country_code, category_id], separators=(",", ":"))
+    return hashlib.blake2b(search.encode(), digest_size=8).hexdigest()
+
+@app.get("/search", response_model=List[SearchResult])
+async def search_trending_videos(
+    q: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    country_code: Optional[str] = None,
+    category_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    Search trending videos by keyword in their title, tags and description, best match
+    first. On PostgreSQL `q` supports "quoted phrases", or, and -excluded words. When more
+    results may follow, pass the X-Next-Cursor header back as `cursor` for the next page
+    of the same search; a cursor from another search is rejected.
+    """
+    if not q.split() or len(q) > SEARCH_MAX_QUERY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"q must contain a word and be at most {SEARCH_MAX_QUERY_LENGTH} characters.")
+    if country_code and country_code not in TRACKED_COUNTRIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
+        )
+    scope = search_cursor_scope(q, country_code, category_id)
+    try:
+        after = decode_cursor(cursor, "search", scope) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        matches = await crud_async.search_videos(db, q, country_code, category_id, after=after, limit=limit)
+        if len(matches) == limit:
+            last_video, last_rank = matches[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor("search", last_rank, last_video.id, scope)
+        return [
+            SearchResult(**TrendingVideoResponse.model_validate(video).model_dump(), rank=rank)
+            for video, rank in matches
+        ]
+    except Exception as e:
+        logger.error(f"Error searching for '{q}': {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/ingestion/status")
+async def get_ingestion_status():
+    """
+    Per-country results of the most recent ingestion cycle, from the shared cache.
+    """
+    last_cycle = await state_backend.aget("ingestion:last_cycle")
+    if last_cycle is None:
+        raise HTTPException(status_code=404, detail="No ingestion cycle has completed yet.")
+    return json.loads(last_cycle)
+
+@app.get("/scheduler/status")
+async def get_scheduler_status(db: AsyncSession = Depends(get_async_db)):
+    """
+    Current ingestion leader, quota spend and each country's last run and adaptive schedule.
+    """
+    try:
+        status = await asyncio.to_thread(ingestion_scheduler.status)
+        states = await crud_async.get_country_fetch_states(db)
+        intervals = [
+            next((state.interval_seconds for state in states if state.country_code == code), None)
+            or adaptive_policy.default_interval
+            for code in TRACKED_COUNTRIES
+        ]
+        status["quota"] = {
+            "day": quota_day(),
+            "units_used": await crud_async.get_quota_used(db, quota_day()),
+            "daily_budget": quota_budget.daily_units,
+            "projected_daily_units": quota_budget.projected_daily_units(intervals),
+            "stretch_factor": quota_budget.stretch_factor(intervals),
+        }
+        status["countries"] = [
+            {
+                "country_code": state.country_code,
+                "last_run_at": state.last_run_at,
+                "last_duration_seconds": state.last_duration_seconds,
+                "last_status": state.last_status,
+                "last_error": state.last_error,
+                "videos": state.videos,
+                "last_churn": state.last_churn,
+                "interval_seconds": state.interval_seconds,
+                "next_run_at": state.next_run_at,
+            }
+            for state in states
+        ]
+        return status
+    except Exception as e:
+        logger.error(f"Error fetching scheduler status: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters of the trending-videos response cache.
+    """
+    return trending_cache.stats()
+
+@app.get("/videos/{video_id}/history", response_model=List[VideoHistoryPoint])
+async def get_video_history_endpoint(
+    video_id: str,
+    country_code: str,
+    db: AsyncSession = Depends(get_async_db),
+    days: int = 30
+):
+    """
+    Retrieve the view/like/comment history of a video in a country, oldest first.
+    Recent points are per-fetch snapshots; older ones are daily rollups.
+    """
+    if country_code not in TRACKED_COUNTRIES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
+        )
+
+    try:
+        end = datetime.utcnow()
+        history = await crud_async.get_video_history(db, video_id, country_code, end - timedelta(days=days), end)
+        if not history:
+            raise HTTPException(status_code=404, detail="No history found for this video.")
+        return history
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching history for {video_id} in {country_code}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/countries", response_model=List[str])
-async def get_supported_countries(db: Session = Depends(get_db)):
+async def get_supported_countries(db: AsyncSession = Depends(get_async_db)):
     """
     Get a list of all country codes for which data is being collected.
     """
     try:
-        country_codes = get_all_country_codes(db)
+        country_codes = await crud_async.get_all_country_codes(db)
         return country_codes if country_codes else TRACKED_COUNTRIES
     except Exception as e:
         logger.error(f"Error fetching country codes: {e}")
@@ -242,94 +782,381 @@ async def get_supported_countries(db: Session = Depends(get_db)):
 
 @app.get("/alerts", response_model=List[Alert])
 async def get_viral_alerts(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     country_code: Optional[str] = None,
-    since_hours: int = 24
+    since_id: Optional[int] = None,
+    since_hours: int = 24,
+    limit: int = 100
 ):
     """
-    Retrieve alerts for sudden viral spikes.
+    Retrieve alerts for sudden viral spikes, oldest first.
+    Pass the id of the last alert you've seen as `since_id` (also returned in the
+    X-Next-Since-Id header) to receive only newer ones; without it, alerts from the
+    last `since_hours` are returned.
     """
     try:
         triggered_since = datetime.utcnow() - timedelta(hours=since_hours)
-        trending_videos = get_alerts(db, country_code, triggered_since)
+        video_alerts = await crud_async.get_alerts(db, country_code, since_id=since_id, triggered_since=triggered_since, limit=min(limit, 1000))
         
         alerts = []
-        for video in trending_videos:
+        for alert in video_alerts:
             alerts.append(Alert(
-                video_id=video.video_id,
-                title=video.title,
-                country_code=video.country_code,
-                alert_type="Viral Spike",
-                current_views=video.view_count,
-                previous_views=video.previous_view_count or 0,
-                view_change=video.view_count_change or 0,
-                timestamp=video.fetched_at
+                id=alert.id,
+                video_id=alert.video_id,
+                title=alert.title,
+                country_code=alert.country_code,
+                alert_type=alert.alert_type,
+                current_views=alert.current_views,
+                previous_views=alert.previous_views,
+                view_change=alert.view_change,
+                timestamp=alert.created_at
             ))
+        next_since_id = alerts[-1].id if alerts else since_id
+        if next_since_id is not None:
+            response.headers["X-Next-Since-Id"] = str(next_since_id)
         return alerts
     except Exception as e:
         logger.error(f"Error fetching alerts: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    country_code: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    category_id: Optional[str] = None
+):
+    """
+    Streams a whole dataset as a file: `trending` (the current row of every video per
+    country), `snapshots` (per-fetch metrics) or `daily` (rolled-up metrics). `format` is
+    csv, parquet or arrow (IPC stream). Rows are filtered by country, category and
+    [since, until) in the database and read in chunks, so any size can be exported.
+    """
+    if country_code and country_code not in TRACKED_COUNTRIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
+        )
+    try:
+        body = export(engine, dataset, format, country_code=country_code, since=since, until=until, category_id=category_id)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = "_".join(part for part in (dataset, country_code, category_id) if part) + f".{extension}"
+    # A sync iterator: Starlette reads it on a worker thread, off the event loop
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/stream")
+async def stream_events(
+    request: Request,
+    countries: Optional[str] = None,
+    categories: Optional[str] = None
+):
+    """
+    Server-sent events pushed within STREAM_POLL_SECONDS of ingestion committing a country
+    (`trending`, a diff of added/updated/removed videos) or raising an alert (`alert`). Filter with comma-separated
+    `countries` and `categories` (category ids). A `dropped` event tells a client that fell
+    behind how many events it missed, so it can refetch.
+    """
+    subscription = event_broker.subscribe(
+        set(countries.split(",")) if countries else None,
+        set(categories.split(",")) if categories else None,
+    )
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.dropped:
+                    yield format_sse({"type": "dropped", "count": subscription.dropped})
+                    subscription.dropped = 0
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def spread_videos_response(db: AsyncSession, videos: list) -> List[SpreadVideo]:
+    """SpreadVideo models for VideoSpread rows, with the countries each one reached in order."""
+    regions = await crud_async.get_video_regions(db, [video.video_id for video in videos])
+    return [
+        SpreadVideo(
+            video_id=video.video_id,
+            title=video.title,
+            channel_title=video.channel_title,
+            origin_country=video.origin_country,
+            first_seen_at=video.first_seen_at,
+            region_count=video.region_count,
+            regions=[
+                RegionFirstSeen(
+                    country_code=region.country_code,
+                    first_seen_at=region.first_seen_at,
+                    lag_hours=region.lag_seconds / 3600 if region.lag_seconds is not None else None,
+                )
+                for region in regions[video.video_id]
+            ],
+        )
+        for video in videos
+    ]
+
+@app.get("/analytics/overlap", response_model=List[SpreadVideo])
+async def get_cross_country_overlap(db: AsyncSession = Depends(get_async_db), min_regions: int = 2, limit: int = 50):
+    """
+    Videos that trended in at least `min_regions` countries, widest spread first, with the
+    country each one trended in first and when it reached the others.
+    """
+    try:
+        videos = await crud_async.get_spreading_videos(db, min_regions=min_regions, limit=min(limit, 500))
+        return await spread_videos_response(db, videos)
+    except Exception as e:
+        logger.error(f"Error fetching cross-country overlap: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/analytics/first-seen/{country_code}", response_model=List[SpreadVideo])
+async def get_first_seen_in_country(country_code: str, db: AsyncSession = Depends(get_async_db), limit: int = 50):
+    """
+    Videos that trended in a country before any other tracked country, newest first.
+    """
+    if country_code not in TRACKED_COUNTRIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
+        )
+    try:
+        videos = await crud_async.get_videos_by_origin(db, country_code, limit=min(limit, 500))
+        return await spread_videos_response(db, videos)
+    except Exception as e:
+        logger.error(f"Error fetching videos first seen in {country_code}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/analytics/videos/{video_id}/spread", response_model=SpreadVideo)
+async def get_video_spread(video_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    The countries a video trended in, in the order it reached them.
+    """
+    try:
+        video = await crud_async.get_video_spread(db, video_id)
+        if video is None:
+            raise HTTPException(status_code=404, detail="This video hasn't trended in any tracked country.")
+        return (await spread_videos_response(db, [video]))[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching spread of {video_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/analytics/propagation", response_model=List[PropagationLag])
+async def get_propagation_lag(
+    db: AsyncSession = Depends(get_async_db),
+    origin_country: Optional[str] = None,
+    country_code: Optional[str] = None,
+    group_by: str = "pair"
+):
+    """
+    Median lag between a video trending in its first country and reaching another one.
+    `group_by` is pair (origin and destination), origin or destination; medians are
+    interpolated within the lag buckets of propagation.py.
+    """
+    group_keys = {
+        "pair": lambda bucket: (bucket.origin_country, bucket.country_code),
+        "origin": lambda bucket: (bucket.origin_country, None),
+        "destination": lambda bucket: (None, bucket.country_code),
+    }
+    if group_by not in group_keys:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by. Supported values: {', '.join(group_keys)}")
+    try:
+        groups: dict = {}
+        for bucket in await crud_async.get_propagation_buckets(db, origin_country, country_code):
+            groups.setdefault(group_keys[group_by](bucket), []).append((bucket.bucket_seconds, bucket.videos))
+        lags = []
+        for (origin, destination), buckets in sorted(groups.items(), key=lambda item: tuple(key or "" for key in item[0])):
+            median = median_lag(buckets)
+            lags.append(PropagationLag(
+                origin_country=origin,
+                country_code=destination,
+                videos=sum(videos for _, videos in buckets),
+                median_lag_hours=median / 3600 if median is not None else None,
+            ))
+        return lags
+    except Exception as e:
+        logger.error(f"Error computing propagation lag: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def leaderboard_period(period: str, country_code: Optional[str], on: Optional[date]) -> date:
+    """Validates leaderboard parameters and returns the first day of the requested period."""
+    if period not in LEADERBOARD_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Invalid period. Supported periods: {', '.join(LEADERBOARD_PERIODS)}")
+    if country_code and country_code not in TRACKED_COUNTRIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
+        )
+    return resolve_period(period, on)
+
+@app.get("/leaderboards/channels", response_model=List[ChannelLeaderboardEntry])
+async def get_channel_leaderboard(
+    db: AsyncSession = Depends(get_async_db),
+    period: str = "week",
+    country_code: Optional[str] = None,
+    on: Optional[date] = None,
+    sort: str = "appearances",
+    limit: int = 20
+):
+    """
+    Top channels of a day or week (the one containing `on`, the current one by default),
+    by chart appearances (days each video spent on the chart, however often it was
+    fetched) or by distinct trending videos (`sort=videos`). Without `country_code`,
+    counts are summed over every tracked country.
+    """
+    start = leaderboard_period(period, country_code, on)
+    if sort not in ("appearances", "videos"):
+        raise HTTPException(status_code=400, detail="Invalid sort. Supported sorts: appearances, videos")
+    try:
+        return await crud_async.get_channel_leaderboard(db, period, start, country_code, sort=sort, limit=min(limit, 500))
+    except Exception as e:
+        logger.error(f"Error fetching channel leaderboard: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/leaderboards/categories", response_model=List[CategoryShare])
+async def get_category_leaderboard(
+    db: AsyncSession = Depends(get_async_db),
+    period: str = "week",
+    country_code: Optional[str] = None,
+    on: Optional[date] = None
+):
+    """
+    Each category's share of a country's trending videos in a day or week, per country
+    (or only `country_code`), largest first.
+    """
+    start = leaderboard_period(period, country_code, on)
+    try:
+        rollups = await crud_async.get_category_rollups(db, period, start, country_code)
+        totals: dict = {}
+        for rollup in rollups:
+            totals[rollup.country_code] = totals.get(rollup.country_code, 0) + rollup.videos
+        return [
+            CategoryShare(
+                country_code=rollup.country_code,
+                category_id=rollup.category_id,
+                category_name=rollup.category_name,
+                videos=rollup.videos,
+                appearances=rollup.appearances,
+                share=rollup.videos / totals[rollup.country_code] if totals[rollup.country_code] else 0.0,
+            )
+            for rollup in rollups
+        ]
+    except Exception as e:
+        logger.error(f"Error fetching category leaderboard: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
+def get_stats(db: Session = Depends(get_db)):
     """
-    Get basic statistics about the data collection.
+    Get statistics about the data collection: per-country video counts, total views,
+    active viral spikes and top categories, as of the end of the last ingestion cycle.
     """
     try:
-        stats = {}
-        for country in TRACKED_COUNTRIES:
-            count = db.query(TrendingVideo).filter(TrendingVideo.country_code == country).count()
-            stats[country] = count
-        
-        # Get category cache info
-        category_cache_info = db.query(VideoCategory).first()
-        last_category_update = category_cache_info.last_updated if category_cache_info else None
-        
+        country_stats, last_category_update = get_country_stats(db, TRACKED_COUNTRIES)
+        country_stats = {stats.country_code: stats for stats in country_stats}
+        countries = {}
+        for code in TRACKED_COUNTRIES:
+            # Countries not summarized yet (before the first ingestion cycle) count as empty
+            stats = country_stats.get(code)
+            countries[code] = {
+                "videos": stats.video_count if stats else 0,
+                "total_views": stats.total_views if stats else 0,
+                "viral_spikes": stats.spike_count if stats else 0,
+                "top_categories": (stats.top_categories if stats else None) or [],
+            }
+        categories_cache_valid = (
+            last_category_update is not None
+            and (datetime.utcnow() - last_category_update).total_seconds() <= CATEGORY_CACHE_HOURS * 60 * 60
+        )
+
         return {
-            "total_videos_tracked": sum(stats.values()),
-            "videos_by_country": stats,
-            "last_updated": datetime.utcnow(),
-            "categories_loaded": len(VIDEO_CATEGORIES),
+            "total_videos_tracked": sum(country["videos"] for country in countries.values()),
+            "videos_by_country": {code: country["videos"] for code, country in countries.items()},
+            "countries": countries,
+            "last_updated": max((stats.refreshed_at for stats in country_stats.values()), default=None),
+            "categories_loaded": len(category_service.current),
             "categories_last_updated": last_category_update,
-            "categories_cache_valid": not should_fetch_categories(db, CATEGORY_CACHE_HOURS)
+            "categories_cache_valid": categories_cache_valid
         }
     except Exception as e:
         logger.error(f"Error fetching stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/refresh-categories")
-async def refresh_categories(db: Session = Depends(get_db)):
+async def refresh_categories():
     """
-    Manually refresh video categories from YouTube API.
+    Manually refetch every region's video categories from the YouTube API.
     """
     try:
         logger.info("Manual refresh of video categories requested...")
-        await load_video_categories()
+        categories = await category_service.refresh(force=True)
         
         return {
             "message": "Video categories refreshed successfully",
-            "categories_count": len(VIDEO_CATEGORIES),
+            "categories_count": len(categories),
+            "version": categories.version,
             "timestamp": datetime.utcnow()
         }
     except Exception as e:
         logger.error(f"Error refreshing categories: {e}")
         raise HTTPException(status_code=500, detail="Failed to refresh categories")
 
+async def category_stats(db: AsyncSession) -> dict:
+    refreshes = await crud_async.get_category_refreshes(db)
+    now = datetime.utcnow()
+    refreshed_at = {refresh.country_code: refresh.refreshed_at for refresh in refreshes}
+    return {
+        "total_categories": len(category_service.current),
+        "version": category_service.current.version,
+        "regions": {
+            refresh.country_code: {
+                "categories": refresh.category_count,
+                "refreshed_at": refresh.refreshed_at,
+                "age_hours": (now - refresh.refreshed_at).total_seconds() / 3600,
+            }
+            for refresh in refreshes
+        },
+        "cache_valid": all(
+            code in refreshed_at and now - refreshed_at[code] <= category_service.max_age
+            for code in TRACKED_COUNTRIES
+        )
+    }
+
 @app.get("/categories")
-async def get_video_categories(db: Session = Depends(get_db)):
+async def list_video_categories(db: AsyncSession = Depends(get_async_db), country_code: Optional[str] = None):
     """
-    Get all cached video categories with their details.
+    Get the stored video categories of every region, or only of `country_code`.
     """
+    if country_code and country_code not in TRACKED_COUNTRIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid country code. Supported codes: {', '.join(TRACKED_COUNTRIES)}"
+        )
     try:
-        categories = get_all_categories(db)
-        stats = get_categories_stats(db)
+        categories = await crud_async.get_categories(db, country_code)
+        stats = await category_stats(db)
         
         return {
             "categories": [
                 {
+                    "country_code": cat.country_code,
                     "id": cat.category_id,
                     "name": cat.category_name,
-                    "assignable": cat.assignable,
                     "last_updated": cat.last_updated
                 }
                 for cat in categories
@@ -341,13 +1168,12 @@ async def get_video_categories(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to fetch categories")
 
 @app.get("/categories/stats")
-async def get_category_stats(db: Session = Depends(get_db)):
+async def get_category_stats(db: AsyncSession = Depends(get_async_db)):
     """
-    Get statistics about video categories cache.
+    Get statistics about the stored video categories, per region.
     """
     try:
-        stats = get_categories_stats(db)
-        return stats
+        return await category_stats(db)
     except Exception as e:
         logger.error(f"Error fetching category stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch category statistics")
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Prometheus metrics, served by GET /metrics. Values are per worker process, so scrape
+every worker (or sum across them) when running several.
+
+Ingestion and request metrics are recorded as they happen; response cache counters and
+connection pool usage are read from their sources at scrape time by StatsCollector.
+"""
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy.pool import Pool
+
+from .cache import ResponseCache
+
+# Seconds; from a cached read to a slow chart page on a bad day
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+YOUTUBE_FETCH_SECONDS = Histogram(
+    "yttrends_youtube_fetch_seconds", "Time to fetch one page of a country's trending chart from the YouTube API.",
+    ["country_code"], buckets=LATENCY_BUCKETS,
+)
+STORE_SECONDS = Histogram(
+    "yttrends_store_seconds", "Time to parse, score and upsert one page of a country's trending chart.",
+    ["country_code"], buckets=LATENCY_BUCKETS,
+)
+ROWS_WRITTEN = Counter("yttrends_rows_written", "Trending video rows upserted.", ["country_code"])
+VIRAL_SPIKES = Counter("yttrends_viral_spikes", "Videos flagged as viral spikes.", ["country_code"])
+INGESTED_COUNTRIES = Counter("yttrends_ingested_countries", "Country ingestions by outcome.", ["country_code", "status"])
+INGESTION_CYCLE_SECONDS = Histogram(
+    "yttrends_ingestion_cycle_seconds", "Duration of a whole ingestion cycle.",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "yttrends_http_request_seconds", "API request latency by route template.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+
+
+class StatsCollector:
+    """Exposes response cache hits and misses and connection pool usage when scraped."""
+
+    def __init__(self):
+        self.caches: List[ResponseCache] = []
+        self.pools: Dict[str, Callable[[], Optional[Pool]]] = {}
+
+    def add_cache(self, cache: ResponseCache):
+        self.caches.append(cache)
+
+    def add_pool(self, name: str, get_pool: Callable[[], Optional[Pool]]):
+        self.pools[name] = get_pool
+
+    def collect(self):
+        hits = CounterMetricFamily("yttrends_response_cache_hits", "Response cache hits.", labels=["namespace"])
+        misses = CounterMetricFamily("yttrends_response_cache_misses", "Response cache misses.", labels=["namespace"])
+        ratio = GaugeMetricFamily("yttrends_response_cache_hit_ratio", "Share of response cache lookups that hit.", labels=["namespace"])
+        for cache in self.caches:
+            hits.add_metric([cache.namespace], cache.hits)
+            misses.add_metric([cache.namespace], cache.misses)
+            lookups = cache.hits + cache.misses
+            ratio.add_metric([cache.namespace], cache.hits / lookups if lookups else 0.0)
+        yield from (hits, misses, ratio)
+
+        gauges = {
+            "checkedout": GaugeMetricFamily("yttrends_db_pool_checked_out", "Connections in use.", labels=["engine"]),
+            "size": GaugeMetricFamily("yttrends_db_pool_size", "Configured pool size.", labels=["engine"]),
+            "overflow": GaugeMetricFamily("yttrends_db_pool_overflow", "Connections open beyond the pool size.", labels=["engine"]),
+        }
+        for name, get_pool in self.pools.items():
+            pool = get_pool()
+            for method, gauge in gauges.items():
+                # Only queue pools report usage; SQLite's default pools don't
+                if hasattr(pool, method):
+                    # overflow() counts down from zero while the pool isn't full
+                    gauge.add_metric([name], max(0, getattr(pool, method)()))
+        yield from gauges.values()
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
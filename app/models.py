@@ -1,16 +1,36 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, BigInteger, Float, JSON, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, String, Date, DateTime, Text, BigInteger, Float, JSON, UniqueConstraint, Index, literal_column
 from sqlalchemy.sql import func
 from .database import Base
-from sqlalchemy.orm import declarative_base, Mapped, mapped_column
+from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 
-class TrendingVideo(Base):
-    __tablename__ = "trending_videos"
+class Video(Base):
+    """
+    A video's descriptive metadata, shared by every country it trends in. content_hash is
+    a digest of these columns as last fetched; ingestion only rewrites the row when it
+    changes (see crud._save_video_metadata).
+    """
+    __tablename__ = "videos"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
-    video_id = Column(String, index=True, nullable=False)
+    video_id = Column(String, primary_key=True)
     title = Column(String, nullable=False)
     description = Column(Text)
+    tags = Column(JSON) # Store as JSON array
+    thumbnail_url = Column(String)
+    content_hash = Column(String(32)) # NULL for rows carried over by migration 0009
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    # The PostgreSQL-only title, tag and full-text search indexes are created by migrations/
+
+class TrendingVideo(Base):
+    """
+    A video's current stats in one country's chart, rewritten every ingestion cycle. Its
+    title, description, tags and thumbnail live on Video and are loaded with it.
+    """
+    __tablename__ = "trending_videos"
+
+    # SQLite only auto-increments INTEGER PRIMARY KEY columns
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
+    video_id = Column(String, nullable=False)
     published_at = Column(DateTime, nullable=False)
     channel_id = Column(String, nullable=False)
     channel_title = Column(String, nullable=False)
@@ -19,25 +39,106 @@ class TrendingVideo(Base):
     view_count = Column(BigInteger)
     like_count = Column(BigInteger)
     comment_count = Column(BigInteger)
-    tags = Column(JSON) # Store as JSON array
-    thumbnail_url = Column(String)
-    country_code = Column(String, index=True, nullable=False)
+    like_ratio = Column(Float) # like_count / view_count, stored so it can be indexed for sorting
+    country_code = Column(String, nullable=False)
     fetched_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Fields for anomaly detection / historical tracking
     previous_view_count = Column(BigInteger)
     view_count_change = Column(BigInteger)
     is_viral_spike = Column(Boolean, default=False) # Flag for sudden spikes
-    alert_triggered = Column(Boolean, default=False) # To prevent repeated alerts for the same event
+    alert_triggered = Column(Boolean, default=False) # A VideoAlert was written for the current spike
 
+    # Joined into every chart query. No foreign key: countries are ingested concurrently and
+    # the Video row is written just before, in the same transaction
+    video = relationship(
+        Video, primaryjoin="foreign(TrendingVideo.video_id) == Video.video_id",
+        lazy="joined", viewonly=True,
+    )
+
+    # Managed by migrations/. Lookups by video_id are served by the unique constraint. Each
+    # chart sort has a (country_code, sort key, id) index so keyset pages are a single index
+    # range scan.
     __table_args__ = (
         UniqueConstraint('video_id', 'country_code', name='uq_trending_videos_video_id_country_code'),
+        Index('ix_trending_videos_country_fetched_id', 'country_code', fetched_at.desc(), id.desc()),
+        Index('ix_trending_videos_country_views_id', 'country_code', view_count.desc(), id.desc()),
+        Index(
+            'ix_trending_videos_country_view_change_id', 'country_code',
+            func.coalesce(view_count_change, literal_column('0')).desc(), id.desc(),
+        ),
+        Index('ix_trending_videos_country_like_ratio_id', 'country_code', like_ratio.desc(), id.desc()),
+        Index(
+            'ix_trending_videos_active_spikes_id', 'country_code', fetched_at.desc(), id.desc(),
+            postgresql_where=is_viral_spike.is_(True),
+            sqlite_where=is_viral_spike.is_(True),
+        ),
+    )
+
+    @property
+    def title(self):
+        return self.video.title if self.video else None
+
+    @property
+    def description(self):
+        return self.video.description if self.video else None
+
+    @property
+    def tags(self):
+        return self.video.tags if self.video else None
+
+    @property
+    def thumbnail_url(self):
+        return self.video.thumbnail_url if self.video else None
+
+class VideoAlert(Base):
+    """
+    A viral-spike alert, written once at ingest time. Consumers page through alerts by id
+    (since_id), so reading them never writes.
+    """
+    __tablename__ = "video_alerts"
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    video_id = Column(String, nullable=False)
+    country_code = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    category_id = Column(String)
+    alert_type = Column(String, nullable=False, default="Viral Spike")
+    current_views = Column(BigInteger, nullable=False)
+    previous_views = Column(BigInteger, nullable=False, default=0)
+    view_change = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_video_alerts_country_id', 'country_code', 'id'),
+        Index('ix_video_alerts_created_at', 'created_at'),
+        Index('ix_video_alerts_country_created', 'country_code', 'created_at'),
+    )
+
+class VideoSnapshot(Base):
+    """
+    Append-only metrics snapshot, one row per video and country per ingestion cycle.
+    Snapshots older than the retention window are rolled up into VideoDailyMetric.
+    """
+    __tablename__ = "video_snapshots"
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    video_id = Column(String, nullable=False)
+    country_code = Column(String, nullable=False)
+    captured_at = Column(DateTime(timezone=True), nullable=False)
+    view_count = Column(BigInteger)
+    like_count = Column(BigInteger)
+    comment_count = Column(BigInteger)
+
+    # Every history read is a range scan on this index
+    __table_args__ = (
+        Index('ix_video_snapshots_country_video_captured', 'country_code', 'video_id', 'captured_at'),
     )
 
 class VideoDailyMetric(Base):
     """
-    Optional: To store daily snapshots of metrics for more robust anomaly detection
-    and historical charting. This would be a more granular approach.
+    Daily rollup of VideoSnapshot rows: the highest counts seen for a video in a
+    country on a given day. Used for history beyond the snapshot retention window.
     """
     __tablename__ = "video_daily_metrics"
 
@@ -53,24 +154,197 @@ class VideoDailyMetric(Base):
     __table_args__ = (UniqueConstraint('video_id', 'country_code', 'date', name='_video_country_date_uc'),)
 
 class VideoCategory(Base):
+    """
+    A region's video category, as listed by videoCategories.list for that region. Rows are
+    only written when the region's list changes.
+    """
     __tablename__ = "video_categories"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    category_id = Column(String(10), unique=True, index=True, nullable=False)
+
+    country_code = Column(String, primary_key=True)
+    category_id = Column(String(10), primary_key=True)
     category_name = Column(String(100), nullable=False)
-    assignable = Column(String(10), default="true")
     last_updated = Column(DateTime, default=datetime.utcnow, nullable=False)
-    
+
     def __repr__(self):
-        return f"<VideoCategory(id={self.category_id}, name='{self.category_name}')>"
+        return f"<VideoCategory(country={self.country_code}, id={self.category_id}, name='{self.category_name}')>"
+
+class CategoryRefresh(Base):
+    """When a region's categories were last fetched, whether or not anything changed."""
+    __tablename__ = "category_refreshes"
+
+    country_code = Column(String, primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)
+    category_count = Column(Integer, nullable=False)
+
+class SchedulerLease(Base):
+    """
+    Leader lease for a scheduled job. Only the worker holding an unexpired lease runs the
+    job; next_run_at survives restarts so a redeploy doesn't trigger an immediate refetch.
+    Times are naive UTC.
+    """
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String)
+    lease_expires_at = Column(DateTime)
+    next_run_at = Column(DateTime)
+    last_run_started_at = Column(DateTime)
+    last_run_finished_at = Column(DateTime)
 
-class VideoCategoryCache(Base):
-    __tablename__ = "video_category_cache"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    categories_data = Column(JSON, nullable=False)  # Store the full categories dict
-    last_updated = Column(DateTime, default=datetime.utcnow, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    
     def __repr__(self):
-        return f"<VideoCategoryCache(last_updated={self.last_updated})>"
\ No newline at end of file
+        return f"<SchedulerLease(name={self.name}, holder='{self.holder}')>"
+
+class CountryFetchState(Base):
+    """
+    Outcome of the most recent ingestion run for each country, and its adaptive schedule:
+    the interval grows or shrinks with how much the chart changed (last_churn).
+    """
+    __tablename__ = "country_fetch_state"
+
+    country_code = Column(String, primary_key=True)
+    last_run_at = Column(DateTime)
+    last_duration_seconds = Column(Float)
+    last_status = Column(String)
+    last_error = Column(Text)
+    videos = Column(Integer, default=0)
+    interval_seconds = Column(Float)
+    next_run_at = Column(DateTime)
+    last_churn = Column(Float)
+    last_video_ids = Column(JSON)
+
+class QuotaUsage(Base):
+    """YouTube Data API quota units spent per quota day (Pacific time, like Google's reset)."""
+    __tablename__ = "quota_usage"
+
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    units_used = Column(Integer, nullable=False, default=0)
+
+class CountryStats(Base):
+    """
+    Per-country summary behind /stats, recomputed from trending_videos at the end of every
+    ingestion cycle so serving it never aggregates the chart tables.
+    """
+    __tablename__ = "country_stats"
+
+    country_code = Column(String, primary_key=True)
+    video_count = Column(Integer, nullable=False, default=0)
+    total_views = Column(BigInteger, nullable=False, default=0)
+    spike_count = Column(Integer, nullable=False, default=0)
+    top_categories = Column(JSON) # [{"category_id", "category_name", "videos"}], most videos first
+    refreshed_at = Column(DateTime, nullable=False)
+
+class VideoRegionFirstSeen(Base):
+    """
+    When a video first trended in each country, written once during ingestion. Rows other
+    than the origin's carry how long after the origin the video got there.
+    """
+    __tablename__ = "video_region_first_seen"
+
+    video_id = Column(String, primary_key=True)
+    country_code = Column(String, primary_key=True)
+    first_seen_at = Column(DateTime, nullable=False)
+    origin_country = Column(String)
+    lag_seconds = Column(Float)
+
+class VideoSpread(Base):
+    """
+    One row per video seen anywhere: the country it trended in first and how many countries
+    it has trended in since. Maintained incrementally from VideoRegionFirstSeen inserts.
+    """
+    __tablename__ = "video_spread"
+
+    video_id = Column(String, primary_key=True)
+    origin_country = Column(String, nullable=False)
+    first_seen_at = Column(DateTime, nullable=False)
+    last_spread_at = Column(DateTime, nullable=False)
+    region_count = Column(Integer, nullable=False, default=1)
+    title = Column(String)
+    channel_title = Column(String)
+
+    __table_args__ = (
+        Index('ix_video_spread_regions_first_seen', region_count.desc(), first_seen_at.desc()),
+        Index('ix_video_spread_origin_first_seen', 'origin_country', first_seen_at.desc()),
+    )
+
+class PropagationLagBucket(Base):
+    """
+    Number of videos that reached `country_code` within a lag bucket (see propagation.py)
+    after first trending in `origin_country`.
+    """
+    __tablename__ = "propagation_lag_buckets"
+
+    origin_country = Column(String, primary_key=True)
+    country_code = Column(String, primary_key=True)
+    bucket_seconds = Column(Integer, primary_key=True)
+    videos = Column(Integer, nullable=False, default=0)
+
+class LeaderboardMember(Base):
+    """
+    Videos already counted in a leaderboard period for a country, so a video trending for
+    several fetches adds one to `videos`, and one appearance per day it trends (its "day"
+    memberships). Pruned once the period is over.
+    """
+    __tablename__ = "leaderboard_members"
+
+    period = Column(String(8), primary_key=True)  # "day" or "week"
+    period_start = Column(Date, primary_key=True)
+    country_code = Column(String, primary_key=True)
+    video_id = Column(String, primary_key=True)
+
+class ChannelRollup(Base):
+    """Trending videos and chart appearances (video-days on the chart) per channel, country and period."""
+    __tablename__ = "channel_rollups"
+
+    period = Column(String(8), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    country_code = Column(String, primary_key=True)
+    channel_id = Column(String, primary_key=True)
+    channel_title = Column(String)
+    videos = Column(Integer, nullable=False, default=0)
+    appearances = Column(Integer, nullable=False, default=0)
+    last_seen_at = Column(DateTime, nullable=False)
+
+class CategoryRollup(Base):
+    """Trending videos and chart appearances (video-days on the chart) per category, country and period."""
+    __tablename__ = "category_rollups"
+
+    period = Column(String(8), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    country_code = Column(String, primary_key=True)
+    category_id = Column(String, primary_key=True)
+    category_name = Column(String)
+    videos = Column(Integer, nullable=False, default=0)
+    appearances = Column(Integer, nullable=False, default=0)
+    last_seen_at = Column(DateTime, nullable=False)
+
+class StreamEvent(Base):
+    """
+    Outbox of stream events, written by the ingestion leader and relayed by every worker
+    to its own /stream clients. A "trending" row is written for every stored page, even an
+    unchanged one, since it also tells the other workers to drop their cached responses
+    for the country. `payload` is the event as JSON. Pruned after a retention period;
+    times are naive UTC.
+    """
+    __tablename__ = "stream_events"
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event_type = Column(String(16), nullable=False)
+    country_code = Column(String)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+class StoredFetchPage(Base):
+    """
+    Every page of an archived chart fetch that was stored, by live ingestion or by a
+    replay, keyed on the fetch time recorded in the archive index and the page's position
+    in the archived object. Replays store only the pages not listed here. Unlike snapshots
+    it is never rolled up or pruned; times are naive UTC.
+    """
+    __tablename__ = "stored_fetch_pages"
+
+    country_code = Column(String, primary_key=True)
+    fetched_at = Column(DateTime, primary_key=True)
+    page = Column(Integer, primary_key=True)
+    object = Column(String, nullable=False)  # Archive object path
+    source = Column(String(8), nullable=False)  # "live" or "replay"
+    stored_at = Column(DateTime, nullable=False)
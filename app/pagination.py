@@ -0,0 +1,43 @@
+"""
+Opaque keyset-pagination cursors. A cursor carries the sort it was issued for and the
+(sort value, id) of the last row of the page; the next page starts strictly after it.
+A cursor can also carry a scope, e.g. a digest of the search it pages through, and is
+then only accepted for that same scope.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, value: Any, row_id: int, scope: Optional[str] = None) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    fields = [sort, value, row_id] if scope is None else [sort, value, row_id, scope]
+    payload = json.dumps(fields, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, scope: Optional[str] = None) -> Tuple[Any, int]:
+    """
+    Returns the (sort value, id) a cursor points after; raises InvalidCursor if it is
+    malformed, or was issued for another sort or scope.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, row_id, *rest = json.loads(payload)
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Malformed cursor.") from e
+    if cursor_sort != sort:
+        raise InvalidCursor(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'.")
+    if not isinstance(row_id, int) or len(rest) > 1:
+        raise InvalidCursor("Malformed cursor.")
+    if (rest[0] if rest else None) != scope:
+        raise InvalidCursor("Cursor was issued for another query.")
+    return value, row_id
@@ -0,0 +1,51 @@
+"""
+Cross-country propagation of trending videos: how long after trending in its first
+region a video shows up in another one.
+
+Lags are counted into fixed buckets per (origin, destination) pair as they are observed
+during ingestion, so a median over any set of pairs is read from a few hundred counters
+instead of a self-join over trending_videos. Observed lags can't be finer than the fetch
+interval anyway, which is what the bucket widths follow.
+"""
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional, Tuple
+
+HOUR = 60 * 60
+
+# Lower bounds of the lag buckets, in seconds; the last bucket is open-ended
+LAG_BUCKETS_SECONDS: Tuple[int, ...] = (
+    0, HOUR // 2, HOUR, 2 * HOUR, 3 * HOUR, 4 * HOUR, 6 * HOUR, 8 * HOUR, 12 * HOUR, 18 * HOUR,
+    24 * HOUR, 36 * HOUR, 48 * HOUR, 72 * HOUR, 96 * HOUR, 120 * HOUR, 168 * HOUR, 240 * HOUR,
+    336 * HOUR, 504 * HOUR, 720 * HOUR,
+)
+
+
+def lag_bucket(lag_seconds: float) -> int:
+    """Lower bound of the bucket a lag falls into."""
+    return LAG_BUCKETS_SECONDS[max(0, bisect_right(LAG_BUCKETS_SECONDS, lag_seconds) - 1)]
+
+
+def median_lag(buckets: Iterable[Tuple[int, int]]) -> Optional[float]:
+    """
+    Median lag in seconds from (bucket lower bound, videos) counts, interpolated linearly
+    within the bucket holding it. None without any counts.
+    """
+    counts: Dict[int, int] = {}
+    for bucket, videos in buckets:
+        counts[bucket] = counts.get(bucket, 0) + videos
+    total = sum(counts.values())
+    if not total:
+        return None
+
+    half = total / 2
+    seen = 0
+    for bucket in sorted(counts):
+        videos = counts[bucket]
+        if seen + videos >= half:
+            position = bisect_right(LAG_BUCKETS_SECONDS, bucket)
+            if position == len(LAG_BUCKETS_SECONDS):
+                return float(bucket)
+            upper = LAG_BUCKETS_SECONDS[position]
+            return bucket + (upper - bucket) * (half - seen) / videos
+        seen += videos
+    return None
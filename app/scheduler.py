@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy.orm import Session
+
+from .crud import get_lease, release_lease, try_acquire_lease, update_lease_schedule
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderScheduler:
+    """
+    Runs `job` every `interval_seconds` on exactly one worker across all processes and
+    replicas sharing the database.
+
+    Every worker polls for the lease row named `name`; whoever holds it runs the job when
+    next_run_at is due and keeps renewing the lease while the job runs. If the lease is
+    lost mid-run, the job is cancelled. next_run_at is stored with the lease, so a restart
+    resumes the existing schedule instead of refetching straight away. If the leader
+    dies, another worker takes over once the lease expires.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        job: Callable[[], Awaitable[None]],
+        interval_seconds: int,
+        lease_seconds: int = 60,
+        poll_seconds: int = 15,
+    ):
+        self.name = name
+        self.job = job
+        self.interval_seconds = interval_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    def _with_session(self, fn, *args, **kwargs):
+        db: Session = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    async def _acquire(self) -> bool:
+        acquired = await asyncio.to_thread(self._with_session, try_acquire_lease, self.name, self.holder, self.lease_seconds)
+        if acquired != self.is_leader:
+            logger.info(f"{self.holder} {'became' if acquired else 'is no longer'} leader for '{self.name}'.")
+        self.is_leader = acquired
+        return acquired
+
+    async def _is_due(self) -> bool:
+        lease = await asyncio.to_thread(self._with_session, get_lease, self.name)
+        return lease is None or lease.next_run_at is None or lease.next_run_at <= datetime.utcnow()
+
+    async def _keep_lease(self, job: asyncio.Task):
+        """
+        Renews the lease while `job` runs. If another worker takes the lease, or it can't
+        be renewed before it expires, `job` is cancelled so two leaders never run at once.
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.lease_seconds / 3
+        renewed_at = loop.time()
+        while True:
+            await asyncio.sleep(interval)
+            attempted_at = loop.time()
+            try:
+                held = await self._acquire()
+                if held:
+                    renewed_at = attempted_at
+            except Exception as e:
+                logger.error(f"Error renewing the '{self.name}' lease: {e}")
+                # Keep going only while the last renewal outlasts the next attempt
+                held = loop.time() + interval < renewed_at + self.lease_seconds
+            if not held:
+                logger.warning(f"Lost the '{self.name}' lease while the job was running; cancelling it.")
+                self.is_leader = False
+                job.cancel()
+                return
+
+    async def _run_job(self):
+        started_at = datetime.utcnow()
+        # Scheduled before running, so a crash mid-run doesn't cause a tight retry loop
+        await asyncio.to_thread(
+            self._with_session, update_lease_schedule, self.name,
+            next_run_at=started_at + timedelta(seconds=self.interval_seconds),
+            last_run_started_at=started_at,
+        )
+        job = asyncio.create_task(self.job())
+        renewer = asyncio.create_task(self._keep_lease(job))
+        try:
+            await job
+        except asyncio.CancelledError:
+            # Cancelled by the renewer: the new leader owns the schedule from here
+            if not renewer.done() or renewer.cancelled():
+                raise
+        finally:
+            renewer.cancel()
+            if self.is_leader:
+                await asyncio.to_thread(
+                    self._with_session, update_lease_schedule, self.name,
+                    last_run_finished_at=datetime.utcnow(),
+                )
+
+    async def run(self):
+        """Polls for leadership and runs the job when due. Never returns."""
+        while True:
+            try:
+                if await self._acquire() and await self._is_due():
+                    await self._run_job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in scheduler '{self.name}': {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def stop(self):
+        """Releases the lease if held, so another worker can take over immediately."""
+        if self.is_leader:
+            await asyncio.to_thread(self._with_session, release_lease, self.name, self.holder)
+            self.is_leader = False
+
+    def status(self) -> dict:
+        lease = self._with_session(get_lease, self.name)
+        return {
+            "name": self.name,
+            "worker": self.holder,
+            "is_leader": self.is_leader,
+            "leader": lease.holder if lease else None,
+            "lease_expires_at": lease.lease_expires_at if lease else None,
+            "next_run_at": lease.next_run_at if lease else None,
+            "last_run_started_at": lease.last_run_started_at if lease else None,
+            "last_run_finished_at": lease.last_run_finished_at if lease else None,
+            "interval_seconds": self.interval_seconds,
+        }
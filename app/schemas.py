@@ -26,13 +26,18 @@ class TrendingVideoResponse(VideoBase):
     fetched_at: datetime
     previous_view_count: Optional[int] = None
     view_count_change: Optional[int] = None
+    like_ratio: Optional[float] = None
     is_viral_spike: bool
     alert_triggered: bool
 
     class Config:
         from_attributes = True # Or orm_mode = True for older Pydantic
 
+class SearchResult(TrendingVideoResponse):
+    rank: float
+
 class Alert(BaseModel):
+    id: int
     video_id: str
     title: str
     country_code: str
@@ -43,4 +48,45 @@ class Alert(BaseModel):
     timestamp: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class VideoHistoryPoint(BaseModel):
+    captured_at: datetime
+    view_count: Optional[int] = None
+    like_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    granularity: str  # "snapshot" or "daily"
+
+class RegionFirstSeen(BaseModel):
+    country_code: str
+    first_seen_at: datetime
+    lag_hours: Optional[float] = None  # None for the origin country
+
+class SpreadVideo(BaseModel):
+    video_id: str
+    title: Optional[str] = None
+    channel_title: Optional[str] = None
+    origin_country: str
+    first_seen_at: datetime
+    region_count: int
+    regions: List[RegionFirstSeen] = []
+
+class PropagationLag(BaseModel):
+    origin_country: Optional[str] = None
+    country_code: Optional[str] = None
+    videos: int
+    median_lag_hours: Optional[float] = None
+
+class ChannelLeaderboardEntry(BaseModel):
+    channel_id: str
+    channel_title: Optional[str] = None
+    videos: int
+    appearances: int
+
+class CategoryShare(BaseModel):
+    country_code: str
+    category_id: str
+    category_name: Optional[str] = None
+    videos: int
+    appearances: int
+    share: float  # of the country's trending videos in the period
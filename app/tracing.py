@@ -0,0 +1,57 @@
+"""
+Optional OpenTelemetry tracing of ingestion: a span per country, with the page fetches,
+parsing and upserts under it.
+
+Nothing is recorded until configure_tracing() succeeds, which needs opentelemetry-sdk
+(and, for the default OTLP exporter, opentelemetry-exporter-otlp-proto-http) installed.
+Until then span() is a no-op, so call sites don't need to care.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+
+
+def configure_tracing(service_name: str = "yttrends", exporter: Optional[Any] = None) -> bool:
+    """
+    Starts recording spans. They go to `exporter` as soon as each one ends (an in-memory
+    exporter in tests), or in batches over OTLP/HTTP to the endpoint configured through
+    the standard OTEL_EXPORTER_OTLP_* variables. Returns False if the packages are missing.
+    """
+    global _tracer
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+
+        if exporter is None:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            processor = BatchSpanProcessor(OTLPSpanExporter())
+        else:
+            processor = SimpleSpanProcessor(exporter)
+    except ImportError as e:
+        logger.warning(f"Tracing disabled, OpenTelemetry is not installed: {e}")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(processor)
+    _tracer = provider.get_tracer(__name__)
+    return True
+
+
+def disable_tracing():
+    global _tracer
+    _tracer = None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """Records `name` as a child of the current span while the block runs, if tracing is on."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
@@ -1,51 +1,285 @@
+import hashlib
+import json
 import os
-from googleapiclient.discovery import build
+import random
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 import logging
 
+from .ingestion import page_deadline
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+YOUTUBE_DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest"
+# Socket timeout of each API request; keep it below COUNTRY_FETCH_TIMEOUT_SECONDS so a
+# stalled request gives its worker thread back soon after ingestion stops waiting for it
+YOUTUBE_HTTP_TIMEOUT_SECONDS = float(os.getenv("YOUTUBE_HTTP_TIMEOUT_SECONDS", "30"))
+YOUTUBE_MAX_RETRIES = int(os.getenv("YOUTUBE_MAX_RETRIES", "4"))
+# videos.list returns at most 50 items per page
+YOUTUBE_PAGE_SIZE = 50
 
-def get_youtube_service():
-    """Builds and returns a YouTube Data API service object."""
-    if not YOUTUBE_API_KEY:
-        logger.error("YOUTUBE_API_KEY not found in environment variables.")
-        raise ValueError("YouTube API Key is not set.")
-    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
 
-def fetch_trending_videos(country_code: str, max_results: int = 50):
+
+def load_discovery_document(cache_path: Optional[str] = None) -> str:
     """
-    Fetches trending videos for a given country code.
-    See: https://developers.google.com/youtube/v3/docs/videos/list
+    Returns the YouTube v3 discovery document: from `cache_path` if present, otherwise the
+    copy bundled with google-api-python-client, otherwise downloaded once and saved to
+    `cache_path`.
     """
-    youtube = get_youtube_service()
-    try:
-        request = youtube.videos().list(
+    if cache_path and Path(cache_path).exists():
+        return Path(cache_path).read_text()
+    document = get_static_doc("youtube", "v3")
+    if document is None:
+        response, content = httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT_SECONDS).request(YOUTUBE_DISCOVERY_URL)
+        if response.status != 200:
+            raise RuntimeError(f"Could not download the YouTube discovery document: HTTP {response.status}")
+        document = content.decode()
+    if cache_path:
+        Path(cache_path).write_text(document)
+    return document
+
+
+class YouTubeClient:
+    """
+    Long-lived YouTube Data API client.
+
+    The discovery document is parsed from a cached copy instead of being fetched on every
+    call. Each worker thread gets its own service object and keep-alive HTTP connection
+    (httplib2 connections aren't thread-safe), so the ingestion thread pool doubles as the
+    connection pool. 429 and 5xx responses and transport errors are retried with
+    full-jitter exponential backoff, but not past the ingestion `page_deadline`: once
+    the caller has given up on a page, the last error is raised instead.
+
+    `http_factory` builds the per-thread transport; pass one returning a RecordedHttp to
+    run offline.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = YOUTUBE_API_KEY,
+        http_factory: Optional[Callable[[], httplib2.Http]] = None,
+        max_retries: int = YOUTUBE_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        discovery_cache_path: Optional[str] = os.getenv("YOUTUBE_DISCOVERY_CACHE"),
+    ):
+        if not api_key:
+            logger.error("YOUTUBE_API_KEY not found in environment variables.")
+            raise ValueError("YouTube API Key is not set.")
+        self.api_key = api_key
+        self.http_factory = http_factory or (lambda: httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT_SECONDS))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.discovery_document = load_discovery_document(discovery_cache_path)
+        # Quota units spent by this client (one per API request, retries included)
+        self.units_used = 0
+        self._units_lock = threading.Lock()
+        self._local = threading.local()
+
+    def service(self):
+        """The calling thread's service object, built on first use."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            self._local.http = self.http_factory()
+            service = build_from_document(self.discovery_document, developerKey=self.api_key, http=self._local.http)
+            self._local.service = service
+        return service
+
+    def http(self):
+        """The transport behind the calling thread's service object."""
+        self.service()
+        return self._local.http
+
+    def _execute(self, request):
+        deadline = page_deadline.get()
+        for attempt in range(self.max_retries + 1):
+            with self._units_lock:
+                self.units_used += 1
+            try:
+                return request.execute()
+            except HttpError as e:
+                if e.resp.status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    raise
+                error, reason = e, f"HTTP {e.resp.status}"
+            except (socket.timeout, ConnectionError, httplib2.HttpLib2Error) as e:
+                if attempt == self.max_retries:
+                    raise
+                error, reason = e, type(e).__name__
+                # The connection may be broken; start the next attempt from a fresh one
+                self._local.service = None
+                request.http = self.http()
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                logger.warning(f"YouTube API request failed ({reason}), giving up: the fetch deadline would pass before a retry.")
+                raise error
+            logger.warning(f"YouTube API request failed ({reason}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+    def fetch_trending_videos(self, country_code: str, max_results: int = 50):
+        """
+        Fetches trending videos for a given country code.
+        See: https://developers.google.com/youtube/v3/docs/videos/list
+        """
+        request = self.service().videos().list(
             part="snippet,statistics",
             chart="mostPopular",
             regionCode=country_code,
             maxResults=max_results,
         )
-        response = request.execute()
-        return response.get("items", [])
+        return self._execute(request).get("items", [])
+
+    def iter_trending_pages(
+        self,
+        country_code: str,
+        category_id: Optional[str] = None,
+        max_results: int = 200,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yields the mostPopular chart (or one category's chart) page by page, following
+        nextPageToken until `max_results` videos or the end of the chart. Every page costs
+        one quota unit. Each page is requested with the calling thread's service, so the
+        generator can be advanced from any worker thread.
+        """
+        page_token = None
+        fetched = 0
+        while fetched < max_results:
+            request = self.service().videos().list(
+                part="snippet,statistics",
+                chart="mostPopular",
+                regionCode=country_code,
+                videoCategoryId=category_id,
+                maxResults=min(YOUTUBE_PAGE_SIZE, max_results - fetched),
+                pageToken=page_token,
+            )
+            response = self._execute(request)
+            items = response.get("items", [])
+            fetched += len(items)
+            if items:
+                yield items
+            page_token = response.get("nextPageToken")
+            if not page_token or not items:
+                return
+
+    def get_video_categories(self, country_code: str):
+        """Fetches video categories for a given country code."""
+        request = self.service().videoCategories().list(
+            part="snippet",
+            regionCode=country_code
+        )
+        response = self._execute(request)
+        return {item['id']: item['snippet']['title'] for item in response.get('items', [])}
+
+
+class RecordedHttp:
+    """
+    httplib2.Http stand-in that replays responses recorded under `directory`, one JSON file
+    per request keyed by method, path and query (the API key excluded). With `record_from`
+    set to a real Http, missing responses are fetched and saved, so a recording session
+    against the live API produces fixtures for offline runs.
+    """
+
+    def __init__(self, directory: str, record_from: Optional[httplib2.Http] = None):
+        self.directory = Path(directory)
+        self.record_from = record_from
+
+    @staticmethod
+    def request_key(method: str, uri: str) -> str:
+        parts = urlsplit(uri)
+        query = sorted((k, v) for k, v in parse_qsl(parts.query) if k != "key")
+        return hashlib.sha1(json.dumps([method, parts.path, query]).encode()).hexdigest()
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        path = self.directory / f"{self.request_key(method, uri)}.json"
+        if path.exists():
+            recorded = json.loads(path.read_text())
+            return httplib2.Response({"status": recorded["status"], **recorded.get("headers", {})}), recorded["body"].encode()
+        if self.record_from is None:
+            raise FileNotFoundError(f"No recorded response for {method} {uri}")
+        response, content = self.record_from.request(uri, method=method, body=body, headers=headers, **kwargs)
+        if response.status in RETRYABLE_STATUSES:
+            # Transient failures are passed through, not replayed forever
+            return response, content
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "uri": urlsplit(uri)._replace(query="").geturl(),
+            "status": response.status,
+            "headers": {"content-type": response.get("content-type", "application/json")},
+            "body": content.decode(),
+        }))
+        return response, content
+
+
+_default_client: Optional[YouTubeClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> YouTubeClient:
+    """The process-wide client, created on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = YouTubeClient()
+        return _default_client
+
+
+def fetch_trending_videos(country_code: str, max_results: int = 50):
+    """
+    Fetches trending videos for a given country code.
+    Errors are logged and re-raised so the caller can account for them.
+    See: https://developers.google.com/youtube/v3/docs/videos/list
+    """
+    try:
+        return get_client().fetch_trending_videos(country_code, max_results=max_results)
     except Exception as e:
         logger.error(f"Error fetching trending videos for {country_code}: {e}")
-        return []
+        raise
+
+
+def fetch_trending_pages(
+    country_code: str,
+    max_results: int = 200,
+    category_ids: Iterable[str] = (),
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields pages of the overall chart for `country_code`, then of each category chart in
+    `category_ids`, up to `max_results` videos per chart. A video already yielded for
+    this country is left out of later pages. Categories without a chart in the region
+    are skipped.
+    """
+    seen = set()
+    for category_id in (None, *category_ids):
+        try:
+            for page in get_client().iter_trending_pages(country_code, category_id=category_id, max_results=max_results):
+                page = [item for item in page if item["id"] not in seen]
+                seen.update(item["id"] for item in page)
+                if page:
+                    yield page
+        except HttpError as e:
+            if category_id is None or e.resp.status not in (400, 404):
+                logger.error(f"Error fetching trending videos for {country_code}: {e}")
+                raise
+            logger.warning(f"No trending chart for category {category_id} in {country_code}, skipping.")
+
 
 def get_video_categories(country_code: str):
     """Fetches video categories for a given country code."""
-    youtube = get_youtube_service()
     try:
-        request = youtube.videoCategories().list(
-            part="snippet",
-            regionCode=country_code
-        )
-        response = request.execute()
-        categories = {item['id']: item['snippet']['title'] for item in response.get('items', [])}
-        return categories
+        return get_client().get_video_categories(country_code)
     except Exception as e:
         logger.error(f"Error fetching video categories for {country_code}: {e}")
-        return {}
\ No newline at end of file
+        return {}
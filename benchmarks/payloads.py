@@ -0,0 +1,159 @@
+"""Synthetic videos.list payloads for benchmarks."""
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+CATEGORY_IDS = ["1", "10", "17", "20", "22", "23", "24", "25", "26", "28"]
+
+
+def make_video_items(count: int, cycle: int = 0, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Builds `count` videos.list items shaped like the YouTube Data API response.
+    The same seed yields the same videos; `cycle` grows their view counts so
+    consecutive cycles exercise the update path.
+    """
+    rng = random.Random(seed)
+    published = datetime(2025, 1, 1)
+    items = []
+    for i in range(count):
+        base_views = rng.randint(1_000, 5_000_000)
+        growth = 1 + cycle * rng.uniform(0.05, 0.8)
+        items.append({
+            "id": f"vid{seed:04d}{i:07d}",
+            "snippet": {
+                "publishedAt": (published + timedelta(minutes=i)).isoformat() + "Z",
+                "channelId": f"chan{rng.randint(0, count // 4 + 1):06d}",
+                "channelTitle": f"Channel {i % 997}",
+                "title": f"Synthetic trending video {i}",
+                "description": "lorem ipsum " * rng.randint(5, 200),
+                "categoryId": rng.choice(CATEGORY_IDS),
+                "tags": [f"tag{rng.randint(0, 500)}" for _ in range(rng.randint(0, 12))],
+                "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/vid{i}/hqdefault.jpg"}},
+            },
+            "statistics": {
+                "viewCount": str(int(base_views * growth)),
+                "likeCount": str(int(base_views * growth * 0.04)),
+                "commentCount": str(int(base_views * growth * 0.002)),
+            },
+        })
+    return items
+
+
+@dataclass
+class SyntheticVideo:
+    video_id: str
+    channel_id: str
+    category_id: str
+    published_at: datetime
+    final_views: int
+    # Hours after publishing at which the video has half its final views, and how sharply
+    # it gets there (the logistic curve's scale, in hours)
+    midpoint_hours: float
+    ramp_hours: float
+    like_rate: float
+    comment_rate: float
+    tags: List[str]
+    description_words: int
+
+    def views_at(self, moment: datetime) -> int:
+        hours = (moment - self.published_at).total_seconds() / 3600
+        exponent = min(60.0, max(-60.0, -(hours - self.midpoint_hours) / self.ramp_hours))
+        return max(1, int(self.final_views / (1 + math.exp(exponent))))
+
+
+class TrendingSimulation:
+    """
+    Trending charts for `countries` over `cycles` fetches `interval_hours` apart, ending now.
+
+    Each chart holds `videos_per_chart` videos. Between cycles about `churn` of every chart
+    is replaced; a replacement is a video already trending in another country with
+    probability `shared`, so videos spread across regions with a lag, otherwise a new
+    upload. Views follow a logistic growth curve per video, so consecutive cycles update
+    the same rows with realistic deltas and the occasional spike. Same arguments, same charts.
+    """
+
+    def __init__(self, countries: Sequence[str], videos_per_chart: int, cycles: int, seed: int = 42,
+                 interval_hours: float = 6, churn: float = 0.2, shared: float = 0.3):
+        self.countries = list(countries)
+        self.videos_per_chart = videos_per_chart
+        self.cycles = cycles
+        self.interval = timedelta(hours=interval_hours)
+        self.started_at = datetime.utcnow().replace(microsecond=0) - self.interval * cycles
+        self.rng = random.Random(seed)
+        self.videos: Dict[str, SyntheticVideo] = {}
+        # (country, cycle) -> video ids in chart order
+        self.charts: Dict[Tuple[str, int], List[str]] = {}
+
+        for cycle in range(cycles):
+            for country_code in self.countries:
+                previous = self.charts.get((country_code, cycle - 1), [])
+                kept = [video_id for video_id in previous if self.rng.random() >= churn]
+                on_chart = set(kept)
+                elsewhere = [
+                    video_id for other in self.countries if other != country_code
+                    for video_id in self.charts.get((other, cycle - 1), [])
+                    if video_id not in on_chart
+                ]
+                while len(kept) < videos_per_chart:
+                    if elsewhere and self.rng.random() < shared:
+                        video_id = elsewhere.pop(self.rng.randrange(len(elsewhere)))
+                        if video_id in on_chart:
+                            continue
+                    else:
+                        video_id = self._upload(self.fetched_at(cycle)).video_id
+                    kept.append(video_id)
+                    on_chart.add(video_id)
+                moment = self.fetched_at(cycle)
+                kept.sort(key=lambda video_id: self.videos[video_id].views_at(moment), reverse=True)
+                self.charts[(country_code, cycle)] = kept
+
+    def fetched_at(self, cycle: int) -> datetime:
+        return self.started_at + self.interval * cycle
+
+    def _upload(self, before: datetime) -> SyntheticVideo:
+        rng = self.rng
+        index = len(self.videos)
+        video = SyntheticVideo(
+            video_id=f"sim{index:08d}",
+            channel_id=f"chan{rng.randint(0, max(1, self.videos_per_chart * len(self.countries) // 3)):06d}",
+            category_id=rng.choice(CATEGORY_IDS),
+            published_at=before - timedelta(hours=rng.uniform(1, 48)),
+            final_views=int(rng.lognormvariate(13, 1.5)),
+            midpoint_hours=rng.uniform(6, 72),
+            ramp_hours=rng.uniform(2, 24),
+            like_rate=rng.uniform(0.01, 0.08),
+            comment_rate=rng.uniform(0.0005, 0.005),
+            tags=[f"tag{rng.randint(0, 500)}" for _ in range(rng.randint(0, 12))],
+            description_words=rng.randint(5, 200),
+        )
+        self.videos[video.video_id] = video
+        return video
+
+    def chart(self, country_code: str, cycle: int) -> List[Dict[str, Any]]:
+        """The videos.list items of a country's chart at `cycle`."""
+        moment = self.fetched_at(cycle)
+        items = []
+        for video_id in self.charts[(country_code, cycle)]:
+            video = self.videos[video_id]
+            views = video.views_at(moment)
+            items.append({
+                "id": video_id,
+                "snippet": {
+                    "publishedAt": video.published_at.isoformat() + "Z",
+                    "channelId": video.channel_id,
+                    "channelTitle": f"Channel {video.channel_id[4:]}",
+                    "title": f"Synthetic trending video {video_id[3:]} ({video.category_id})",
+                    "description": "lorem ipsum " * video.description_words,
+                    "categoryId": video.category_id,
+                    "tags": video.tags,
+                    "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+                },
+                "statistics": {
+                    "viewCount": str(views),
+                    "likeCount": str(int(views * video.like_rate)),
+                    "commentCount": str(int(views * video.comment_rate)),
+                },
+            })
+        return items
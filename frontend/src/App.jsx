@@ -29,6 +29,7 @@ function App() {
   const [refreshing, setRefreshing] = useState(false);
   const [lastRefresh, setLastRefresh] = useState(new Date());
   const [activeTab, setActiveTab] = useState('trending'); // 'trending' or 'categories'
+  const [chartVersion, setChartVersion] = useState(0); // bumped when the server pushes a new chart
 
   // Fetch countries on component mount
   useEffect(() => {
@@ -76,6 +77,17 @@ function App() {
       }
     };
     fetchVideos();
+  }, [selectedCountry, activeTab, chartVersion]);
+
+  // Refetch when ingestion pushes a new chart for the selected country, instead of polling
+  useEffect(() => {
+    if (!selectedCountry || activeTab !== 'trending') return;
+
+    const source = new EventSource(`${FASTAPI_BASE_URL}/stream?countries=${selectedCountry}`);
+    const refresh = () => setChartVersion((version) => version + 1);
+    source.addEventListener('trending', refresh);
+    source.addEventListener('dropped', refresh);
+    return () => source.close();
   }, [selectedCountry, activeTab]);
 
   const formatNumber = (num) => {
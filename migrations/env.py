@@ -0,0 +1,63 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app import models  # noqa: F401  (registers every table on Base.metadata)
+from app.database import Base, engine
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# PostgreSQL-only indexes and columns created by migrations but not declared on the
+# models; autogenerate must not propose dropping them
+MIGRATION_ONLY_INDEXES = {
+    "ix_videos_title_trgm",
+    "ix_videos_tags_gin",
+    "ix_videos_search",
+}
+MIGRATION_ONLY_COLUMNS = {
+    "search_vector",
+}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "index":
+        return name not in MIGRATION_ONLY_INDEXES
+    if type_ == "column":
+        return name not in MIGRATION_ONLY_COLUMNS
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Emits the migration SQL for DATABASE_URL without connecting."""
+    context.configure(
+        url=engine.url,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite can't ALTER most things in place
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,172 @@
+"""Baseline schema
+
+The tables as the app created them with Base.metadata.create_all before the schema was
+managed by Alembic. A database created that way already has them: mark it as migrated
+to this revision with `alembic stamp 0001`, then run `alembic upgrade head`. Databases
+set up any other way must start empty.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('country_fetch_state',
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_duration_seconds', sa.Float(), nullable=True),
+    sa.Column('last_status', sa.String(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('videos', sa.Integer(), nullable=True),
+    sa.Column('interval_seconds', sa.Float(), nullable=True),
+    sa.Column('next_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_churn', sa.Float(), nullable=True),
+    sa.Column('last_video_ids', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('country_code'),
+    )
+    op.create_table('quota_usage',
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('units_used', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day'),
+    )
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('holder', sa.String(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('next_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_run_started_at', sa.DateTime(), nullable=True),
+    sa.Column('last_run_finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name'),
+    )
+    op.create_table('trending_videos',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('published_at', sa.DateTime(), nullable=False),
+    sa.Column('channel_id', sa.String(), nullable=False),
+    sa.Column('channel_title', sa.String(), nullable=False),
+    sa.Column('category_id', sa.String(), nullable=False),
+    sa.Column('category_name', sa.String(), nullable=True),
+    sa.Column('view_count', sa.BigInteger(), nullable=True),
+    sa.Column('like_count', sa.BigInteger(), nullable=True),
+    sa.Column('comment_count', sa.BigInteger(), nullable=True),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('thumbnail_url', sa.String(), nullable=True),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('previous_view_count', sa.BigInteger(), nullable=True),
+    sa.Column('view_count_change', sa.BigInteger(), nullable=True),
+    sa.Column('is_viral_spike', sa.Boolean(), nullable=True),
+    sa.Column('alert_triggered', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('video_id', 'country_code', name='uq_trending_videos_video_id_country_code'),
+    )
+    op.create_index('ix_trending_videos_country_code', 'trending_videos', ['country_code'], unique=False)
+    op.create_index('ix_trending_videos_id', 'trending_videos', ['id'], unique=False)
+    op.create_index('ix_trending_videos_video_id', 'trending_videos', ['video_id'], unique=False)
+
+    op.create_table('video_alerts',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('category_id', sa.String(), nullable=True),
+    sa.Column('alert_type', sa.String(), nullable=False),
+    sa.Column('current_views', sa.BigInteger(), nullable=False),
+    sa.Column('previous_views', sa.BigInteger(), nullable=False),
+    sa.Column('view_change', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_video_alerts_country_id', 'video_alerts', ['country_code', 'id'], unique=False)
+    op.create_index('ix_video_alerts_created_at', 'video_alerts', ['created_at'], unique=False)
+
+    op.create_table('video_categories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.String(length=10), nullable=False),
+    sa.Column('category_name', sa.String(length=100), nullable=False),
+    sa.Column('assignable', sa.String(length=10), nullable=True),
+    sa.Column('last_updated', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_video_categories_category_id', 'video_categories', ['category_id'], unique=True)
+    op.create_index('ix_video_categories_id', 'video_categories', ['id'], unique=False)
+
+    op.create_table('video_category_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('categories_data', sa.JSON(), nullable=False),
+    sa.Column('last_updated', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_video_category_cache_id', 'video_category_cache', ['id'], unique=False)
+
+    op.create_table('video_daily_metrics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('view_count', sa.BigInteger(), nullable=True),
+    sa.Column('like_count', sa.BigInteger(), nullable=True),
+    sa.Column('comment_count', sa.BigInteger(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('video_id', 'country_code', 'date', name='_video_country_date_uc'),
+    )
+    op.create_index('ix_video_daily_metrics_id', 'video_daily_metrics', ['id'], unique=False)
+
+    op.create_table('video_snapshots',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('captured_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('view_count', sa.BigInteger(), nullable=True),
+    sa.Column('like_count', sa.BigInteger(), nullable=True),
+    sa.Column('comment_count', sa.BigInteger(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_video_snapshots_country_video_captured', 'video_snapshots', ['country_code', 'video_id', 'captured_at'], unique=False)
+
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_snapshots_country_video_captured', table_name='video_snapshots')
+
+    op.drop_table('video_snapshots')
+    op.drop_index('ix_video_daily_metrics_id', table_name='video_daily_metrics')
+
+    op.drop_table('video_daily_metrics')
+    op.drop_index('ix_video_category_cache_id', table_name='video_category_cache')
+
+    op.drop_table('video_category_cache')
+    op.drop_index('ix_video_categories_id', table_name='video_categories')
+    op.drop_index('ix_video_categories_category_id', table_name='video_categories')
+
+    op.drop_table('video_categories')
+    op.drop_index('ix_video_alerts_created_at', table_name='video_alerts')
+    op.drop_index('ix_video_alerts_country_id', table_name='video_alerts')
+
+    op.drop_table('video_alerts')
+    op.drop_index('ix_trending_videos_video_id', table_name='trending_videos')
+    op.drop_index('ix_trending_videos_id', table_name='trending_videos')
+    op.drop_index('ix_trending_videos_country_code', table_name='trending_videos')
+
+    op.drop_table('trending_videos')
+    op.drop_table('scheduler_leases')
+    op.drop_table('quota_usage')
+    op.drop_table('country_fetch_state')
@@ -0,0 +1,81 @@
+"""Indexes for the hot read paths
+
+- (country_code, fetched_at DESC) serves the latest-chart reads, which filter by country
+  and sort by fetch time, and replaces the single-column country_code index.
+- The same key restricted to rows with is_viral_spike serves active-spike reads while
+  staying a small fraction of the table.
+- (country_code, created_at) on video_alerts serves a country's alerts since a time.
+- On PostgreSQL, a pg_trgm GIN index on title and a jsonb GIN index on tags serve title
+  substring (ILIKE) and tag containment searches.
+
+The single-column video_id index is dropped as well: the unique (video_id, country_code)
+constraint already covers lookups by video. On PostgreSQL the indexes are built
+CONCURRENTLY so ingestion keeps writing while they build.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_spike = sa.column('is_viral_spike').is_(True)
+    fetched_desc = sa.text('fetched_at DESC')
+
+    if not _is_postgresql():
+        op.create_index('ix_trending_videos_country_fetched', 'trending_videos', ['country_code', fetched_desc])
+        op.create_index('ix_trending_videos_active_spikes', 'trending_videos', ['country_code', fetched_desc],
+                        sqlite_where=is_spike)
+        op.create_index('ix_video_alerts_country_created', 'video_alerts', ['country_code', 'created_at'])
+        op.drop_index('ix_trending_videos_country_code', table_name='trending_videos')
+        op.drop_index('ix_trending_videos_video_id', table_name='trending_videos')
+        return
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, so a failed run isn't rolled
+    # back; IF [NOT] EXISTS lets it be rerun
+    with op.get_context().autocommit_block():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index('ix_trending_videos_country_fetched', 'trending_videos', ['country_code', fetched_desc],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trending_videos_active_spikes', 'trending_videos', ['country_code', fetched_desc],
+                        postgresql_where=is_spike, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_video_alerts_country_created', 'video_alerts', ['country_code', 'created_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trending_videos_title_trgm', 'trending_videos', ['title'],
+                        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trending_videos_tags_gin', 'trending_videos', [sa.text('(CAST(tags AS jsonb)) jsonb_path_ops')],
+                        postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_trending_videos_country_code', table_name='trending_videos',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_trending_videos_video_id', table_name='trending_videos',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_trending_videos_video_id', 'trending_videos', ['video_id'], unique=False)
+    op.create_index('ix_trending_videos_country_code', 'trending_videos', ['country_code'], unique=False)
+    if _is_postgresql():
+        op.drop_index('ix_trending_videos_tags_gin', table_name='trending_videos')
+        op.drop_index('ix_trending_videos_title_trgm', table_name='trending_videos')
+    op.drop_index('ix_video_alerts_country_created', table_name='video_alerts')
+    op.drop_index('ix_trending_videos_active_spikes', table_name='trending_videos')
+    op.drop_index('ix_trending_videos_country_fetched', table_name='trending_videos')
@@ -0,0 +1,87 @@
+"""Keyset pagination indexes for every trending chart sort
+
+- Adds trending_videos.like_ratio (like_count / view_count) so the chart can be sorted
+  by it from an index, and backfills it.
+- Every sort gets a (country_code, sort key DESC, id DESC) index, id being the keyset
+  tiebreak: fetched_at, view_count, COALESCE(view_count_change, 0) and like_ratio. The
+  fetched_at and active-spike indexes from 0002 are replaced by ones that include id.
+
+On PostgreSQL the indexes are built CONCURRENTLY so ingestion keeps writing while they
+build; the new indexes are created before the ones they replace are dropped.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, key) of the (country_code, key DESC, id DESC) index of each sort
+SORT_INDEXES = [
+    ('ix_trending_videos_country_fetched_id', 'fetched_at DESC'),
+    ('ix_trending_videos_country_views_id', 'view_count DESC'),
+    ('ix_trending_videos_country_view_change_id', 'coalesce(view_count_change, 0) DESC'),
+    ('ix_trending_videos_country_like_ratio_id', 'like_ratio DESC'),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trending_videos', sa.Column('like_ratio', sa.Float(), nullable=True))
+    op.execute(
+        "UPDATE trending_videos SET like_ratio = CASE WHEN view_count > 0 "
+        "THEN CAST(like_count AS FLOAT) / view_count ELSE 0.0 END"
+    )
+
+    is_spike = sa.column('is_viral_spike').is_(True)
+    id_desc = sa.text('id DESC')
+    if not _is_postgresql():
+        for name, key in SORT_INDEXES:
+            op.create_index(name, 'trending_videos', ['country_code', sa.text(key), id_desc])
+        op.create_index('ix_trending_videos_active_spikes_id', 'trending_videos',
+                        ['country_code', sa.text('fetched_at DESC'), id_desc], sqlite_where=is_spike)
+        op.drop_index('ix_trending_videos_country_fetched', table_name='trending_videos')
+        op.drop_index('ix_trending_videos_active_spikes', table_name='trending_videos')
+        return
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, so a failed run isn't rolled
+    # back; IF [NOT] EXISTS lets it be rerun
+    with op.get_context().autocommit_block():
+        for name, key in SORT_INDEXES:
+            op.create_index(name, 'trending_videos', ['country_code', sa.text(key), id_desc],
+                            postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_trending_videos_active_spikes_id', 'trending_videos',
+                        ['country_code', sa.text('fetched_at DESC'), id_desc],
+                        postgresql_where=is_spike, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_trending_videos_country_fetched', table_name='trending_videos',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_trending_videos_active_spikes', table_name='trending_videos',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    is_spike = sa.column('is_viral_spike').is_(True)
+    fetched_desc = sa.text('fetched_at DESC')
+    op.create_index('ix_trending_videos_country_fetched', 'trending_videos', ['country_code', fetched_desc])
+    op.create_index('ix_trending_videos_active_spikes', 'trending_videos', ['country_code', fetched_desc],
+                    postgresql_where=is_spike, sqlite_where=is_spike)
+    op.drop_index('ix_trending_videos_active_spikes_id', table_name='trending_videos')
+    for name, _ in reversed(SORT_INDEXES):
+        op.drop_index(name, table_name='trending_videos')
+    with op.batch_alter_table('trending_videos') as batch_op:
+        batch_op.drop_column('like_ratio')
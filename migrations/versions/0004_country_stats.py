@@ -0,0 +1,39 @@
+"""Materialized per-country summary for /stats
+
+country_stats holds one row per country, recomputed at the end of every ingestion
+cycle, so /stats is a primary-key read instead of one COUNT(*) per country.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('country_stats',
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('video_count', sa.Integer(), nullable=False),
+    sa.Column('total_views', sa.BigInteger(), nullable=False),
+    sa.Column('spike_count', sa.Integer(), nullable=False),
+    sa.Column('top_categories', sa.JSON(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('country_code'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('country_stats')
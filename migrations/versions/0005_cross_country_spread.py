@@ -0,0 +1,138 @@
+"""Cross-country spread tables
+
+- video_region_first_seen: when each video first trended in each country, its origin
+  country and the lag behind it.
+- video_spread: per video, the origin country and how many countries it reached.
+- propagation_lag_buckets: lag counts per (origin, destination) pair, for medians.
+
+Ingestion maintains all three from now on; existing history (trending_videos, snapshots
+and daily rollups) is backfilled here when the tables are still empty.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.propagation.LAG_BUCKETS_SECONDS at the time of this revision
+LAG_BUCKETS_SECONDS = (
+    0, 1800, 3600, 7200, 10800, 14400, 21600, 28800, 43200, 64800, 86400, 129600, 172800,
+    259200, 345600, 432000, 604800, 864000, 1209600, 1814400, 2592000,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('video_region_first_seen',
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+    sa.Column('origin_country', sa.String(), nullable=True),
+    sa.Column('lag_seconds', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('video_id', 'country_code'),
+    )
+    op.create_table('video_spread',
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('origin_country', sa.String(), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+    sa.Column('last_spread_at', sa.DateTime(), nullable=False),
+    sa.Column('region_count', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('channel_title', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('video_id'),
+    )
+    op.create_index('ix_video_spread_regions_first_seen', 'video_spread',
+                    [sa.text('region_count DESC'), sa.text('first_seen_at DESC')])
+    op.create_index('ix_video_spread_origin_first_seen', 'video_spread',
+                    ['origin_country', sa.text('first_seen_at DESC')])
+    op.create_table('propagation_lag_buckets',
+    sa.Column('origin_country', sa.String(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('bucket_seconds', sa.Integer(), nullable=False),
+    sa.Column('videos', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('origin_country', 'country_code', 'bucket_seconds'),
+    )
+    _backfill()
+
+
+def _backfill() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        def timestamp(column):
+            return f"CAST({column} AS TIMESTAMP)"
+
+        def seconds_between(later, earlier):
+            return f"EXTRACT(EPOCH FROM ({later} - {earlier}))"
+    else:
+        def timestamp(column):
+            return column
+
+        def seconds_between(later, earlier):
+            return f"ROUND((julianday({later}) - julianday({earlier})) * 86400, 3)"
+
+    op.execute(f"""
+        INSERT INTO video_region_first_seen (video_id, country_code, first_seen_at)
+        SELECT video_id, country_code, MIN(seen_at) FROM (
+            SELECT video_id, country_code, {timestamp('captured_at')} AS seen_at FROM video_snapshots
+            UNION ALL
+            SELECT video_id, country_code, date FROM video_daily_metrics
+            UNION ALL
+            SELECT video_id, country_code, {timestamp('fetched_at')} FROM trending_videos WHERE fetched_at IS NOT NULL
+        ) seen
+        WHERE NOT EXISTS (SELECT 1 FROM video_region_first_seen)
+        GROUP BY video_id, country_code
+    """)
+    op.execute("""
+        INSERT INTO video_spread (video_id, origin_country, first_seen_at, last_spread_at, region_count, title, channel_title)
+        SELECT ranked.video_id, ranked.country_code, ranked.first_seen_at, ranked.last_seen_at, ranked.regions,
+               (SELECT MAX(t.title) FROM trending_videos t WHERE t.video_id = ranked.video_id),
+               (SELECT MAX(t.channel_title) FROM trending_videos t WHERE t.video_id = ranked.video_id)
+        FROM (
+            SELECT video_id, country_code, first_seen_at,
+                   ROW_NUMBER() OVER (PARTITION BY video_id ORDER BY first_seen_at, country_code) AS position,
+                   COUNT(*) OVER (PARTITION BY video_id) AS regions,
+                   MAX(first_seen_at) OVER (PARTITION BY video_id) AS last_seen_at
+            FROM video_region_first_seen
+        ) ranked
+        WHERE ranked.position = 1 AND NOT EXISTS (SELECT 1 FROM video_spread)
+    """)
+    op.execute("""
+        UPDATE video_region_first_seen SET origin_country = (
+            SELECT s.origin_country FROM video_spread s WHERE s.video_id = video_region_first_seen.video_id
+        )
+        WHERE origin_country IS NULL
+    """)
+    origin_seen_at = "(SELECT s.first_seen_at FROM video_spread s WHERE s.video_id = video_region_first_seen.video_id)"
+    op.execute(f"""
+        UPDATE video_region_first_seen SET lag_seconds = {seconds_between('first_seen_at', origin_seen_at)}
+        WHERE lag_seconds IS NULL AND country_code <> origin_country
+    """)
+    bucket = "CASE " + " ".join(
+        f"WHEN lag_seconds >= {bound} THEN {bound}" for bound in reversed(LAG_BUCKETS_SECONDS[1:])
+    ) + " ELSE 0 END"
+    op.execute(f"""
+        INSERT INTO propagation_lag_buckets (origin_country, country_code, bucket_seconds, videos)
+        SELECT origin_country, country_code, {bucket}, COUNT(*)
+        FROM video_region_first_seen
+        WHERE lag_seconds IS NOT NULL AND NOT EXISTS (SELECT 1 FROM propagation_lag_buckets)
+        GROUP BY origin_country, country_code, {bucket}
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('propagation_lag_buckets')
+    op.drop_index('ix_video_spread_origin_first_seen', table_name='video_spread')
+    op.drop_index('ix_video_spread_regions_first_seen', table_name='video_spread')
+    op.drop_table('video_spread')
+    op.drop_table('video_region_first_seen')
@@ -0,0 +1,102 @@
+"""Channel and category leaderboard rollups
+
+- channel_rollups / category_rollups: trending videos and chart appearances per
+  (period, period start, country, channel or category), for day and week periods.
+- leaderboard_members: the videos already counted in a period, so repeated fetches of
+  the same video only add appearances.
+
+Ingestion maintains them from now on; the history still in snapshots and daily rollups
+is backfilled here when the tables are empty (a daily rollup counts as one appearance).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rollup_table(name: str, key: str, label: str) -> None:
+    op.create_table(name,
+    sa.Column('period', sa.String(length=8), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column(key, sa.String(), nullable=False),
+    sa.Column(label, sa.String(), nullable=True),
+    sa.Column('videos', sa.Integer(), nullable=False),
+    sa.Column('appearances', sa.Integer(), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('period', 'period_start', 'country_code', key),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('leaderboard_members',
+    sa.Column('period', sa.String(length=8), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('period', 'period_start', 'country_code', 'video_id'),
+    )
+    _rollup_table('channel_rollups', 'channel_id', 'channel_title')
+    _rollup_table('category_rollups', 'category_id', 'category_name')
+    _backfill()
+
+
+def _backfill() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        seen_at = "CAST(captured_at AS TIMESTAMP)"
+        starts = {
+            "day": "CAST(o.seen_at AS DATE)",
+            "week": "CAST(date_trunc('week', o.seen_at) AS DATE)",
+        }
+    else:
+        seen_at = "captured_at"
+        starts = {
+            "day": "date(o.seen_at)",
+            "week": "date(o.seen_at, 'weekday 0', '-6 days')",
+        }
+    observations = f"""(
+        SELECT video_id, country_code, {seen_at} AS seen_at FROM video_snapshots
+        UNION ALL
+        SELECT video_id, country_code, date FROM video_daily_metrics
+    ) o"""
+
+    for period, start in starts.items():
+        op.execute(f"""
+            INSERT INTO leaderboard_members (period, period_start, country_code, video_id)
+            SELECT DISTINCT '{period}', {start}, o.country_code, o.video_id
+            FROM {observations}
+            WHERE NOT EXISTS (SELECT 1 FROM leaderboard_members WHERE period = '{period}')
+        """)
+        for table, key, label in (
+            ('channel_rollups', 'channel_id', 'channel_title'),
+            ('category_rollups', 'category_id', 'category_name'),
+        ):
+            op.execute(f"""
+                INSERT INTO {table} (period, period_start, country_code, {key}, {label}, videos, appearances, last_seen_at)
+                SELECT '{period}', {start}, o.country_code, COALESCE(t.{key}, ''), MAX(t.{label}),
+                       COUNT(DISTINCT o.video_id), COUNT(*), MAX(o.seen_at)
+                FROM {observations}
+                JOIN trending_videos t ON t.video_id = o.video_id AND t.country_code = o.country_code
+                WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE period = '{period}')
+                GROUP BY {start}, o.country_code, COALESCE(t.{key}, '')
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('category_rollups')
+    op.drop_table('channel_rollups')
+    op.drop_table('leaderboard_members')
@@ -0,0 +1,55 @@
+"""Full-text search over trending video titles, tags and descriptions
+
+On PostgreSQL, trending_videos gets a stored generated search_vector column (title
+weighted A, tags B, description C, 'simple' configuration since the charts span many
+languages) and a GIN index on it. Adding the column rewrites the table once; the index
+is then built CONCURRENTLY.
+
+Other databases have no search index; /search falls back to substring matching there.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _is_postgresql():
+        return
+    op.execute("""
+        ALTER TABLE trending_videos ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(CAST(tags AS text), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, so a failed run isn't rolled
+    # back; IF [NOT] EXISTS lets it be rerun
+    with op.get_context().autocommit_block():
+        op.create_index('ix_trending_videos_search', 'trending_videos', ['search_vector'],
+                        postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _is_postgresql():
+        return
+    op.drop_index('ix_trending_videos_search', table_name='trending_videos')
+    op.execute("ALTER TABLE trending_videos DROP COLUMN search_vector")
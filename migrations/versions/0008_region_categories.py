@@ -0,0 +1,74 @@
+"""Per-region video categories
+
+- video_categories is keyed by (country_code, category_id) instead of category_id alone,
+  and rows are only written when a region's list changes.
+- category_refreshes: when each region's list was last fetched.
+- video_category_cache (a JSON copy of the merged categories) is dropped.
+
+The old rows merged every region into one list and can't be attributed to a region, so
+they are not carried over; the first refresh after the upgrade refetches them.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_video_category_cache_id', table_name='video_category_cache')
+    op.drop_table('video_category_cache')
+    op.drop_index('ix_video_categories_id', table_name='video_categories')
+    op.drop_index('ix_video_categories_category_id', table_name='video_categories')
+    op.drop_table('video_categories')
+
+    op.create_table('video_categories',
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('category_id', sa.String(length=10), nullable=False),
+    sa.Column('category_name', sa.String(length=100), nullable=False),
+    sa.Column('last_updated', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('country_code', 'category_id'),
+    )
+    op.create_table('category_refreshes',
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.Column('category_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('country_code'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('category_refreshes')
+    op.drop_table('video_categories')
+
+    op.create_table('video_categories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.String(length=10), nullable=False),
+    sa.Column('category_name', sa.String(length=100), nullable=False),
+    sa.Column('assignable', sa.String(length=10), nullable=True),
+    sa.Column('last_updated', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_video_categories_category_id', 'video_categories', ['category_id'], unique=True)
+    op.create_index('ix_video_categories_id', 'video_categories', ['id'], unique=False)
+    op.create_table('video_category_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('categories_data', sa.JSON(), nullable=False),
+    sa.Column('last_updated', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_video_category_cache_id', 'video_category_cache', ['id'], unique=False)
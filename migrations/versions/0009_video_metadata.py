@@ -0,0 +1,111 @@
+"""Shared video metadata table
+
+- videos: one row per video_id with its title, description, tags and thumbnail, shared
+  by every country, plus a content_hash of them. Ingestion skips rows whose hash is
+  unchanged, so the large descriptions are no longer rewritten every cycle.
+- trending_videos loses those columns and keeps only the per-country chart stats.
+- On PostgreSQL the title trigram, tag and full-text search indexes (from 0002 and
+  0007) move from trending_videos to videos.
+
+videos is backfilled from the most recently fetched trending row of each video. The
+carried-over rows have no content_hash, so each one is rewritten once, the first time
+its video is fetched again. Dropping columns needs SQLite 3.35 or later.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+METADATA_COLUMNS = ['title', 'description', 'tags', 'thumbnail_url']
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _create_search_indexes(table: str) -> None:
+    """The PostgreSQL title, tag and full-text search indexes of 0002 and 0007, on `table`."""
+    op.create_index(f'ix_{table}_title_trgm', table, ['title'],
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index(f'ix_{table}_tags_gin', table, [sa.text('(CAST(tags AS jsonb)) jsonb_path_ops')],
+                    postgresql_using='gin')
+    op.execute(f"""
+        ALTER TABLE {table} ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(CAST(tags AS text), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index(f'ix_{table}_search', table, ['search_vector'], postgresql_using='gin')
+
+
+def _drop_search_indexes(table: str) -> None:
+    op.drop_index(f'ix_{table}_search', table_name=table)
+    op.execute(f"ALTER TABLE {table} DROP COLUMN search_vector")
+    op.drop_index(f'ix_{table}_tags_gin', table_name=table)
+    op.drop_index(f'ix_{table}_title_trgm', table_name=table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('videos',
+    sa.Column('video_id', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('tags', sa.JSON(), nullable=True),
+    sa.Column('thumbnail_url', sa.String(), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('video_id'),
+    )
+    op.execute("""
+        INSERT INTO videos (video_id, title, description, tags, thumbnail_url, updated_at)
+        SELECT video_id, title, description, tags, thumbnail_url, COALESCE(fetched_at, CURRENT_TIMESTAMP)
+        FROM (
+            SELECT video_id, title, description, tags, thumbnail_url, fetched_at,
+                   ROW_NUMBER() OVER (PARTITION BY video_id ORDER BY fetched_at DESC, id DESC) AS position
+            FROM trending_videos
+        ) latest
+        WHERE position = 1
+    """)
+    if _is_postgresql():
+        # search_vector is generated from the columns being dropped, so it goes first
+        _drop_search_indexes('trending_videos')
+        _create_search_indexes('videos')
+    for column in METADATA_COLUMNS:
+        op.drop_column('trending_videos', column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # title is NOT NULL again once backfilled, where the database can alter it in place
+    op.add_column('trending_videos', sa.Column('title', sa.String(), nullable=True))
+    op.add_column('trending_videos', sa.Column('description', sa.Text(), nullable=True))
+    op.add_column('trending_videos', sa.Column('tags', sa.JSON(), nullable=True))
+    op.add_column('trending_videos', sa.Column('thumbnail_url', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE trending_videos SET "
+        + ", ".join(
+            f"{column} = (SELECT videos.{column} FROM videos WHERE videos.video_id = trending_videos.video_id)"
+            for column in METADATA_COLUMNS
+        )
+    )
+    if _is_postgresql():
+        op.execute("UPDATE trending_videos SET title = '' WHERE title IS NULL")
+        op.alter_column('trending_videos', 'title', nullable=False)
+        _drop_search_indexes('videos')
+        _create_search_indexes('trending_videos')
+    op.drop_table('videos')
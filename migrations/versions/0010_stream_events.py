@@ -0,0 +1,40 @@
+"""Stream event outbox
+
+- stream_events: the events the ingestion leader publishes, relayed by every worker to
+  its own /stream clients and used to drop its cached responses for a country.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stream_events',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('event_type', sa.String(length=16), nullable=False),
+    sa.Column('country_code', sa.String(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_stream_events_created_at', 'stream_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stream_events_created_at', table_name='stream_events')
+    op.drop_table('stream_events')
@@ -0,0 +1,43 @@
+"""Stored fetch pages
+
+- stored_fetch_pages: every page of an archived chart fetch that was stored, by live
+  ingestion or by a replay, so a replay skips them even after their snapshots were
+  rolled up and deleted.
+
+Fetches stored before this revision are not listed; replays of them should start after
+the upgrade, or from a copy of the database that doesn't hold them yet.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stored_fetch_pages',
+    sa.Column('country_code', sa.String(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.Column('page', sa.Integer(), nullable=False),
+    sa.Column('object', sa.String(), nullable=False),
+    sa.Column('source', sa.String(length=8), nullable=False),
+    sa.Column('stored_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('country_code', 'fetched_at', 'page'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stored_fetch_pages')
@@ -0,0 +1,76 @@
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+# The app reads its settings at import time. Tests run against TEST_DATABASE_URL when
+# set (e.g. a PostgreSQL database), otherwise a throwaway SQLite file.
+_tmpdir = tempfile.mkdtemp(prefix="yttrends-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_tmpdir}/test.db"
+os.environ.setdefault("YOUTUBE_API_KEY", "test-key")
+# Empty rather than unset, so a local .env can't switch on Redis or the raw archive
+os.environ["CACHE_URL"] = ""
+os.environ["RAW_ARCHIVE_DIR"] = ""
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Migrates the test database to head once per run."""
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+    yield
+    import asyncio
+    from app.database import get_async_engine
+
+    asyncio.run(get_async_engine().dispose())
+
+
+@pytest.fixture
+def db(database):
+    """A session on the migrated database; every table is emptied afterwards."""
+    from app.database import Base, SessionLocal, engine
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+
+@pytest.fixture(params=["on_conflict", "fallback"])
+def upsert_path(request, monkeypatch):
+    """Runs a test against the ON CONFLICT statements and the portable ORM fallback."""
+    if request.param == "fallback":
+        from app import crud
+
+        monkeypatch.setattr(crud, "_dialect_insert", lambda db: None)
+    return request.param
+
+
+@pytest.fixture
+def client(db):
+    """The API without its startup work (tracing, category load, scheduler)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    @asynccontextmanager
+    async def no_lifespan(app):
+        yield
+
+    lifespan = app.router.lifespan_context
+    app.router.lifespan_context = no_lifespan
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.router.lifespan_context = lifespan
+        app.dependency_overrides.clear()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from app.adaptive import AdaptivePolicy, QuotaBudget, chart_churn, schedule_next, select_due
+from app.models import CountryFetchState
+
+NOW = datetime(2026, 10, 16, 12)
+HOUR = 60 * 60
+
+
+def test_churn_is_the_share_of_new_videos():
+    assert chart_churn(None, ["a", "b"]) is None
+    assert chart_churn([], ["a", "b"]) is None
+    assert chart_churn(["a", "b"], []) is None
+    assert chart_churn(["a", "b", "c", "d"], ["a", "b", "c", "d"]) == 0
+    assert chart_churn(["a", "b", "c", "d"], ["a", "b", "x", "y"]) == 0.5
+    # Order and repeats don't count
+    assert chart_churn(["a", "b"], ["b", "a", "a"]) == 0
+
+
+def test_interval_follows_churn_within_bounds():
+    policy = AdaptivePolicy(default_interval=6 * HOUR, min_interval=HOUR, max_interval=12 * HOUR)
+
+    assert policy.next_interval(None, None) == 6 * HOUR
+    assert policy.next_interval(4 * HOUR, 0.5) == 2 * HOUR
+    assert policy.next_interval(4 * HOUR, 0.05) == 6 * HOUR
+    # Between the two thresholds the interval is kept
+    assert policy.next_interval(4 * HOUR, 0.2) == 4 * HOUR
+    assert policy.next_interval(1.5 * HOUR, 0.9) == HOUR
+    assert policy.next_interval(10 * HOUR, 0.0) == 12 * HOUR
+
+
+def test_budget_stretches_intervals_only_when_over_quota():
+    budget = QuotaBudget(daily_units=100, units_per_fetch=2)
+
+    # 8 countries every 6 hours: 8 * 4 * 2 = 64 units a day
+    assert budget.projected_daily_units([6 * HOUR] * 8) == 64
+    assert budget.stretch_factor([6 * HOUR] * 8) == 1.0
+    # Every hour: 8 * 24 * 2 = 384 units, so intervals must be 3.84 times longer
+    assert budget.stretch_factor([HOUR] * 8) == 3.84
+    assert QuotaBudget(daily_units=0).stretch_factor([HOUR]) == 1.0
+    assert budget.affordable_fetches(95) == 2
+    assert budget.affordable_fetches(120) == 0
+
+
+def test_due_countries_are_most_overdue_first_and_capped_by_quota():
+    next_runs = {
+        "US": NOW - timedelta(minutes=5),
+        "GB": NOW - timedelta(hours=2),
+        "DE": None,
+        "JP": NOW + timedelta(minutes=1),
+        "FR": NOW,
+    }
+
+    assert select_due(next_runs, NOW, QuotaBudget(daily_units=100), used_today=0) == ["DE", "GB", "US", "FR"]
+    assert select_due(next_runs, NOW, QuotaBudget(daily_units=100, units_per_fetch=10), used_today=80) == ["DE", "GB"]
+    assert select_due(next_runs, NOW, QuotaBudget(daily_units=100), used_today=100) == []
+
+
+def test_schedule_applies_the_stretch():
+    assert schedule_next(NOW, HOUR, 1.0) == NOW + timedelta(hours=1)
+    assert schedule_next(NOW, HOUR, 2.5) == NOW + timedelta(hours=2, minutes=30)
+
+
+def test_country_runs_reschedule_on_churn(db):
+    from app import main
+    from app.crud import get_quota_used
+    from app.ingestion import CountryResult
+
+    policy = main.adaptive_policy
+    db.add(CountryFetchState(country_code="US", interval_seconds=4 * HOUR, last_video_ids=["a", "b", "c", "d"]))
+    db.add(CountryFetchState(country_code="GB", interval_seconds=4 * HOUR, last_video_ids=["a", "b", "c", "d"]))
+    db.commit()
+
+    results = {
+        "US": CountryResult("US", "ok", videos=4, video_ids=["a", "x", "y", "z"]),
+        "GB": CountryResult("GB", "ok", videos=4, video_ids=["a", "b", "c", "d"]),
+        "DE": CountryResult("DE", "error", error="boom"),
+        "JP": CountryResult("JP", "skipped"),
+    }
+    main.save_country_runs(results, main.plan_fetches(NOW)[1], 2.0, NOW, units_spent=12)
+
+    db.expire_all()
+    states = {state.country_code: state for state in db.query(CountryFetchState)}
+    assert states["US"].last_churn == 0.75
+    assert states["US"].interval_seconds == policy.next_interval(4 * HOUR, 0.75)
+    assert states["GB"].interval_seconds == policy.next_interval(4 * HOUR, 0.0)
+    # The stretch lengthens the wait, not the stored interval
+    assert states["US"].next_run_at == NOW + timedelta(seconds=2 * states["US"].interval_seconds)
+    # A failed run records no chart and falls back to the default interval
+    assert (states["DE"].last_status, states["DE"].last_video_ids) == ("error", None)
+    assert states["DE"].interval_seconds == policy.default_interval
+    assert "JP" not in states
+    assert get_quota_used(db, main.quota_day()) == 12
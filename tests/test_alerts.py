@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from app.models import TrendingVideo, VideoAlert
+
+
+def add_alerts(db, *alerts):
+    """Adds (video_id, country_code, created_at) alerts in order."""
+    for video_id, country_code, created_at in alerts:
+        db.add(VideoAlert(video_id=video_id, country_code=country_code, title=f"Video {video_id}",
+                          current_views=200_000, previous_views=100_000, view_change=100_000, created_at=created_at))
+        db.commit()
+
+
+def test_since_id_pages_through_alerts_in_order(client, db):
+    now = datetime.utcnow()
+    add_alerts(db, *((f"v{i}", "US", now - timedelta(minutes=10 - i)) for i in range(5)))
+
+    first = client.get("/alerts", params={"limit": 3})
+    second = client.get("/alerts", params={"since_id": first.headers["X-Next-Since-Id"]})
+    empty = client.get("/alerts", params={"since_id": second.headers["X-Next-Since-Id"]})
+
+    assert [alert["video_id"] for alert in first.json()] == ["v0", "v1", "v2"]
+    assert [alert["video_id"] for alert in second.json()] == ["v3", "v4"]
+    assert empty.json() == []
+    # An empty page keeps the consumer where it was
+    assert empty.headers["X-Next-Since-Id"] == second.headers["X-Next-Since-Id"]
+
+
+def test_polling_is_read_only_and_shared_between_consumers(client, db):
+    add_alerts(db, ("v1", "US", datetime.utcnow()))
+    db.add(TrendingVideo(video_id="v1", country_code="US", published_at=datetime(2026, 10, 1), channel_id="c1",
+                         channel_title="Channel", category_id="10", view_count=200_000,
+                         is_viral_spike=True, alert_triggered=True))
+    db.commit()
+
+    dashboards = [client.get("/alerts").json() for _ in range(2)]
+
+    assert dashboards[0] == dashboards[1]
+    assert [alert["video_id"] for alert in dashboards[0]] == ["v1"]
+    db.expire_all()
+    assert db.query(TrendingVideo).one().alert_triggered is True
+
+
+def test_without_since_id_only_recent_alerts_of_the_country(client, db):
+    now = datetime.utcnow()
+    add_alerts(db, ("old", "US", now - timedelta(hours=30)), ("gb", "GB", now), ("new", "US", now))
+
+    response = client.get("/alerts", params={"country_code": "US", "since_hours": 24})
+
+    assert [alert["video_id"] for alert in response.json()] == ["new"]
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.anomaly import (
+    SnapshotWindow, SpikeEngine, SpikeFeatures, SpikeThresholds, ThresholdConfig, get_detector,
+)
+
+START = datetime(2026, 10, 16)
+
+
+def hourly(video_id, views):
+    """(video_id, captured_at, view_count) history points, one per hour from START."""
+    return [(video_id, START + timedelta(hours=hour), count) for hour, count in enumerate(views)]
+
+
+def score(detector, views, thresholds=SpikeThresholds()):
+    """Scores one video whose hourly views are `views`, the last one being the incoming observation."""
+    window = SnapshotWindow.build(["v"], [views[-1]], START + timedelta(hours=len(views) - 1), hourly("v", views[:-1]))
+    return bool(SpikeEngine(get_detector(detector), ThresholdConfig(thresholds)).score("US", window, ["10"])[0])
+
+
+def test_window_keeps_the_newest_points_and_pads_short_histories():
+    history = sorted(hourly("a", range(100, 2100, 100)) + hourly("b", [5, 6]))
+    window = SnapshotWindow.build(["a", "b", "c"], [9999, 7, 1], START + timedelta(hours=30), history, size=4)
+
+    # 20 points for "a": only the newest three fit before the incoming observation
+    assert window.views[0].tolist() == [1800, 1900, 2000, 9999]
+    assert window.hours[0, -1] - window.hours[0, -2] == 11
+    assert np.isnan(window.views[1, 0]) and window.views[1, 1:].tolist() == [5, 6, 7]
+    assert np.isnan(window.views[2, :-1]).all() and window.views[2, -1] == 1
+
+
+def test_window_ignores_history_of_videos_outside_the_batch():
+    window = SnapshotWindow.build(["a"], [50], START + timedelta(hours=2), hourly("a", [10, 20]) + hourly("z", [1, 2]), size=3)
+
+    assert window.views.tolist() == [[10, 20, 50]]
+
+
+def test_flat_velocity_has_no_zscore():
+    views = [100_000 + 1_000 * hour for hour in range(8)]
+    window = SnapshotWindow.build(["v"], [views[-1]], START + timedelta(hours=7), hourly("v", views[:-1]))
+    features = SpikeFeatures.compute(window, np.array([0.3]))
+
+    assert features.history_points[0] == 6
+    assert np.isnan(features.zscore[0])
+    assert not score("zscore", views)
+    assert not score("composite", views)
+
+
+def test_zscore_flags_an_outlier_velocity():
+    views = np.cumsum([100_000, 1_000, 1_200, 900, 1_100, 1_000, 40_000]).tolist()
+
+    assert score("zscore", views)
+    assert score("composite", views)
+
+
+def test_statistical_rules_need_enough_history():
+    # Two previous velocity points, below min_history
+    views = [100_000, 101_000, 102_000, 150_000]
+
+    assert not score("zscore", views)
+    assert not score("ewma", views)
+    # The composite detector falls back to the growth ratio until then
+    assert not score("composite", views)
+    assert score("composite", views, SpikeThresholds(growth_ratio=0.4))
+
+
+def test_view_floors_keep_small_videos_quiet():
+    views = np.cumsum([1_000, 100, 100, 100, 100, 4_000]).tolist()
+
+    assert score("ewma", views)
+    assert not score("composite", views)
+
+
+def test_a_single_observation_never_spikes():
+    for detector in ("growth", "zscore", "ewma", "acceleration", "composite"):
+        assert not score(detector, [1_000_000])
+
+
+def test_thresholds_resolve_most_specific_first():
+    config = ThresholdConfig.from_dict({
+        "default": {"min_views": 20_000},
+        "US": {"zscore": 4},
+        "US:10": {"min_view_increase": 1},
+        "*:20": {"growth_ratio": 2},
+    })
+
+    assert config.resolve("US", "10") == SpikeThresholds(min_views=20_000, zscore=4, min_view_increase=1)
+    assert config.resolve("US", "20") == SpikeThresholds(min_views=20_000, zscore=4)
+    assert config.resolve("GB", "20") == SpikeThresholds(min_views=20_000, growth_ratio=2)
+    assert config.resolve("GB", "10") == SpikeThresholds(min_views=20_000)
+    with pytest.raises(ValueError):
+        ThresholdConfig.from_dict({"US": {"zscores": 4}})
+
+
+def video_item(video_id, views):
+    return {
+        "id": video_id,
+        "snippet": {"publishedAt": "2026-10-01T00:00:00Z", "channelId": "c1", "channelTitle": "Channel",
+                    "title": f"Video {video_id}", "categoryId": "10"},
+        "statistics": {"viewCount": str(views), "likeCount": "0", "commentCount": "0"},
+    }
+
+
+def test_ingestion_raises_one_alert_for_a_spike(db):
+    from app.crud import add_or_update_trending_video_batch
+    from app.models import TrendingVideo, VideoAlert
+
+    steady = [100_000 + 1_000 * hour for hour in range(7)]
+    for hour, views in enumerate(steady):
+        rows = add_or_update_trending_video_batch(
+            db, [video_item("spiking", views), video_item("steady", views)], "US", {}, fetched_at=START + timedelta(hours=hour)
+        )
+        assert not any(row["is_viral_spike"] for row in rows)
+
+    rows = add_or_update_trending_video_batch(
+        db, [video_item("spiking", steady[-1] + 60_000), video_item("steady", steady[-1] + 1_000)], "US", {},
+        fetched_at=START + timedelta(hours=7),
+    )
+
+    assert [row["is_viral_spike"] for row in rows] == [True, False]
+    [alert] = db.query(VideoAlert).all()
+    assert (alert.video_id, alert.current_views, alert.previous_views, alert.view_change) == (
+        "spiking", steady[-1] + 60_000, steady[-1], 60_000
+    )
+    assert db.query(TrendingVideo).filter(TrendingVideo.is_viral_spike.is_(True)).count() == 1
@@ -0,0 +1,165 @@
+from datetime import datetime
+
+import pytest
+
+from app.models import CategoryRefresh, CountryStats
+
+
+def test_stats_summarizes_countries(client, db):
+    from app.main import TRACKED_COUNTRIES
+
+    db.add(CountryStats(
+        country_code="US", video_count=3, total_views=300, spike_count=1,
+        top_categories=[{"category_id": "10", "category_name": "Music", "videos": 3}],
+        refreshed_at=datetime(2026, 10, 16, 12),
+    ))
+    db.commit()
+
+    response = client.get("/stats")
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["total_videos_tracked"] == 3
+    assert stats["countries"]["US"]["viral_spikes"] == 1
+    assert set(stats["videos_by_country"]) == set(TRACKED_COUNTRIES)
+    # Not every region's categories were fetched yet
+    assert stats["categories_last_updated"] is None
+
+
+def test_stats_reports_the_stalest_category_refresh(client, db):
+    from app.main import TRACKED_COUNTRIES
+
+    for i, code in enumerate(TRACKED_COUNTRIES):
+        db.add(CategoryRefresh(country_code=code, refreshed_at=datetime(2026, 10, 16, i), category_count=10))
+    db.commit()
+
+    stats = client.get("/stats").json()
+
+    assert stats["categories_last_updated"] == "2026-10-16T00:00:00"
+    assert stats["total_videos_tracked"] == 0
+
+
+def test_metrics_expose_ingestion_counters(client, db):
+    from app.main import store_country_batch
+    from benchmarks.payloads import make_video_items
+
+    store_country_batch("JP", make_video_items(12))
+    client.get("/stats")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'yttrends_rows_written_total{country_code="JP"} 12.0' in body
+    assert 'yttrends_store_seconds_count{country_code="JP"} 1.0' in body
+    assert 'yttrends_http_request_seconds_count{method="GET",route="/stats",status="200"}' in body
+    assert 'yttrends_response_cache_hits_total{namespace="trending"}' in body
+
+
+def test_health_reports_the_database(client):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_health_is_503_when_the_database_is_down(client):
+    from sqlalchemy.exc import OperationalError
+
+    from app.database import get_async_db
+    from app.main import app
+
+    class UnreachableSession:
+        async def execute(self, statement):
+            raise OperationalError(str(statement), {}, ConnectionRefusedError("connection refused"))
+
+    async def unreachable_db():
+        yield UnreachableSession()
+
+    app.dependency_overrides[get_async_db] = unreachable_db
+
+    response = client.get("/health")
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Database unavailable"}
+
+
+def test_ingestion_status_survives_a_full_response_cache(client):
+    from app import main
+
+    main.state_backend.set("ingestion:last_cycle", b'{"countries": {}}')
+    for cursor in range(main.RESPONSE_CACHE_MAX_ENTRIES + 100):
+        backend_key, _ = main.trending_cache.lookup(("US", 0, 50, False, "fetched_at", cursor))
+        main.trending_cache.set(backend_key, b"[]")
+
+    response = client.get("/ingestion/status")
+
+    assert response.status_code == 200
+    assert response.json() == {"countries": {}}
+
+
+def test_search_rejects_limits_out_of_range(client):
+    for limit in (0, -1, 101):
+        assert client.get("/search", params={"q": "video", "limit": limit}).status_code == 422
+
+
+def test_search_cursor_only_pages_through_its_own_search(client, db):
+    from app.crud import add_or_update_trending_video_batch
+    from benchmarks.payloads import make_video_items
+
+    add_or_update_trending_video_batch(db, make_video_items(12), "US", {})
+
+    first = client.get("/search", params={"q": "synthetic", "limit": 5})
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/search", params={"q": "synthetic", "limit": 5, "cursor": cursor})
+    other = client.get("/search", params={"q": "video", "limit": 5, "cursor": cursor})
+    other_country = client.get("/search", params={"q": "synthetic", "country_code": "GB", "limit": 5, "cursor": cursor})
+
+    assert first.status_code == second.status_code == 200
+    assert not {video["video_id"] for video in first.json()} & {video["video_id"] for video in second.json()}
+    assert other.status_code == other_country.status_code == 400
+    assert other.json()["detail"] == other_country.json()["detail"] == "Cursor was issued for another query."
+
+
+def page_through_chart(client, sort, limit):
+    """Follows X-Next-Cursor through the US chart; returns the pages' video ids."""
+    pages, params = [], {"sort": sort, "limit": limit}
+    while True:
+        response = client.get("/trending-videos/US", params=params)
+        assert response.status_code == 200
+        pages.append([video["video_id"] for video in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            return pages
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+
+@pytest.mark.parametrize("sort", ["fetched_at", "views", "view_change", "like_ratio"])
+def test_trending_cursor_pages_through_the_whole_chart(client, db, sort):
+    from app.crud import add_or_update_trending_video_batch, trending_sort_key
+    from app.main import trending_cache
+    from app.models import TrendingVideo
+    from benchmarks.payloads import make_video_items
+
+    add_or_update_trending_video_batch(db, make_video_items(23), "US", {})
+    add_or_update_trending_video_batch(db, make_video_items(23, cycle=1), "US", {})
+    trending_cache.invalidate_country("US")
+
+    pages = page_through_chart(client, sort, limit=10)
+
+    expected = sorted(db.query(TrendingVideo).filter(TrendingVideo.country_code == "US"),
+                      key=lambda video: trending_sort_key(video, sort), reverse=True)
+    assert [len(page) for page in pages] == [10, 10, 3]
+    assert [video_id for page in pages for video_id in page] == [video.video_id for video in expected]
+
+
+def test_trending_rejects_bad_cursors_and_sorts(client, db):
+    from app.pagination import encode_cursor
+
+    views_cursor = encode_cursor("views", 100, 1)
+
+    assert client.get("/trending-videos/US", params={"sort": "title"}).status_code == 400
+    assert client.get("/trending-videos/US", params={"cursor": "not-a-cursor"}).json()["detail"] == "Malformed cursor."
+    response = client.get("/trending-videos/US", params={"sort": "like_ratio", "cursor": views_cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor was issued for sort 'views', not 'like_ratio'."
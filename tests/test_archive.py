@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app import archive
+from app.archive import RawArchive
+from app.crud import add_or_update_trending_video_batch, get_stored_pages
+from app.models import ChannelRollup, StoredFetchPage, TrendingVideo, Video, VideoSnapshot
+from benchmarks.payloads import make_video_items
+
+NOW = datetime(2026, 10, 16, 12)
+
+
+@pytest.fixture
+def raw_archive(tmp_path, db):
+    archive._init_worker(str(tmp_path))
+    return RawArchive(str(tmp_path))
+
+
+def appearances(db):
+    return db.query(func.sum(ChannelRollup.appearances)).filter(ChannelRollup.period == "week").scalar()
+
+
+def test_replay_skips_a_fetch_stored_after_its_snapshots_were_deleted(db, raw_archive):
+    entry = raw_archive.write("US", NOW - timedelta(days=30), [make_video_items(10)])
+    assert archive._replay_entry(entry) == (True, 10)
+    stored = appearances(db)
+
+    # Rolled up and pruned, as rollup_snapshots_to_daily does after 14 days
+    db.query(VideoSnapshot).delete()
+    db.commit()
+    assert archive._replay_entry(entry) == (False, 0)
+
+    db.expire_all()
+    assert db.query(VideoSnapshot).count() == 0
+    assert appearances(db) == stored
+    assert db.get(StoredFetchPage, ("US", entry.fetched_at, 0)).source == "replay"
+
+
+def test_replaying_an_older_fetch_keeps_the_newer_chart_row(db, raw_archive):
+    latest = {row["video_id"]: row for row in add_or_update_trending_video_batch(db, make_video_items(10, cycle=2), "US", {}, fetched_at=NOW)}
+    older = make_video_items(10, cycle=1)
+    for item in older:
+        item["snippet"]["title"] = "An older title"
+
+    entry = raw_archive.write("US", NOW - timedelta(days=30), [older])
+    assert archive._replay_entry(entry) == (True, 10)
+
+    db.expire_all()
+    for video in db.query(TrendingVideo).filter(TrendingVideo.country_code == "US"):
+        assert video.fetched_at.replace(tzinfo=None) == NOW
+        assert video.view_count == latest[video.video_id]["view_count"]
+        assert video.view_count_change is None
+    assert db.query(Video).filter(Video.title == "An older title").count() == 0
+    # The older fetch still adds to the history
+    assert db.query(VideoSnapshot).count() == 20
+
+
+def live_fetch(main, tmp_path, monkeypatch, pages, fail_on_page=None):
+    """Runs fetch_country_pages like the ingestion engine, storing each page it yields."""
+    monkeypatch.setattr(main, "raw_archive", RawArchive(str(tmp_path)))
+    monkeypatch.setattr(main, "fetch_trending_pages", lambda *args, **kwargs: iter(pages))
+    fetch = main.fetch_country_pages("US")
+    for number, page in enumerate(fetch):
+        if number == fail_on_page:
+            break
+        main.store_country_batch("US", page)
+    fetch.close()
+    # The archive and the stored-page record are written on the archive thread
+    main.archive_executor.submit(lambda: None).result()
+    [entry] = main.raw_archive.entries()
+    return entry
+
+
+def test_live_fetch_is_recorded_so_replay_skips_it(db, tmp_path, monkeypatch):
+    from app import main
+
+    entry = live_fetch(main, tmp_path, monkeypatch, [make_video_items(10), make_video_items(20)[10:]])
+
+    assert get_stored_pages(db, "US", entry.fetched_at) == {0, 1}
+    archive._init_worker(str(tmp_path))
+    assert archive._replay_entry(entry) == (False, 0)
+    assert db.query(VideoSnapshot).count() == 20
+
+
+def test_replay_stores_the_pages_a_failed_live_fetch_did_not(db, tmp_path, monkeypatch):
+    from app import main
+
+    pages = [make_video_items(30)[i:i + 10] for i in (0, 10, 20)]
+    # Storing the second page failed, so the engine gave up on the country
+    entry = live_fetch(main, tmp_path, monkeypatch, pages, fail_on_page=1)
+
+    assert entry.pages == 2
+    assert get_stored_pages(db, "US", entry.fetched_at) == {0}
+    archive._init_worker(str(tmp_path))
+    assert archive._replay_entry(entry) == (True, 10)
+    assert get_stored_pages(db, "US", entry.fetched_at) == {0, 1}
+    assert db.query(VideoSnapshot).count() == 20
+
+
+def test_an_abandoned_fetch_is_archived_off_the_calling_thread(db, tmp_path, monkeypatch):
+    import threading
+
+    from app import main
+
+    threads = []
+    archive_write = RawArchive.write
+
+    def write(self, *args):
+        threads.append(threading.get_ident())
+        return archive_write(self, *args)
+
+    monkeypatch.setattr(RawArchive, "write", write)
+    monkeypatch.setattr(main, "raw_archive", RawArchive(str(tmp_path)))
+    monkeypatch.setattr(main, "fetch_trending_pages", lambda *args, **kwargs: iter([make_video_items(5)]))
+
+    fetch = main.fetch_country_pages("US")
+    next(fetch)
+    del fetch
+    main.archive_executor.submit(lambda: None).result()
+
+    assert threads and threading.get_ident() not in threads
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+import fakeredis
+import pytest
+
+from app.cache import InMemoryBackend, RedisBackend, ResponseCache
+
+
+class ThreadRecordingRedis(fakeredis.FakeRedis):
+    """FakeRedis noting which threads its commands ran on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def execute_command(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().execute_command(*args, **kwargs)
+
+
+def test_redis_lookups_stay_off_the_event_loop():
+    client = ThreadRecordingRedis()
+    cache = ResponseCache(RedisBackend(client=client), namespace="trending")
+
+    async def roundtrip():
+        loop_thread = threading.get_ident()
+        backend_key, _ = await cache.alookup(("US", 0))
+        await cache.aset(backend_key, b"[]", {"X-Next-Cursor": "abc"})
+        _, cached = await cache.alookup(("US", 0))
+        await cache.ainvalidate_country("US")
+        _, after_invalidation = await cache.alookup(("US", 0))
+        return loop_thread, cached, after_invalidation
+
+    loop_thread, cached, after_invalidation = asyncio.run(roundtrip())
+
+    assert cached.body == b"[]" and cached.headers == {"X-Next-Cursor": "abc"}
+    assert after_invalidation is None
+    assert client.threads and loop_thread not in client.threads
+
+
+@pytest.mark.parametrize("backend", [InMemoryBackend(), RedisBackend(client=fakeredis.FakeRedis())])
+def test_async_backend_calls(backend):
+    async def roundtrip():
+        await backend.aset("ingestion:last_cycle", b"{}")
+        return await backend.aget("ingestion:last_cycle"), await backend.aget("missing")
+
+    assert asyncio.run(roundtrip()) == (b"{}", None)
+
+
+def test_response_read_before_an_invalidation_is_not_served_after_it():
+    cache = ResponseCache(InMemoryBackend(), namespace="trending")
+    backend_key, cached = cache.lookup(("US", 0))
+    assert cached is None
+
+    # Ingestion commits and invalidates while the miss is still reading the database
+    cache.invalidate_country("US")
+    cache.set(backend_key, b"[stale]")
+
+    assert cache.lookup(("US", 0))[1] is None
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,26 @@
+import asyncio
+from datetime import timedelta
+
+from app.categories import CategoryService
+
+
+def test_on_change_runs_only_when_a_refresh_stores_changes(db):
+    fetched = {"US": {"10": "Music"}, "GB": {"10": "Music", "20": "Gaming"}}
+    changes = []
+
+    async def on_change(categories):
+        changes.append(categories.version)
+
+    service = CategoryService(fetched.get, ["US", "GB"], max_age=timedelta(hours=24), on_change=on_change)
+
+    async def refresh_twice():
+        first = await service.refresh()
+        # Nothing is stale any more
+        second = await service.refresh()
+        return first, second
+
+    first, second = asyncio.run(refresh_twice())
+
+    assert changes == [first.version]
+    assert second is first
+    assert dict(first.names("GB")) == {"10": "Music", "20": "Gaming"}
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.crud import add_or_update_trending_video_batch
+from benchmarks.payloads import make_video_items
+
+NOW = datetime(2026, 10, 16, 12)
+
+
+def ingest(db, country_code="US", count=5, category_id=None, hours=1):
+    items = make_video_items(count)
+    if category_id:
+        for item in items:
+            item["snippet"]["categoryId"] = category_id
+    for hour in range(hours):
+        add_or_update_trending_video_batch(db, items, country_code, {}, fetched_at=NOW + timedelta(hours=hour))
+    return [item["id"] for item in items]
+
+
+def read_csv(response):
+    return list(csv.DictReader(io.StringIO(response.text)))
+
+
+def test_csv_export_of_the_chart(client, db):
+    video_ids = ingest(db)
+    ingest(db, country_code="GB")
+
+    response = client.get("/export/trending", params={"country_code": "US"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="trending_US.csv"'
+    rows = read_csv(response)
+    assert sorted(row["video_id"] for row in rows) == sorted(video_ids)
+    assert {row["country_code"] for row in rows} == {"US"}
+    # Columns from the joined videos table, lists as JSON
+    assert rows[0]["title"].startswith("Synthetic trending video")
+    assert isinstance(json.loads(rows[0]["tags"]), list)
+
+
+def test_history_exports_filter_by_time_and_category(client, db):
+    music = ingest(db, count=2, category_id="10", hours=3)
+    ingest(db, country_code="GB", count=2, category_id="20", hours=3)
+
+    response = client.get("/export/snapshots", params={
+        "since": (NOW + timedelta(hours=1)).isoformat(), "until": (NOW + timedelta(hours=2)).isoformat(),
+    })
+    rows = read_csv(response)
+    assert len(rows) == 4
+    assert {row["captured_at"] for row in rows} == {(NOW + timedelta(hours=1)).isoformat()}
+
+    rows = read_csv(client.get("/export/snapshots", params={"category_id": "10"}))
+    assert {row["video_id"] for row in rows} == set(music) and {row["country_code"] for row in rows} == {"US"}
+    # In (country, time) order
+    assert [row["captured_at"] for row in rows] == sorted(row["captured_at"] for row in rows)
+
+
+def test_export_is_encoded_chunk_by_chunk(db):
+    from app.database import engine
+    from app.export import export
+
+    ingest(db, count=5)
+
+    chunks = list(export(engine, "trending", "csv", chunk_size=2))
+
+    # The header goes out with the first chunk of rows
+    assert len(chunks) == 3
+    assert [len(list(csv.reader(io.StringIO(chunk.decode())))) for chunk in chunks] == [3, 2, 1]
+
+
+def test_every_chunk_is_a_parquet_row_group(db):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    from app.database import engine
+    from app.export import export
+
+    ingest(db, count=5)
+
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(export(engine, "trending", "parquet", chunk_size=2))))
+
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [2, 2, 1]
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_arrow_formats_round_trip(client, db, format):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    video_ids = ingest(db, count=5)
+
+    response = client.get("/export/trending", params={"format": format})
+
+    assert response.status_code == 200
+    if format == "parquet":
+        table = pq.read_table(io.BytesIO(response.content))
+    else:
+        table = pa.ipc.open_stream(response.content).read_all()
+    assert sorted(table.column("video_id").to_pylist()) == sorted(video_ids)
+    assert table.schema.field("fetched_at").type == pa.timestamp("us")
+    assert table.schema.field("tags").type == pa.list_(pa.string())
+    assert table.schema.field("is_viral_spike").type == pa.bool_()
+
+
+def test_unknown_datasets_formats_and_countries_are_rejected(client, db):
+    assert client.get("/export/alerts").status_code == 400
+    assert client.get("/export/trending", params={"format": "xlsx"}).status_code == 400
+    assert client.get("/export/trending", params={"country_code": "ZZ"}).status_code == 400
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from app.crud import add_or_update_trending_video_batch, rollup_snapshots_to_daily
+from app.models import VideoDailyMetric, VideoSnapshot
+from benchmarks.payloads import make_video_items
+
+
+def ingest_hourly(db, start, hours, count=3, first_cycle=0):
+    for hour in range(hours):
+        add_or_update_trending_video_batch(db, make_video_items(count, cycle=first_cycle + hour), "US", {}, fetched_at=start + timedelta(hours=hour))
+
+
+def test_every_fetch_appends_a_snapshot_per_video(db):
+    ingest_hourly(db, datetime(2026, 10, 16), 4)
+
+    assert db.query(VideoSnapshot).count() == 12
+    views = [snapshot.view_count for snapshot in db.query(VideoSnapshot).filter(
+        VideoSnapshot.video_id == make_video_items(1)[0]["id"]
+    ).order_by(VideoSnapshot.captured_at)]
+    assert views == sorted(views) and len(set(views)) == 4
+
+
+def test_rollup_keeps_the_highest_counts_of_each_whole_day(db):
+    # 36 hours from 18:00 on the 1st: parts of three days
+    ingest_hourly(db, datetime(2026, 10, 1, 18), 36)
+    video_id = make_video_items(1)[0]["id"]
+    snapshots = db.query(VideoSnapshot).filter(VideoSnapshot.video_id == video_id).all()
+    highest = {}
+    for snapshot in snapshots:
+        day = snapshot.captured_at.date()
+        highest[day] = max(highest.get(day, 0), snapshot.view_count)
+
+    assert rollup_snapshots_to_daily(db, datetime(2026, 10, 3)) == 6
+    # Idempotent: nothing is left before the cutoff
+    assert rollup_snapshots_to_daily(db, datetime(2026, 10, 3)) == 0
+
+    daily = db.query(VideoDailyMetric).filter(VideoDailyMetric.video_id == video_id).order_by(VideoDailyMetric.date).all()
+    assert [(metric.date.date(), metric.view_count) for metric in daily] == [
+        (day, views) for day, views in sorted(highest.items()) if day < datetime(2026, 10, 3).date()
+    ]
+    remaining = db.query(VideoSnapshot).all()
+    assert len(remaining) == 3 * 6 and min(snapshot.captured_at for snapshot in remaining) == datetime(2026, 10, 3)
+
+
+def test_history_serves_daily_rollups_then_snapshots(client, db):
+    now = datetime.utcnow()
+    today = datetime.combine(now.date(), datetime.min.time())
+    ingest_hourly(db, today - timedelta(days=3), 3)
+    ingest_hourly(db, now - timedelta(hours=2), 2, first_cycle=3)
+    rollup_snapshots_to_daily(db, today - timedelta(days=1))
+    video_id = make_video_items(1)[0]["id"]
+
+    response = client.get(f"/videos/{video_id}/history", params={"country_code": "US", "days": 7})
+
+    assert response.status_code == 200
+    points = response.json()
+    assert [point["granularity"] for point in points] == ["daily", "snapshot", "snapshot"]
+    assert points[0]["view_count"] < points[1]["view_count"] < points[2]["view_count"]
+
+
+def test_history_rejects_unknown_countries_and_videos(client, db):
+    assert client.get("/videos/nope/history", params={"country_code": "ZZ"}).status_code == 400
+    assert client.get("/videos/nope/history", params={"country_code": "US"}).status_code == 404
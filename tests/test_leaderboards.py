@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app.crud import add_or_update_trending_video_batch
+from app.models import ChannelRollup
+from benchmarks.payloads import make_video_items
+
+MONDAY = datetime(2026, 10, 12)
+
+
+def totals(db, period):
+    return db.query(func.sum(ChannelRollup.videos), func.sum(ChannelRollup.appearances)).filter(
+        ChannelRollup.period == period, ChannelRollup.country_code == "US"
+    ).group_by(ChannelRollup.period_start).order_by(ChannelRollup.period_start).all()
+
+
+def test_appearances_count_days_on_the_chart_not_fetches(db):
+    # Four fetches on a Wednesday, one on the Thursday of the same week
+    day_one = MONDAY + timedelta(days=2, hours=1)
+    for cycle, fetched_at in enumerate([day_one + timedelta(hours=6 * i) for i in range(4)] + [day_one + timedelta(days=1)]):
+        add_or_update_trending_video_batch(db, make_video_items(20, cycle=cycle), "US", {}, fetched_at=fetched_at)
+
+    assert totals(db, "day") == [(20, 20), (20, 20)]
+    assert totals(db, "week") == [(20, 40)]
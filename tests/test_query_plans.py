@@ -0,0 +1,103 @@
+"""
+Query-plan regression test: runs the hot read queries exactly as the CRUD layer issues
+them against the migrated schema, EXPLAINs each statement and fails if any of them scans
+a whole table. Run it against PostgreSQL with TEST_DATABASE_URL: there sequential scans
+are disabled for the session, so a Seq Scan left in a plan means no index can serve the
+query at all, and the title, tag and full-text search queries are checked too.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+from sqlalchemy import cast, event, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from app.crud import get_alerts, get_recent_snapshots, get_trending_videos, get_video_history, search_videos
+from app.crud import get_last_stream_event_id, get_stream_events
+from app.database import engine
+from app.models import Video
+
+NOW = datetime.utcnow()
+
+HOT_QUERIES: Dict[str, Callable[[Session], Any]] = {
+    "latest chart": lambda db: get_trending_videos(db, "US", limit=50),
+    "latest chart, second page": lambda db: get_trending_videos(db, "US", skip=50, limit=50),
+    "active spikes": lambda db: get_trending_videos(db, "US", limit=50, spikes_only=True),
+    "active spikes, after cursor": lambda db: get_trending_videos(db, "US", limit=50, spikes_only=True, after=(NOW, 5000)),
+    "chart by fetch time, after cursor": lambda db: get_trending_videos(db, "US", limit=50, after=(NOW, 5000)),
+    "chart by views, after cursor": lambda db: get_trending_videos(db, "US", limit=50, sort="views", after=(100000, 5000)),
+    "chart by view change, after cursor": lambda db: get_trending_videos(db, "US", limit=50, sort="view_change", after=(1000, 5000)),
+    "chart by like ratio, after cursor": lambda db: get_trending_videos(db, "US", limit=50, sort="like_ratio", after=(0.05, 5000)),
+    "alerts after id": lambda db: get_alerts(db, "US", since_id=100),
+    "alerts after id, all countries": lambda db: get_alerts(db, since_id=100),
+    "alerts since time": lambda db: get_alerts(db, triggered_since=NOW - timedelta(hours=24)),
+    "alerts since time, one country": lambda db: get_alerts(db, "US", triggered_since=NOW - timedelta(hours=24)),
+    "video history": lambda db: get_video_history(db, "vid0000001", "US", NOW - timedelta(days=30), NOW),
+    "spike lookback": lambda db: get_recent_snapshots(db, "US", ["vid0000001", "vid0000002"], NOW - timedelta(hours=72), NOW),
+    "stream events after id": lambda db: get_stream_events(db, 100),
+    "last stream event": lambda db: get_last_stream_event_id(db),
+}
+
+POSTGRESQL_QUERIES: Dict[str, Callable[[Session], Any]] = {
+    "title search": lambda db: db.query(Video).filter(Video.title.ilike("%music video%")).limit(50).all(),
+    "tag search": lambda db: db.query(Video).filter(cast(Video.tags, JSONB).contains(["music"])).limit(50).all(),
+    "full-text search": lambda db: search_videos(db, "music video", limit=20),
+    "full-text search, one country": lambda db: search_videos(db, '"official video" -remix', country_code="US", limit=20),
+}
+
+# Tables a hot query must never scan in full
+CHECKED_TABLES = {"trending_videos", "videos", "video_alerts", "video_snapshots", "video_daily_metrics", "stream_events"}
+
+
+def capture_statements(db: Session, run: Callable[[Session], Any]) -> List[Tuple[str, Any]]:
+    """Runs `run` and returns every (statement, parameters) it sent to the database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def full_scans_sqlite(db: Session, statement: str, parameters: Any) -> List[str]:
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    details = [row[-1] for row in plan]
+    return [
+        detail for detail in details
+        if detail.startswith("SCAN ") and detail.split()[1] in CHECKED_TABLES and "USING" not in detail
+    ]
+
+
+def full_scans_postgresql(db: Session, statement: str, parameters: Any) -> List[str]:
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    scans = []
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return scans
+
+
+@pytest.mark.parametrize("name", [*HOT_QUERIES, *POSTGRESQL_QUERIES])
+def test_hot_query_uses_an_index(db, name):
+    postgresql = engine.dialect.name == "postgresql"
+    if name in POSTGRESQL_QUERIES and not postgresql:
+        pytest.skip("PostgreSQL-only index")
+    if postgresql:
+        db.execute(text("SET enable_seqscan = off"))
+    full_scans = full_scans_postgresql if postgresql else full_scans_sqlite
+
+    statements = capture_statements(db, HOT_QUERIES.get(name) or POSTGRESQL_QUERIES[name])
+
+    assert statements
+    assert [scan for statement, parameters in statements for scan in full_scans(db, statement, parameters)] == []
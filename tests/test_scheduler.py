@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.models import SchedulerLease
+from app.scheduler import LeaderScheduler
+
+
+def steal_lease(db, name):
+    lease = db.get(SchedulerLease, name)
+    lease.holder = "another-worker"
+    lease.lease_expires_at = datetime.utcnow() + timedelta(minutes=5)
+    db.commit()
+
+
+def test_job_is_cancelled_when_the_lease_is_lost(db):
+    events = []
+
+    async def job():
+        events.append("started")
+        await asyncio.to_thread(steal_lease, db, "test-job")
+        try:
+            await asyncio.sleep(10)
+            events.append("finished")
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    scheduler = LeaderScheduler("test-job", job, interval_seconds=3600, lease_seconds=0.3)
+
+    async def run_once():
+        assert await scheduler._acquire()
+        await asyncio.wait_for(scheduler._run_job(), timeout=5)
+
+    asyncio.run(run_once())
+
+    assert events == ["started", "cancelled"]
+    assert not scheduler.is_leader
+    db.expire_all()
+    lease = db.get(SchedulerLease, "test-job")
+    assert lease.holder == "another-worker"
+    assert lease.last_run_finished_at is None
+
+
+def test_job_runs_to_completion_while_the_lease_is_renewed(db):
+    async def job():
+        await asyncio.sleep(0.5)
+
+    scheduler = LeaderScheduler("test-job", job, interval_seconds=3600, lease_seconds=0.3)
+
+    async def run_once():
+        assert await scheduler._acquire()
+        await scheduler._run_job()
+
+    asyncio.run(run_once())
+
+    assert scheduler.is_leader
+    lease = db.get(SchedulerLease, "test-job")
+    assert lease.last_run_finished_at is not None
+    assert lease.next_run_at > lease.last_run_started_at
@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+
+
+def chart_rows(country_code, views, spike=None):
+    return [
+        {
+            "video_id": f"{country_code}-{i}",
+            "title": f"Video {i}",
+            "channel_title": "Channel",
+            "category_id": "10",
+            "view_count": views,
+            "previous_view_count": views // 2,
+            "view_count_change": views // 2,
+            "is_viral_spike": i == spike,
+            "fetched_at": "2026-10-16T00:00:00",
+        }
+        for i in range(3)
+    ]
+
+
+async def cache_response(cache, key):
+    backend_key, _ = await cache.alookup(key)
+    await cache.aset(backend_key, b"[]")
+
+
+async def cached_response(cache, key):
+    return (await cache.alookup(key))[1]
+
+
+@pytest.fixture
+def main(db, monkeypatch):
+    """app.main, imported once the database is migrated, with an empty chart history."""
+    from app import main
+
+    monkeypatch.setattr(main, "trending_differ", main.TrendingDiffer())
+    return main
+
+
+def test_leader_events_reach_other_workers(main):
+    async def scenario():
+        # Another worker's subscriber and cached response, from before the leader ingested
+        cursor = main.OutboxCursor(await asyncio.to_thread(main.load_last_stream_event_id))
+        subscription = main.event_broker.subscribe({"US"})
+        await cache_response(main.trending_cache, ("US", 0))
+        try:
+            await main.publish_country_update("US", chart_rows("US", 100, spike=1))
+            relayed = await main.relay_stream_events(cursor)
+            events = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+            cached = await cached_response(main.trending_cache, ("US", 0))
+            return relayed, events, cached
+        finally:
+            main.event_broker.unsubscribe(subscription)
+
+    relayed, events, cached = asyncio.run(scenario())
+
+    assert relayed == 2
+    assert [event["type"] for event in events] == ["trending", "alert"]
+    assert [video["video_id"] for video in events[0]["added"]] == ["US-0", "US-1", "US-2"]
+    assert events[1]["video_id"] == "US-1"
+    assert cached is None
+
+
+def test_unchanged_page_still_invalidates_without_an_event(main):
+    main.trending_differ.diff("US", chart_rows("US", 100))
+
+    async def scenario():
+        cursor = main.OutboxCursor(await asyncio.to_thread(main.load_last_stream_event_id))
+        subscription = main.event_broker.subscribe()
+        await cache_response(main.trending_cache, ("US", 0))
+        await cache_response(main.trending_cache, ("GB", 0))
+        try:
+            await main.publish_country_update("US", chart_rows("US", 100))
+            await main.relay_stream_events(cursor)
+            return (
+                subscription.queue.qsize(),
+                await cached_response(main.trending_cache, ("US", 0)),
+                await cached_response(main.trending_cache, ("GB", 0)),
+            )
+        finally:
+            main.event_broker.unsubscribe(subscription)
+
+    queued, us, gb = asyncio.run(scenario())
+
+    assert queued == 0
+    assert us is None
+    assert gb is not None
+
+
+def test_category_changes_are_reloaded_by_other_workers(main, db, monkeypatch):
+    from app.categories import CategoryService
+    from app.crud import save_region_categories
+
+    # This worker's service, which loaded before the refresh
+    service = CategoryService(lambda code: {}, ["US"], max_age=main.timedelta(hours=24))
+    monkeypatch.setattr(main, "category_service", service)
+    service.load()
+
+    async def scenario():
+        cursor = main.OutboxCursor(await asyncio.to_thread(main.load_last_stream_event_id))
+        # The worker that refreshed the categories stored them and published the change
+        await asyncio.to_thread(save_region_categories, db, "US", {"10": "Music"})
+        await main.on_categories_changed(None)
+        await main.relay_stream_events(cursor)
+
+    asyncio.run(scenario())
+
+    assert dict(service.current.names("US")) == {"10": "Music"}
+
+
+def test_an_event_committed_after_a_higher_id_is_still_relayed(main, db):
+    from app.models import StreamEvent
+
+    def write(event_id):
+        db.add(StreamEvent(id=event_id, event_type="alert", country_code="US",
+                           payload=json.dumps({"type": "alert", "country_code": "US", "video_id": f"v{event_id}"}),
+                           created_at=main.datetime.utcnow()))
+        db.commit()
+
+    async def scenario():
+        cursor = main.OutboxCursor(0)
+        subscription = main.event_broker.subscribe()
+        try:
+            # Another worker's event 2 commits while event 1 is still being written
+            await asyncio.to_thread(write, 2)
+            first = await main.relay_stream_events(cursor)
+            await asyncio.to_thread(write, 1)
+            second = await main.relay_stream_events(cursor)
+            third = await main.relay_stream_events(cursor)
+            events = [subscription.queue.get_nowait()["video_id"] for _ in range(subscription.queue.qsize())]
+            return first, second, third, events, cursor.after_id
+        finally:
+            main.event_broker.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == (1, 1, 0, ["v2", "v1"], 2)
+
+
+def test_outbox_cursor_gives_up_on_a_gap_after_the_grace_period():
+    from app.events import OutboxCursor
+
+    now = [0.0]
+    cursor = OutboxCursor(10, grace_seconds=30, clock=lambda: now[0])
+
+    assert [event_id for event_id, _ in cursor.accept([(12, {}), (13, {})])] == [12, 13]
+    assert cursor.after_id == 10
+    # Read again while 11 may still commit; nothing is relayed twice
+    assert cursor.accept([(12, {}), (13, {})]) == []
+    now[0] = 31
+    assert cursor.accept([(12, {}), (13, {})]) == []
+    assert cursor.after_id == 13
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+
+from app.ingestion import IngestionEngine  # noqa: E402
+from app.tracing import configure_tracing, disable_tracing  # noqa: E402
+from benchmarks.payloads import make_video_items  # noqa: E402
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    assert configure_tracing("yttrends-tests", exporter=exporter)
+    yield exporter
+    disable_tracing()
+
+
+def test_ingestion_spans_nest_under_the_country(db, exporter):
+    from app.main import store_country_batch
+
+    items = make_video_items(30)
+    engine = IngestionEngine(fetch_pages=lambda country_code: iter([items[:20], items[20:]]), store=store_country_batch)
+    try:
+        results = asyncio.run(engine.run_cycle(["US"]))
+    finally:
+        engine.shutdown()
+    assert results["US"].status == "ok"
+
+    spans = exporter.get_finished_spans()
+    by_id = {span.context.span_id: span for span in spans}
+
+    def parent(span):
+        return by_id[span.parent.span_id].name if span.parent else None
+
+    (country,) = [span for span in spans if span.name == "ingest.country"]
+    assert country.parent is None
+    assert country.attributes["status"] == "ok" and country.attributes["videos"] == 30
+
+    fetches = [span for span in spans if span.name == "ingest.fetch_page"]
+    stores = [span for span in spans if span.name == "ingest.store_page"]
+    # Two pages, then the fetch that finds the chart exhausted
+    assert len(fetches) == 3 and len(stores) == 2
+    assert {parent(span) for span in fetches + stores} == {"ingest.country"}
+    assert sorted(span.attributes["videos"] for span in stores) == [10, 20]
+    # Opened on the worker thread, still under the page being stored
+    assert {parent(span) for span in spans if span.name in ("ingest.parse", "ingest.upsert")} == {"ingest.store_page"}
+    assert all(span.context.trace_id == country.context.trace_id for span in spans)
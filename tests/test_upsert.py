@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.crud import add_or_update_trending_video_batch
+from app.models import TrendingVideo
+from benchmarks.payloads import make_video_items
+
+NOW = datetime(2026, 10, 16, 12)
+
+
+def chart(db):
+    return {video.video_id: video for video in db.query(TrendingVideo).filter(TrendingVideo.country_code == "US")}
+
+
+def test_second_fetch_updates_rows_with_the_view_change(db, upsert_path):
+    first = make_video_items(20)
+    second = make_video_items(20, cycle=1)
+    add_or_update_trending_video_batch(db, first, "US", {"10": "Music"}, fetched_at=NOW)
+    rows = add_or_update_trending_video_batch(db, second, "US", {"10": "Music"}, fetched_at=NOW + timedelta(hours=1))
+
+    stored = chart(db)
+    assert len(stored) == 20 and len(rows) == 20
+    for before, after in zip(first, second):
+        video = stored[after["id"]]
+        assert video.view_count == int(after["statistics"]["viewCount"])
+        assert video.previous_view_count == int(before["statistics"]["viewCount"])
+        assert video.view_count_change == video.view_count - video.previous_view_count
+        assert video.fetched_at.replace(tzinfo=None) == NOW + timedelta(hours=1)
+
+
+def test_new_rows_have_no_previous_views(db, upsert_path):
+    rows = add_or_update_trending_video_batch(db, make_video_items(5), "US", {}, fetched_at=NOW)
+
+    assert [row["previous_view_count"] for row in rows] == [None] * 5
+    assert all(video.previous_view_count is None for video in chart(db).values())
+    assert {video.category_name for video in chart(db).values()} == {"Unknown"}
+
+
+def test_a_video_listed_twice_in_a_batch_keeps_its_last_entry(db):
+    items = make_video_items(3)
+    duplicate = make_video_items(3, cycle=2)[0]
+    rows = add_or_update_trending_video_batch(db, items + [duplicate], "US", {}, fetched_at=NOW)
+
+    assert len(rows) == 3
+    assert chart(db)[duplicate["id"]].view_count == int(duplicate["statistics"]["viewCount"])
+
+
+def test_a_batch_is_one_chart_statement(db):
+    from app.database import engine
+
+    add_or_update_trending_video_batch(db, make_video_items(200), "US", {}, fetched_at=NOW)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO TRENDING_VIDEOS"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        add_or_update_trending_video_batch(db, make_video_items(200, cycle=1), "US", {}, fetched_at=NOW + timedelta(hours=1))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    assert "ON CONFLICT" in statements[0]
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud
+from app.crud import add_or_update_trending_video_batch
+from app.models import TrendingVideo, Video
+from benchmarks.payloads import make_video_items
+
+NOW = datetime(2026, 10, 16, 12)
+
+
+@pytest.fixture
+def metadata_writes(monkeypatch):
+    """The number of Video rows each batch wrote, as returned by _save_video_metadata."""
+    writes = []
+    save = crud._save_video_metadata
+
+    def record(db, rows):
+        writes.append(save(db, rows))
+        return writes[-1]
+
+    monkeypatch.setattr(crud, "_save_video_metadata", record)
+    return writes
+
+
+def test_unchanged_metadata_is_not_rewritten(db, upsert_path, metadata_writes):
+    items = make_video_items(10)
+    add_or_update_trending_video_batch(db, items, "US", {}, fetched_at=NOW)
+    # Only the statistics change from one cycle to the next
+    add_or_update_trending_video_batch(db, make_video_items(10, cycle=1), "US", {}, fetched_at=NOW + timedelta(hours=1))
+
+    retitled = make_video_items(10, cycle=2)
+    retitled[3]["snippet"]["title"] = "A new title"
+    add_or_update_trending_video_batch(db, retitled, "US", {}, fetched_at=NOW + timedelta(hours=2))
+
+    assert metadata_writes == [10, 0, 1]
+    db.expire_all()
+    video = db.get(Video, retitled[3]["id"])
+    assert video.title == "A new title"
+    assert video.updated_at.replace(tzinfo=None) == NOW + timedelta(hours=2)
+    assert db.get(Video, retitled[4]["id"]).updated_at.replace(tzinfo=None) == NOW
+
+
+def test_metadata_is_shared_between_countries(db, upsert_path, metadata_writes):
+    items = make_video_items(5)
+    add_or_update_trending_video_batch(db, items, "US", {}, fetched_at=NOW)
+    add_or_update_trending_video_batch(db, items, "GB", {}, fetched_at=NOW)
+
+    assert metadata_writes == [5, 0]
+    assert db.query(Video).count() == 5
+    assert db.query(TrendingVideo).count() == 10
+    chart = db.query(TrendingVideo).filter(TrendingVideo.country_code == "GB").all()
+    assert {video.video.title for video in chart} == {item["snippet"]["title"] for item in items}
+
+
+def test_older_metadata_never_replaces_newer(db, upsert_path):
+    older = make_video_items(3)
+    for item in older:
+        item["snippet"]["title"] = "An older title"
+    add_or_update_trending_video_batch(db, make_video_items(3), "US", {}, fetched_at=NOW)
+    add_or_update_trending_video_batch(db, older, "GB", {}, fetched_at=NOW - timedelta(days=1))
+
+    db.expire_all()
+    assert db.query(Video).filter(Video.title == "An older title").count() == 0
+
+
+def test_chart_responses_carry_the_shared_metadata(client, db):
+    from app.main import trending_cache
+
+    items = make_video_items(3)
+    add_or_update_trending_video_batch(db, items, "US", {}, fetched_at=NOW)
+    trending_cache.invalidate_country("US")
+
+    videos = client.get("/trending-videos/US").json()
+
+    titles = {item["id"]: item["snippet"]["title"] for item in items}
+    assert {video["video_id"]: video["title"] for video in videos} == titles
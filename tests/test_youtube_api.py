@@ -0,0 +1,232 @@
+import asyncio
+import json
+import socket
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import httplib2
+import pytest
+
+from app import youtube_api
+from app.ingestion import IngestionEngine, page_deadline
+from app.youtube_api import RecordedHttp, YouTubeClient
+
+
+class ChartHttp:
+    """A fake YouTube API serving a paged mostPopular chart of `size` videos per region."""
+
+    def __init__(self, size=120, categories=("10",)):
+        self.size = size
+        self.categories = set(categories)
+        self.requests = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.requests.append(uri)
+        query = dict(parse_qsl(urlsplit(uri).query))
+        category = query.get("videoCategoryId")
+        if category is not None and category not in self.categories:
+            return httplib2.Response({"status": 404}), b'{"error": {"code": 404, "message": "Not found"}}'
+        start = int(query.get("pageToken") or 0)
+        end = min(start + int(query["maxResults"]), self.size)
+        prefix = f"{query['regionCode']}-{category or 'all'}"
+        # Category charts repeat the first videos of the overall chart
+        items = [
+            {
+                "id": f"{query['regionCode']}-all-{i}" if i < 5 else f"{prefix}-{i}",
+                "snippet": {"title": f"Video {i}", "channelTitle": "Channel", "categoryId": category or "24"},
+                "statistics": {"viewCount": str(1000 - i)},
+            }
+            for i in range(start, end)
+        ]
+        response = {"items": items}
+        if end < self.size:
+            response["nextPageToken"] = str(end)
+        return httplib2.Response({"status": 200, "content-type": "application/json"}), json.dumps(response).encode()
+
+
+def make_client(http_factory):
+    return YouTubeClient(api_key="test-key", http_factory=http_factory, backoff_base=0)
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A chart recorded from the fake API into a RecordedHttp directory."""
+    live = ChartHttp()
+    client = make_client(lambda: RecordedHttp(str(tmp_path), record_from=live))
+    pages = list(client.iter_trending_pages("US", max_results=120))
+    return tmp_path, live, pages
+
+
+def test_recorded_chart_replays_offline(recording):
+    directory, live, recorded_pages = recording
+    assert [len(page) for page in recorded_pages] == [50, 50, 20]
+    assert len(live.requests) == 3
+
+    offline = make_client(lambda: RecordedHttp(str(directory)))
+    pages = list(offline.iter_trending_pages("US", max_results=120))
+
+    assert pages == recorded_pages
+    assert offline.units_used == 3
+
+
+def test_replay_without_recording_fails(tmp_path):
+    offline = make_client(lambda: RecordedHttp(str(tmp_path)))
+    with pytest.raises(FileNotFoundError):
+        list(offline.iter_trending_pages("US"))
+
+
+def test_fetch_trending_pages_replays_category_charts(tmp_path, monkeypatch):
+    live = ChartHttp(size=60, categories={"10"})
+    monkeypatch.setattr(youtube_api, "_default_client", make_client(lambda: RecordedHttp(str(tmp_path), record_from=live)))
+    recorded = list(youtube_api.fetch_trending_pages("GB", max_results=60, category_ids=["10", "99"]))
+
+    monkeypatch.setattr(youtube_api, "_default_client", make_client(lambda: RecordedHttp(str(tmp_path))))
+    pages = list(youtube_api.fetch_trending_pages("GB", max_results=60, category_ids=["10", "99"]))
+
+    assert pages == recorded
+    video_ids = [item["id"] for page in pages for item in page]
+    # 60 overall, 55 from category 10 once its repeats are dropped, none from 99
+    assert len(video_ids) == len(set(video_ids)) == 115
+
+
+def test_transport_error_retries_on_a_fresh_connection():
+    transports = [BrokenHttp(), ChartHttp(size=10)]
+    client = make_client(lambda: transports.pop(0))
+
+    assert [len(page) for page in client.iter_trending_pages("US", max_results=10)] == [10]
+    assert client.units_used == 2
+    assert transports == []
+
+
+class BrokenHttp:
+    def request(self, *args, **kwargs):
+        raise socket.timeout("timed out")
+
+
+def test_retries_stop_at_the_fetch_deadline():
+    client = make_client(BrokenHttp)
+    token = page_deadline.set(time.monotonic())
+    try:
+        with pytest.raises(socket.timeout):
+            list(client.iter_trending_pages("US"))
+    finally:
+        page_deadline.reset(token)
+    assert client.units_used == 1
+
+
+def test_ingestion_deadline_reaches_the_fetching_thread(monkeypatch):
+    # Every retry would wait longer than the engine is willing to wait for a page
+    monkeypatch.setattr(youtube_api.random, "uniform", lambda low, high: 5.0)
+    client = YouTubeClient(api_key="test-key", http_factory=BrokenHttp)
+    engine = IngestionEngine(fetch_pages=client.iter_trending_pages, store=lambda cc, items: None, timeout_seconds=1.0)
+    try:
+        results = asyncio.run(engine.run_cycle(["US"]))
+    finally:
+        engine.shutdown()
+
+    # socket.timeout is an asyncio.TimeoutError too from Python 3.11
+    assert results["US"].status in ("error", "timeout")
+    assert client.units_used == 1
+
+
+def test_chart_pages_stop_at_max_results():
+    live = ChartHttp(size=200)
+    client = make_client(lambda: live)
+
+    assert [len(page) for page in client.iter_trending_pages("US", max_results=120)] == [50, 50, 20]
+    # The last request only asks for what is left
+    assert [dict(parse_qsl(urlsplit(uri).query))["maxResults"] for uri in live.requests] == ["50", "50", "20"]
+    assert client.units_used == 3
+
+
+def test_only_a_missing_category_chart_is_skipped(monkeypatch):
+    monkeypatch.setattr(youtube_api, "_default_client", make_client(lambda: ChartHttp(size=10, categories=())))
+    assert [len(page) for page in youtube_api.fetch_trending_pages("US", max_results=10, category_ids=["99"])] == [10]
+
+    # Without the overall chart there is nothing to store for the country
+    monkeypatch.setattr(youtube_api, "_default_client", make_client(lambda: FailingHttp(status=404)))
+    with pytest.raises(youtube_api.HttpError):
+        list(youtube_api.fetch_trending_pages("US", max_results=10))
+
+    # Any other failure of a category chart fails the fetch, after the pages already yielded
+    monkeypatch.setattr(youtube_api, "_default_client", make_client(lambda: ForbiddenCategoryHttp(size=10)))
+    pages = youtube_api.fetch_trending_pages("US", max_results=10, category_ids=["10"])
+    assert len(next(pages)) == 10
+    with pytest.raises(youtube_api.HttpError):
+        next(pages)
+
+
+class FailingHttp:
+    def __init__(self, status):
+        self.status = status
+
+    def request(self, *args, **kwargs):
+        return httplib2.Response({"status": self.status}), b'{"error": {"code": %d, "message": "Failed"}}' % self.status
+
+
+class ForbiddenCategoryHttp(ChartHttp):
+    def request(self, uri, *args, **kwargs):
+        if "videoCategoryId" in uri:
+            return FailingHttp(status=403).request(uri)
+        return super().request(uri, *args, **kwargs)
+
+
+def test_ingestion_stores_each_page_before_fetching_the_next():
+    events = []
+
+    def fetch_pages(country_code):
+        for number in range(3):
+            events.append(("fetch", number))
+            yield [{"id": f"{country_code}-{number}-{i}"} for i in range(2)]
+
+    def store(country_code, items):
+        events.append(("store", items[0]["id"]))
+        return len(items)
+
+    stored = []
+
+    async def on_stored(country_code, count):
+        stored.append((country_code, count))
+
+    engine = IngestionEngine(fetch_pages=fetch_pages, store=store, on_stored=on_stored)
+    try:
+        result = asyncio.run(engine.run_cycle(["US"]))["US"]
+    finally:
+        engine.shutdown()
+
+    assert events == [
+        ("fetch", 0), ("store", "US-0-0"), ("fetch", 1), ("store", "US-1-0"), ("fetch", 2), ("store", "US-2-0"),
+    ]
+    assert stored == [("US", 2)] * 3
+    assert (result.status, result.videos) == ("ok", 6)
+    assert result.video_ids == [f"US-{number}-{i}" for number in range(3) for i in range(2)]
+
+
+def test_a_failed_page_keeps_the_pages_already_stored():
+    stored = []
+
+    def fetch_pages(country_code):
+        yield [{"id": "a"}, {"id": "b"}]
+        raise RuntimeError("quota exceeded")
+
+    engine = IngestionEngine(fetch_pages=fetch_pages, store=lambda cc, items: stored.extend(items))
+    try:
+        result = asyncio.run(engine.run_cycle(["US"]))["US"]
+    finally:
+        engine.shutdown()
+
+    assert [item["id"] for item in stored] == ["a", "b"]
+    assert (result.status, result.videos, result.error) == ("error", 2, "quota exceeded")
+    assert engine.budget_for("US").consecutive_failures == 1
+
+
+def test_a_whole_chart_fetch_is_one_page():
+    pages = []
+    engine = IngestionEngine(fetch=lambda cc: [{"id": "a"}, {"id": "b"}], store=lambda cc, items: pages.append(items))
+    try:
+        result = asyncio.run(engine.run_cycle(["US"]))["US"]
+    finally:
+        engine.shutdown()
+
+    assert pages == [[{"id": "a"}, {"id": "b"}]]
+    assert result.video_ids == ["a", "b"]